@@ -17,11 +17,12 @@ django.setup()
 # ✅ Ab import karo routing aur middleware
 from chat.middleware import JWTAuthMiddleware
 import chat.routing
+import notification.routing
 
 # ✅ Application config
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": JWTAuthMiddleware(   # 👈 yahan apna custom middleware lagao
-        URLRouter(chat.routing.websocket_urlpatterns)
+        URLRouter(chat.routing.websocket_urlpatterns + notification.routing.websocket_urlpatterns)
     ),
 })
@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination on ``created_at``, newest first.
+    Each page is one indexed range scan, however long the history gets.
+    """
+    ordering = '-created_at'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class TimestampCursorPagination(CreatedAtCursorPagination):
+    """Same as ``CreatedAtCursorPagination`` for log tables keyed on ``timestamp``."""
+    ordering = '-timestamp'
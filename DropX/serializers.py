@@ -0,0 +1,49 @@
+from rest_framework import serializers
+
+
+class SparseFieldsetsMixin:
+    """
+    Lets clients trim the response with query parameters:
+
+    - ``?fields=a,b,c`` returns only the listed fields.
+    - ``?expand=x,y`` switches to the slim representation: fields listed in
+      ``Meta.expandable_fields`` (heavy nested data) are left out unless
+      named in ``expand`` (or ``fields``).
+
+    Without either parameter the full representation is returned. Only the
+    top-level serializer of a response is trimmed, nested ones are untouched.
+    """
+
+    @classmethod
+    def requested_fields(cls, request):
+        """The field names a request asks for, or None for the full representation."""
+        if request is None:
+            return None
+        params = request.query_params
+        if 'fields' not in params and 'expand' not in params:
+            return None
+
+        names = set(cls.Meta.fields)
+        fields = {f.strip() for f in params.get('fields', '').split(',') if f.strip()}
+        expand = {f.strip() for f in params.get('expand', '').split(',') if f.strip()}
+        if fields:
+            names &= fields | expand
+        else:
+            names -= set(getattr(cls.Meta, 'expandable_fields', ())) - expand
+        return names
+
+    def _is_top_level(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_top_level():
+            return fields
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return fields
+        names = self.requested_fields(request)
+        if names is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in names}
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'driver_verification',
     'notification',
     'payment',
+    'pricing',
     'review',
     'route',
     'vehicle',
@@ -48,7 +49,7 @@ INSTALLED_APPS = [
 # DRF unified config
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'DropX.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
@@ -130,6 +131,74 @@ else:
         },
     }
 
+# Routing backend used by route.services
+# 'osrm' -> OSRM_URL (public demo server by default, point it at a self-hosted OSRM in production)
+# 'stub' -> straight-line routes computed locally, no network (tests / offline development)
+ROUTING = {
+    'BACKEND': os.environ.get('ROUTING_BACKEND', 'osrm'),
+    'OSRM_URL': os.environ.get('OSRM_URL', 'http://router.project-osrm.org'),
+    'TIMEOUT': 10,
+    'COORDINATE_PRECISION': 4,  # ~11 m, nearby addresses share a cache entry
+    'CACHE_TTL': 60 * 60 * 24 * 7,  # seconds
+    'CACHE_MAX_ENTRIES': 10000,  # persistent table, evicted least recently used first
+    'MEMORY_CACHE_SIZE': 1024,  # per-process LRU
+    'DEFAULT_ROAD_FACTOR': 1.3,  # road km per great-circle km for uncalibrated corridors
+    'WORKERS': 2,  # route job threads per process
+    'JOB_MAX_ATTEMPTS': 3,
+    'JOB_RETRY_DELAY': 30,  # seconds before the first retry, doubled for each one after
+    'RUN_JOBS_INLINE': False,  # True runs route jobs synchronously on commit (tests)
+    'CORRIDOR_CELL_DEGREES': 0.1,  # grid cell size of the in-memory corridor index
+    'CORRIDOR_SIMPLIFY_KM': 0.5,  # Douglas-Peucker tolerance for stored post routes
+    'CORRIDOR_INDEX_TTL': 300,  # seconds before a process rebuilds its corridor index
+}
+
+# Write-behind persistence of WebSocket chat messages, see chat.writer
+CHAT_WRITER = {
+    'ENABLED': True,  # False writes every message before broadcasting it
+    'FLUSH_INTERVAL': 0.2,  # seconds a message may wait in memory
+    'FLUSH_SIZE': 100,  # pending messages that trigger an immediate flush
+}
+
+# Delivery quotes, see pricing.quotes. Tariff rows override the rates per city pair.
+PRICING = {
+    'BASE_FARE': '0',
+    'PER_KM': '1.0',
+    'PER_KG': '0.5',
+    'FRAGILE_MULTIPLIER': '1.5',  # applied to the weight charge of fragile packages
+    'VOLUMETRIC_DIVISOR': 5000,  # cm^3 per chargeable kg for bulky, light packages
+    'DISTANCE_PRECISION': 1,  # km decimals kept in quotes (and quote cache keys)
+    'QUOTE_CACHE_TTL': 60,  # seconds
+    'QUOTE_CACHE_SIZE': 10000,
+    'TARIFF_TABLE_TTL': 300,  # seconds before a process reloads the tariff table
+}
+
+# Bulk delivery import, see delivery.batch
+DELIVERY_BATCH = {
+    'MAX_ROWS': 1000,  # deliveries per request
+    'CHUNK_SIZE': 200,  # deliveries per transaction
+}
+
+# Background driver verification, see driver_verification.pipeline
+DRIVER_VERIFICATION = {
+    'WORKERS': int(os.environ.get('VERIFICATION_WORKERS', 2)),  # face/OCR worker processes
+    'RUN_INLINE': False,  # True runs verifications synchronously on commit (tests)
+    'FACE_MAX_SIDE': 1024,  # px, uploads are downscaled to this for face detection
+    'OCR_MAX_SIDE': 1800,  # px, longest side of the CNIC image handed to Tesseract
+    'OCR_THRESHOLD': True,  # binarise the CNIC before OCR (False: plain grayscale)
+    'FACE_DUPLICATE_TOLERANCE': 0.5,  # selfies closer than this belong to the same person
+    'FACE_INDEX_TTL': 60 * 60,  # seconds before a process rebuilds its face index
+    'FACE_INDEX_BALLTREE_MIN': 2000,  # verified faces before the index switches to a BallTree
+}
+
+# Process-local cache of the user fields authentication needs, see accounts.principal
+AUTH_PRINCIPAL_CACHE = {
+    'TTL': 60,  # seconds; bounds how long other processes see a stale role/verification status
+    'MAX_SIZE': 10000,
+}
+
+# Grid bucket size (degrees) for the driver post spatial index, ~28 km at 0.25
+DRIVER_POST_GRID_DEGREES = 0.25
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -153,6 +222,15 @@ SIMPLE_JWT = {
     "UPDATE_LAST_LOGIN": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    "TOKEN_REFRESH_SERIALIZER": "accounts.tokens.TokenRefreshSerializer",
+}
+
+# In-memory refresh token blacklist, see accounts.blacklist
+TOKEN_BLACKLIST_CACHE = {
+    'CAPACITY': 100000,  # jti values before the Bloom filter is resized
+    'ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 5,  # seconds; tokens blacklisted by other processes are rejected after at most this long
+    'REBUILD_INTERVAL': 60 * 60,
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -52,6 +52,7 @@ urlpatterns = [
     path('api/driver-verification/', include('driver_verification.urls')),
     path('api/notification/', include('notification.urls')),
     path('api/payment/', include('payment.urls')),
+    path('api/pricing/', include('pricing.urls')),
     path('api/review/', include('review.urls')),
     path('api/route/', include('route.urls')),
     path('api/vehicle/', include('vehicle.urls')),
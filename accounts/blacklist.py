@@ -0,0 +1,145 @@
+# accounts/blacklist.py
+"""
+In-memory refresh token blacklist.
+
+simplejwt checks every refresh against ``BlacklistedToken`` with a join on
+``OutstandingToken``. Here the blacklisted jti values live in process memory
+instead: a Bloom filter answers the common "not blacklisted" case from a few
+bits, and an exact set confirms the (rare) positives, so a check costs the
+same however many tokens have been issued or revoked.
+
+The database stays the source of truth. Each process builds its blacklist on
+first use, picks up tokens blacklisted by other processes every
+``SYNC_INTERVAL`` seconds, and rebuilds from scratch every
+``REBUILD_INTERVAL`` seconds so rows removed by ``prune_tokens`` drop out of
+memory too. Tokens blacklisted in this process are added as soon as the
+transaction commits.
+
+A sync reads the rows with an id past its watermark rather than a
+``blacklisted_at`` past it, since that timestamp is set before commit. Ids
+follow commit order only because SQLite serializes writers; on a backend with
+concurrent writers a row can still commit behind the watermark, and is then
+only picked up by the next rebuild.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_BLACKLIST_CACHE = {
+    'CAPACITY': 100000,  # jti values before the Bloom filter is resized
+    'ERROR_RATE': 0.001,  # Bloom filter false positive rate at capacity
+    'SYNC_INTERVAL': 5,  # seconds between checks for tokens blacklisted by other processes
+    'REBUILD_INTERVAL': 60 * 60,  # seconds before a process rebuilds its blacklist
+}
+
+
+def blacklist_settings():
+    return {**DEFAULT_TOKEN_BLACKLIST_CACHE, **getattr(settings, 'TOKEN_BLACKLIST_CACHE', {})}
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class JtiBlacklist:
+    def __init__(self, capacity, error_rate):
+        self.error_rate = error_rate
+        self.built_at = time.monotonic()
+        self.synced_at = 0.0
+        self.synced_until = None  # highest BlacklistedToken id loaded from the database
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._jtis = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._jtis)
+
+    def add(self, jti):
+        with self._lock:
+            if jti in self._jtis:
+                return
+            self._jtis.add(jti)
+            if len(self._jtis) > self._bloom.capacity:
+                # Past capacity the false positive rate climbs; start over twice as
+                # large. Filled before it is swapped in: __contains__ takes no lock
+                bloom = BloomFilter(self._bloom.capacity * 2, self.error_rate)
+                for known in self._jtis:
+                    bloom.add(known)
+                self._bloom = bloom
+            else:
+                self._bloom.add(jti)
+
+    def __contains__(self, jti):
+        return jti in self._bloom and jti in self._jtis
+
+    def sync(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        queryset = BlacklistedToken.objects.all()
+        if self.synced_until is not None:
+            queryset = queryset.filter(id__gt=self.synced_until)
+        rows = queryset.order_by('id').values_list('id', 'token__jti').iterator(chunk_size=5000)
+        for row_id, jti in rows:
+            self.add(jti)
+            self.synced_until = row_id
+        self.synced_at = time.monotonic()
+
+
+_blacklist = None
+_blacklist_lock = threading.Lock()
+
+
+def get_token_blacklist():
+    """The process-wide blacklist, synced every SYNC_INTERVAL and rebuilt every REBUILD_INTERVAL seconds."""
+    global _blacklist
+    config = blacklist_settings()
+    now = time.monotonic()
+    if _blacklist is None or now - _blacklist.built_at > config['REBUILD_INTERVAL']:
+        with _blacklist_lock:
+            if _blacklist is None or now - _blacklist.built_at > config['REBUILD_INTERVAL']:
+                blacklist = JtiBlacklist(config['CAPACITY'], config['ERROR_RATE'])
+                blacklist.sync()
+                _blacklist = blacklist
+                logger.info(f"Token blacklist built with {len(_blacklist)} tokens")
+    elif now - _blacklist.synced_at > config['SYNC_INTERVAL']:
+        with _blacklist_lock:
+            if now - _blacklist.synced_at > config['SYNC_INTERVAL']:
+                _blacklist.sync()
+    return _blacklist
+
+
+def reset_token_blacklist():
+    global _blacklist
+    _blacklist = None
+
+
+def is_blacklisted(jti):
+    return jti in get_token_blacklist()
+
+
+def record_blacklisted(jti):
+    if _blacklist is not None:
+        _blacklist.add(jti)
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+def prune_expired_tokens(batch_size=1000, max_batches=None, pause=0):
+    """
+    Delete outstanding tokens (and their blacklist rows) that have expired, one
+    batch per transaction so the tables aren't locked for long. Returns
+    (outstanding, blacklisted) rows deleted.
+    """
+    now = timezone.now()
+    outstanding = blacklisted = batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            _, deleted = OutstandingToken.objects.filter(id__in=ids).delete()  # cascades to BlacklistedToken
+        outstanding += deleted.get(OutstandingToken._meta.label, 0)
+        blacklisted += deleted.get(BlacklistedToken._meta.label, 0)
+        batches += 1
+        if pause:
+            time.sleep(pause)
+    return outstanding, blacklisted
+
+
+class Command(BaseCommand):
+    help = "Delete expired OutstandingToken/BlacklistedToken rows in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches.")
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        outstanding, blacklisted = prune_expired_tokens(
+            options['batch_size'], options['max_batches'], options['pause']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {outstanding} expired outstanding tokens and {blacklisted} blacklist entries."
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_remove_customuser_unique_first_last_phone'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-timestamp'], name='accounts_au_timesta_40aa9a_idx'),
+        ),
+    ]
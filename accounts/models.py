@@ -79,5 +79,10 @@ class AuditLog(models.Model):
     details = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-timestamp']),
+        ]
+
     def __str__(self):
         return f"{self.action} by {self.user.email} at {self.timestamp}"
\ No newline at end of file
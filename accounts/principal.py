@@ -0,0 +1,123 @@
+# accounts/principal.py
+"""
+Cached user principals for authentication.
+
+JWT-authenticated requests and WebSocket connections only need a handful of
+user columns (id, role, is_active, whether the driver is verified, plus email
+and name for logs). Those are loaded with one query (user LEFT JOIN
+driver_profile), kept in a process-local TTL/LRU cache and turned back into a
+``CustomUser`` instance whose other fields are deferred, so FK assignment and
+``==`` work as usual and rarely used fields load lazily on access.
+
+``is_driver_verified`` is set on the instance, which is what
+``DropX.permissions.IsVerifiedDriver`` checks first. Saves and deletes of users
+and driver profiles invalidate the entry (see ``accounts.signals``); bulk
+``update()`` calls must call ``invalidate_principal`` themselves. Other
+processes pick changes up after ``AUTH_PRINCIPAL_CACHE['TTL']`` seconds.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import CustomUser
+
+PRINCIPAL_FIELDS = ('id', 'email', 'first_name', 'last_name', 'role', 'is_active', 'is_staff', 'is_superuser')
+
+DEFAULT_PRINCIPAL_CACHE = {
+    'TTL': 60,  # seconds
+    'MAX_SIZE': 10000,
+}
+
+
+def principal_cache_settings():
+    return {**DEFAULT_PRINCIPAL_CACHE, **getattr(settings, 'AUTH_PRINCIPAL_CACHE', {})}
+
+
+class _PrincipalLRU:
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, principal = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return principal
+
+    def set(self, key, principal, ttl, max_size):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, principal)
+            self._data.move_to_end(key)
+            while len(self._data) > max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_principals = _PrincipalLRU()
+
+
+def _key(user_id):
+    return str(user_id)
+
+
+def load_principal(user_id):
+    row = CustomUser.objects.filter(id=user_id).values_list(
+        *PRINCIPAL_FIELDS, F('driver_profile__is_driver_verified')
+    ).first()
+    if row is None:
+        return None
+    return row[:-1] + (bool(row[-1]),)
+
+
+def get_principal(user_id):
+    """(id, ..., is_superuser, is_driver_verified) from the cache, loading it on a miss; None for unknown users."""
+    principal = _principals.get(_key(user_id))
+    if principal is None:
+        principal = load_principal(user_id)
+        if principal is not None:
+            config = principal_cache_settings()
+            _principals.set(_key(user_id), principal, config['TTL'], config['MAX_SIZE'])
+    return principal
+
+
+def cached_principal(user_id):
+    """Cache-only lookup, safe to call from async code."""
+    return _principals.get(_key(user_id))
+
+
+def principal_user(principal):
+    # from_db expects values in model field order
+    values = dict(zip(PRINCIPAL_FIELDS, principal))
+    field_names = [f.attname for f in CustomUser._meta.concrete_fields if f.attname in values]
+    user = CustomUser.from_db('default', field_names, [values[name] for name in field_names])
+    user.is_driver_verified = principal[-1]
+    return user
+
+
+def get_user(user_id):
+    principal = get_principal(user_id)
+    return principal_user(principal) if principal is not None else None
+
+
+def invalidate_principal(user_id):
+    _principals.delete(_key(user_id))
+
+
+def clear_principals():
+    _principals.clear()
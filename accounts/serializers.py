@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import CustomUser, SenderProfile, DriverProfile, AuditLog
 from phonenumber_field.serializerfields import PhoneNumberField
 import re
+from DropX.serializers import SparseFieldsetsMixin
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -148,7 +149,7 @@ class DriverProfileSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'license_number', 'is_driver_verified', 'wallet_balance', 'easypaisa_phone']
 
 
-class AuditLogSerializer(serializers.ModelSerializer):
+class AuditLogSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     id = serializers.UUIDField(read_only=True)
     user_email = serializers.EmailField(source='user.email', read_only=True)
 
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CustomUser, DriverProfile
+from .principal import invalidate_principal
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_user_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=DriverProfile)
+def invalidate_driver_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.user_id)
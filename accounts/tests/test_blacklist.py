@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from accounts.blacklist import BloomFilter, JtiBlacklist, get_token_blacklist, reset_token_blacklist
+from accounts.management.commands.prune_tokens import prune_expired_tokens
+from accounts.models import CustomUser
+from accounts.tokens import RefreshToken, TokenRefreshSerializer
+
+
+@pytest.fixture(autouse=True)
+def fresh_blacklist():
+    reset_token_blacklist()
+    yield
+    reset_token_blacklist()
+
+
+@pytest.fixture
+def user(db):
+    return CustomUser.objects.create_user(
+        email="tokens@example.com", password="pass1234", phone_number="+923004445566",
+    )
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    values = [f"jti-{i}" for i in range(1000)]
+    for value in values:
+        bloom.add(value)
+
+    assert all(value in bloom for value in values)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300  # ~1% expected
+
+
+def test_blacklist_grows_past_capacity():
+    blacklist = JtiBlacklist(capacity=10, error_rate=0.01)
+    for i in range(50):
+        blacklist.add(f"jti-{i}")
+
+    assert len(blacklist) == 50
+    assert all(f"jti-{i}" in blacklist for i in range(50))
+    assert "jti-50" not in blacklist
+
+
+def test_blacklisted_refresh_token_is_rejected_without_queries(user, django_assert_num_queries, django_capture_on_commit_callbacks):
+    kept, revoked = RefreshToken.for_user(user), RefreshToken.for_user(user)
+    with django_capture_on_commit_callbacks(execute=True):
+        RefreshToken(str(revoked)).blacklist()
+
+    get_token_blacklist()  # built once per process
+    with django_assert_num_queries(0):
+        RefreshToken(str(kept))
+        with pytest.raises(TokenError):
+            RefreshToken(str(revoked))
+
+    serializer = TokenRefreshSerializer(data={'refresh': str(revoked)})
+    with pytest.raises(TokenError):
+        serializer.is_valid()
+
+
+def test_blacklist_is_built_from_the_database(user):
+    token = RefreshToken.for_user(user)
+    outstanding = OutstandingToken.objects.get(jti=token['jti'])
+    BlacklistedToken.objects.create(token=outstanding)  # e.g. by another process
+
+    with pytest.raises(TokenError):
+        RefreshToken(str(token))
+
+
+def test_prune_deletes_only_expired_rows_in_batches(user):
+    now = timezone.now()
+    for i in range(5):
+        token = OutstandingToken.objects.create(
+            user=user, jti=f"expired-{i}", token="x", created_at=now, expires_at=now - timedelta(days=1)
+        )
+        if i % 2 == 0:
+            BlacklistedToken.objects.create(token=token)
+    OutstandingToken.objects.create(user=user, jti="live", token="x", created_at=now, expires_at=now + timedelta(days=1))
+
+    assert prune_expired_tokens(batch_size=2, max_batches=1) == (2, 1)
+    call_command('prune_tokens', '--batch-size', '2')
+
+    assert list(OutstandingToken.objects.values_list('jti', flat=True)) == ["live"]
+    assert not BlacklistedToken.objects.exists()
+
+
+def test_sync_picks_up_rows_stamped_behind_the_watermark(user):
+    first, late = RefreshToken.for_user(user), RefreshToken.for_user(user)
+    BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=first['jti']))
+    blacklist = JtiBlacklist(capacity=100, error_rate=0.01)
+    blacklist.sync()
+
+    # Stamped before the first row, committed after the sync (a slower transaction)
+    row = BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=late['jti']))
+    BlacklistedToken.objects.filter(pk=row.pk).update(blacklisted_at=timezone.now() - timedelta(minutes=1))
+    blacklist.sync()
+
+    assert first['jti'] in blacklist and late['jti'] in blacklist
+    assert blacklist.synced_until == row.pk
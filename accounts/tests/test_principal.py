@@ -0,0 +1,80 @@
+import pytest
+from asgiref.sync import async_to_sync
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import CustomUser, DriverProfile
+from accounts.principal import clear_principals, get_user
+from chat.middleware import user_for_token
+from DropX.authentication import CachedJWTAuthentication
+from DropX.permissions import IsVerifiedDriver
+
+
+@pytest.fixture(autouse=True)
+def empty_principal_cache():
+    clear_principals()
+    yield
+    clear_principals()
+
+
+@pytest.fixture
+def driver(db):
+    user = CustomUser.objects.create_user(
+        email="principal@example.com",
+        password="pass1234",
+        first_name="Cached",
+        last_name="Driver",
+        phone_number="+923001112233",
+        role="Driver",
+    )
+    DriverProfile.objects.create(user=user, license_number="LIC-PRINCIPAL", is_driver_verified=True)
+    return user
+
+
+def authenticated_request(user):
+    request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+    user, _ = CachedJWTAuthentication().authenticate(request)
+    request.user = user
+    return request
+
+
+def test_warm_request_needs_no_auth_queries(driver, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        authenticated_request(driver)
+
+    with django_assert_num_queries(0):
+        request = authenticated_request(driver)
+        assert IsVerifiedDriver().has_permission(request, None)
+        assert request.user == driver
+        assert request.user.email == "principal@example.com"
+
+
+def test_profile_and_user_saves_invalidate_the_principal(driver):
+    assert get_user(driver.id).is_driver_verified is True
+
+    driver.driver_profile.is_driver_verified = False
+    driver.driver_profile.save()
+    assert get_user(driver.id).is_driver_verified is False
+
+    driver.role = "Sender"
+    driver.save()
+    assert get_user(driver.id).role == "Sender"
+
+
+def test_inactive_user_is_rejected_over_http_and_websocket(driver):
+    driver.is_active = False
+    driver.save()
+
+    with pytest.raises(AuthenticationFailed):
+        authenticated_request(driver)
+    assert async_to_sync(user_for_token)(AccessToken.for_user(driver)) is None
+
+
+def test_websocket_shares_the_http_principal(driver, django_assert_num_queries):
+    authenticated_request(driver)
+
+    with django_assert_num_queries(0):
+        user = async_to_sync(user_for_token)(AccessToken.for_user(driver))
+    assert user == driver
+    assert user.is_driver_verified is True
@@ -3,17 +3,20 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import CustomUser, SenderProfile, AuditLog
 from .serializers import CustomUserSerializer, SenderProfileSerializer, AuditLogSerializer
+from DropX.pagination import TimestampCursorPagination
 import logging
 
 logger = logging.getLogger(__name__)
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
@@ -175,9 +178,10 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
         return super().get(request, *args, **kwargs)
 
 class AuditLogListView(generics.ListAPIView):
-    queryset = AuditLog.objects.all()
+    queryset = AuditLog.objects.select_related('user').order_by('-timestamp')
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TimestampCursorPagination
 
 class LogoutView(APIView):
     """Generic logout for any authenticated user"""
@@ -1,14 +1,69 @@
 import json
+import uuid
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.utils import timezone
 from .models import ChatRoom, Message
+from .writer import get_writer, writer_settings
+from .receipts import mark_read_up_to
+
+
+class RoomState:
+    """
+    Who takes part in a chat room, resolved once per connection.
+    Holds ids only, so messages never touch the delivery or user tables.
+    """
+    __slots__ = ('chat_room_id', 'delivery_id', 'sender_id', 'driver_id', 'post_driver_id')
+
+    def __init__(self, chat_room_id, delivery_id, sender_id, driver_id, post_driver_id):
+        self.chat_room_id = chat_room_id
+        self.delivery_id = delivery_id
+        self.sender_id = sender_id
+        self.driver_id = driver_id
+        self.post_driver_id = post_driver_id
+
+    @classmethod
+    def load(cls, chat_room_id):
+        """One query for the room and its participants, None if the room does not exist."""
+        row = ChatRoom.objects.filter(chat_room_id=chat_room_id).values_list(
+            'chat_room_id', 'delivery_id', 'delivery__sender_id', 'delivery__driver_id', 'delivery__driver_post_id__user'
+        ).first()
+        return cls(*row) if row else None
+
+    @property
+    def is_open(self):
+        # No driver yet, any driver may ask about the delivery
+        return self.driver_id is None and self.post_driver_id is None
+
+    def is_participant(self, user):
+        """Sender or assigned driver, without the open-delivery allowance."""
+        return user.id in (self.sender_id, self.driver_id, self.post_driver_id)
+
+    def is_member(self, user):
+        return (
+            user.id in (self.sender_id, self.driver_id, self.post_driver_id)
+            or (user.role == 'driver' and self.is_open)
+        )
+
+    def receiver_for(self, user):
+        """Id of the other side of the conversation for ``user``, or None."""
+        if user.id == self.sender_id:
+            return self.driver_id or self.post_driver_id
+        if user.id in (self.driver_id, self.post_driver_id):
+            return self.sender_id
+        if user.role == 'driver' and self.is_open:
+            return self.sender_id
+        return None
+
+
+def room_group(chat_room_id):
+    return f'chat_{chat_room_id}'
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.chat_room_id = self.scope['url_route']['kwargs']['room_uuid']
-        self.room_group_name = f'chat_{self.chat_room_id}'
+        self.room_group_name = room_group(self.chat_room_id)
+        self.room = None
 
         print(f"🔹 WebSocket connect request: Room ID = {self.chat_room_id}, User = {self.scope['user']}")
 
@@ -23,6 +78,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        await get_writer().flush()
         print(f"Disconnected from room {self.chat_room_id}")
 
     async def receive(self, text_data):
@@ -41,6 +97,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.send(json.dumps({'type': 'pong'}))
             return
 
+        if data.get('type') == 'read_up_to':
+            await self.read_up_to(data.get('message_id'))
+            return
+
         content = data.get('content', '').strip()
         if not content:
             await self.send(json.dumps({"error": "Missing 'content' field"}))
@@ -48,15 +108,23 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return
 
         sender = self.scope['user']
-        receiver = await self.get_receiver(sender)
-        if not receiver:
+        receiver_id = self.room.receiver_for(sender)
+        if not receiver_id:
             await self.send(json.dumps({"error": "Receiver not found"}))
             print("Receiver not found for this chat room")
             return
 
-        print(f"New message from {sender.id} → {receiver.id}: {content}")
-
-        message = await self.save_message(sender, receiver, content)
+        message = Message(
+            chat_room_id=self.room.chat_room_id,
+            sender_id=sender.id,
+            receiver_id=receiver_id,
+            content=content,
+        )
+        if writer_settings()['ENABLED']:
+            # Broadcast now, the writer inserts it with the next batch
+            get_writer().add(message)
+        else:
+            await self.save_message(message)
 
         try:
             await self.channel_layer.group_send(
@@ -66,7 +134,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     'message_id': str(message.message_id),
                     'content': content,
                     'sender_id': str(sender.id),
-                    'receiver_id': str(receiver.id),
+                    'receiver_id': str(receiver_id),
                     'created_at': message.created_at.isoformat(),
                 }
             )
@@ -78,7 +146,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'message_id': str(message.message_id),
                 'content': content,
                 'sender_id': str(sender.id),
-                'receiver_id': str(receiver.id),
+                'receiver_id': str(receiver_id),
                 'created_at': message.created_at.isoformat(),
             })
 
@@ -100,6 +168,44 @@ class ChatConsumer(AsyncWebsocketConsumer):
         }))
         print(f"Broadcasted: {event.get('content') or 'Image message'}")
 
+    async def read_up_to(self, message_id):
+        # The message may still be waiting in the write-behind queue
+        await get_writer().flush()
+        result = await database_sync_to_async(self.mark_read)(message_id)
+        if result is None:
+            await self.send(json.dumps({"error": "Message not found in this room"}))
+            return
+
+        updated, read_until = result
+        await self.channel_layer.group_send(self.room_group_name, {
+            'type': 'messages_read',
+            'reader_id': str(self.scope['user'].id),
+            'message_id': str(message_id),
+            'read_until': read_until.isoformat(),
+            'updated': updated,
+        })
+
+    def mark_read(self, message_id):
+        try:
+            return mark_read_up_to(self.room, self.scope['user'], uuid.UUID(str(message_id)))
+        except ValueError:
+            return None
+
+    async def messages_read(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'messages_read',
+            'reader_id': event['reader_id'],
+            'message_id': event['message_id'],
+            'read_until': event['read_until'],
+            'updated': event['updated'],
+        }))
+
+    async def room_changed(self, event):
+        """The delivery's driver assignment changed, re-resolve the room."""
+        if not await self.is_valid_user():
+            print(f"User {self.scope['user']} no longer part of room {self.chat_room_id}, closing")
+            await self.close()
+
     @database_sync_to_async
     def is_valid_user(self):
         try:
@@ -107,192 +213,21 @@ class ChatConsumer(AsyncWebsocketConsumer):
             if user is None:
                 print("User is None - authentication failed")
                 return False
-            
-            chat_room = ChatRoom.objects.get(chat_room_id=self.chat_room_id)
-            delivery = chat_room.delivery
-            
-            # Check if user is the sender
-            is_sender = user.id == delivery.sender_id.id
-            
-            # Check if user is the driver (via driver_id field)
-            is_driver_direct = delivery.driver_id and user.id == delivery.driver_id.id
-            
-            # Check if user is the driver (via driver_post_id)
-            is_driver_via_post = delivery.driver_post_id and user.id == delivery.driver_post_id.user.id
-            
-            # Allow any driver if no driver assigned yet (for open deliveries)
-            is_any_driver_for_open = (
-                user.role == 'driver' and 
-                delivery.driver_id is None and 
-                delivery.driver_post_id is None
-            )
-            
-            valid = is_sender or is_driver_direct or is_driver_via_post or is_any_driver_for_open
-            
+
+            self.room = RoomState.load(self.chat_room_id)
+            if self.room is None:
+                print("ChatRoom not found")
+                return False
+
+            valid = self.room.is_member(user)
             print(f"User validation for {user}: {valid}")
-            print(f"  - is_sender: {is_sender}, is_driver_direct: {is_driver_direct}, is_driver_via_post: {is_driver_via_post}, is_any_driver_for_open: {is_any_driver_for_open}")
             return valid
-        except ChatRoom.DoesNotExist:
-            print("ChatRoom not found")
-            return False
         except Exception as e:
             print(f"Error in is_valid_user: {e}")
             return False
 
     @database_sync_to_async
-    def get_receiver(self, sender):
-        try:
-            chat_room = ChatRoom.objects.get(chat_room_id=self.chat_room_id)
-            delivery = chat_room.delivery
-
-            # If sender is the package sender, receiver is the driver
-            if sender.id == delivery.sender_id.id:
-                # First check driver_id (direct driver assignment)
-                if delivery.driver_id:
-                    return delivery.driver_id
-                # Then check driver_post_id
-                if delivery.driver_post_id:
-                    return delivery.driver_post_id.user
-                return None
-            
-            # If sender is the driver (via driver_id)
-            if delivery.driver_id and sender.id == delivery.driver_id.id:
-                return delivery.sender_id
-            
-            # If sender is the driver (via driver_post_id)
-            if delivery.driver_post_id and sender.id == delivery.driver_post_id.user.id:
-                return delivery.sender_id
-
-            # If sender is any driver and delivery is open
-            if sender.role == 'driver' and delivery.driver_id is None and delivery.driver_post_id is None:
-                return delivery.sender_id
-
-            return None
-        except ChatRoom.DoesNotExist:
-            return None
-        except Exception as e:
-            print(f"Error in get_receiver: {e}")
-            return None
-
-
-    @database_sync_to_async
-    def save_message(self, sender, receiver, content):
-        chat_room = ChatRoom.objects.get(chat_room_id=self.chat_room_id)
-        message = Message.objects.create(
-            chat_room=chat_room,
-            sender=sender,
-            receiver=receiver,
-            content=content,
-            created_at=timezone.now()
-        )
-        print(f"Saved message: {message.content}")
+    def save_message(self, message):
+        # Ids only: a single INSERT, no lookups
+        message.save(force_insert=True)
         return message
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-# import json
-# from channels.generic.websocket import AsyncWebsocketConsumer
-# from channels.db import database_sync_to_async
-# from .models import ChatRoom, Message
-# from accounts.models import CustomUser
-# from django.utils import timezone
-
-# class ChatConsumer(AsyncWebsocketConsumer):
-#     async def connect(self):
-#         self.chat_room_id = self.scope['url_route']['kwargs']['room_uuid']
-#         self.room_group_name = f'chat_{self.chat_room_id}'
-
-#         # Verify user is part of the chat room
-#         if await self.is_valid_user():
-#             await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-#             await self.accept()
-#         else:
-#             await self.close()
-
-#     async def disconnect(self, close_code):
-#         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
-
-#     async def receive(self, text_data):
-#         if not text_data:
-#             print("⚠️ Empty message received — ignoring")
-#             return
-
-#         try:
-#             data = json.loads(text_data)
-#         except json.JSONDecodeError:
-#             print("❌ Invalid JSON:", text_data)
-#             return
-
-#         content = data.get('content')
-#         sender_id = data.get('sender_id')
-#         receiver_id = data.get('receiver_id')
-
-#         if not all([content, sender_id, receiver_id]):
-#             print("⚠️ Missing required fields:", data)
-#             return
-
-#         message = await self.save_message(sender_id, receiver_id, content)
-
-#         await self.channel_layer.group_send(
-#             self.room_group_name,
-#             {
-#                 'type': 'chat_message',
-#                 'message_id': str(message.message_id),
-#                 'content': content,
-#                 'sender_id': sender_id,
-#                 'receiver_id': receiver_id,
-#                 'created_at': message.created_at.isoformat(),
-#             }
-#         )
-
-
-#     async def chat_message(self, event):
-#         await self.send(text_data=json.dumps({
-#             'message_id': event['message_id'],
-#             'content': event['content'],
-#             'sender_id': event['sender_id'],
-#             'receiver_id': event['receiver_id'],
-#             'created_at': event['created_at'],
-#         }))
-
-#     @database_sync_to_async
-#     def is_valid_user(self):
-#         try:
-#             chat_room = ChatRoom.objects.get(chat_room_id=self.chat_room_id)
-#             user = self.scope['user']
-#             return user in [chat_room.delivery.sender_id, chat_room.delivery.driver_id]
-#         except ChatRoom.DoesNotExist:
-#             return False
-
-#     @database_sync_to_async
-#     def save_message(self, sender_id, receiver_id, content):
-#         chat_room = ChatRoom.objects.get(chat_room_id=self.chat_room_id)
-#         sender = CustomUser.objects.get(id=sender_id)
-#         receiver = CustomUser.objects.get(id=receiver_id)
-#         message = Message.objects.create(
-#             chat_room=chat_room,
-#             sender=sender,
-#             receiver=receiver,
-#             content=content,
-#             created_at=timezone.now()
-#         )
-#         return message
\ No newline at end of file
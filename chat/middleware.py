@@ -1,12 +1,20 @@
 from urllib.parse import parse_qs
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
-from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import AccessToken
+from accounts.principal import cached_principal, get_user, principal_user
 
 print("JWT Middleware Loaded!")  
 
-User = get_user_model()
+
+async def user_for_token(access_token):
+    """Same cached principal as HTTP auth; the database is only hit on a cache miss."""
+    user_id = access_token["user_id"]
+    principal = cached_principal(user_id)
+    user = principal_user(principal) if principal is not None else await database_sync_to_async(get_user)(user_id)
+    if user is None or not user.is_active:
+        return None
+    return user
 
 class JWTAuthMiddleware(BaseMiddleware):
     async def __call__(self, scope, receive, send):
@@ -19,9 +27,7 @@ class JWTAuthMiddleware(BaseMiddleware):
             try:
                 access_token = AccessToken(token[0])
                 print("Token valid:", access_token)
-                user = await database_sync_to_async(User.objects.get)(
-                    id=access_token["user_id"]
-                )
+                user = await user_for_token(access_token)
                 print("User Found:", user)
                 scope["user"] = user
             except Exception as e:
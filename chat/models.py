@@ -1,5 +1,6 @@
 from django.db import models
 import uuid
+from django.utils import timezone
 from accounts.models import CustomUser
 from delivery.models import Delivery
 
@@ -19,7 +20,13 @@ class Message(models.Model):
     content = models.TextField()
     image = models.ImageField(upload_to='chat_images/', null=True, blank=True)
     is_read = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the message is built, not when it is written (see chat.writer)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['chat_room', 'created_at']),
+        ]
 
     def __str__(self):
         return f"Message For {self.sender} From Driver {self.receiver} In ChatRoom "
\ No newline at end of file
@@ -0,0 +1,35 @@
+# chat/receipts.py
+"""
+"Read up to message X" receipts.
+
+Marking a chat read takes one UPDATE for the messages addressed to the reader
+and sent no later than X, instead of one request per message, and one for the
+reader's "New Message" notifications of those same messages. A notification is
+written when its message's transaction commits, after the message's
+``created_at``, so it is matched through ``Notification.chat_message`` rather
+than by its own timestamp.
+"""
+from notification.models import Notification
+from .models import Message
+
+
+def mark_read_up_to(room, user, message_id):
+    """
+    Mark ``user``'s unread messages in ``room`` (a ``RoomState``) up to and
+    including ``message_id`` as read. Returns ``(updated, read_until)`` or
+    None if the message is not in the room.
+    """
+    read_until = Message.objects.filter(
+        chat_room_id=room.chat_room_id, message_id=message_id
+    ).values_list('created_at', flat=True).first()
+    if read_until is None:
+        return None
+
+    updated = Message.objects.filter(
+        chat_room_id=room.chat_room_id, receiver_id=user.id, is_read=False, created_at__lte=read_until
+    ).update(is_read=True)
+    Notification.objects.filter(
+        user_id=user.id, type='New Message', is_read=False,
+        chat_message__chat_room_id=room.chat_room_id, chat_message__created_at__lte=read_until,
+    ).update(is_read=True)
+    return updated, read_until
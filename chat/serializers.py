@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import ChatRoom, Message
 from delivery.models import Delivery
 from accounts.serializers import CustomUserSerializer
+from DropX.serializers import SparseFieldsetsMixin
 
 
 class DeliveryBriefSerializer(serializers.Serializer):
@@ -80,8 +81,8 @@ class ChatRoomSerializer(serializers.ModelSerializer):
         delivery = Delivery.objects.get(delivery_id=delivery_id)
         return ChatRoom.objects.create(delivery=delivery)
 
-class MessageSerializer(serializers.ModelSerializer):
-    sender_id = serializers.UUIDField(source='sender.id', read_only=True)
+class MessageSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    sender_id = serializers.UUIDField(read_only=True)  # the FK column, no join
     receiver = CustomUserSerializer(read_only=True)
     image = serializers.ImageField(required=False, allow_null=True, use_url=True)
     # is_read automatically backend handle 
@@ -89,3 +90,4 @@ class MessageSerializer(serializers.ModelSerializer):
         model = Message
         fields = ['message_id', 'sender_id', 'receiver', 'content', 'image', 'is_read', 'created_at']
         read_only_fields = ['message_id', 'sender_id', 'receiver', 'created_at', 'is_read']
+        expandable_fields = ['receiver']
@@ -1,8 +1,13 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from delivery.models import Delivery
 from payment.models import Payment
 from .models import ChatRoom, Message
-from notification.models import Notification
+from .consumers import room_group
+from notification.dispatch import notify
 from django.utils import timezone
 import logging
 
@@ -39,15 +44,41 @@ def create_chat_room_on_payment(sender, instance, created, **kwargs):
                 created_at=timezone.now()
             )
 
-            Notification.objects.create(
-                user_id=receiver_user,
-                delivery_id=instance.delivery_id,
-                type=f'{instance.payment_method} Payment Pending',
-                message=f'Sender initiated {instance.payment_method} payment for delivery {instance.delivery_id.delivery_id}. Chat to confirm.',
-                created_at=timezone.now()
+            notify(
+                receiver_user, instance.delivery_id, f'{instance.payment_method} Payment Pending',
+                f'Sender initiated {instance.payment_method} payment for delivery {instance.delivery_id.delivery_id}. Chat to confirm.'
             )
 
             logger.info(f"Initial message and notification created for payment {instance.payment_id}")
 
         except Exception as e:
             logger.error(f"Error creating chat room for payment {instance.payment_id}: {str(e)}")
+
+
+# --- Tell open chat connections when the delivery's driver changes ---
+@receiver(post_init, sender=Delivery)
+def remember_chat_participants(sender, instance, **kwargs):
+    instance._chat_participants = (instance.driver_id_id, instance.driver_post_id_id)
+
+
+def announce_participants_changed(delivery_id):
+    """Tell the delivery's open chat connections to re-check who may stay, once the transaction commits."""
+    def send():
+        chat_room_id = ChatRoom.objects.filter(delivery_id=delivery_id).values_list('chat_room_id', flat=True).first()
+        if chat_room_id is None:
+            return
+        try:
+            async_to_sync(get_channel_layer().group_send)(room_group(chat_room_id), {'type': 'room.changed'})
+        except Exception as e:
+            logger.warning(f"Could not notify chat room {chat_room_id} of driver change: {str(e)}")
+
+    transaction.on_commit(send)
+
+
+@receiver(post_save, sender=Delivery)
+def notify_chat_participants_changed(sender, instance, created, **kwargs):
+    participants = (instance.driver_id_id, instance.driver_post_id_id)
+    if created or participants == getattr(instance, '_chat_participants', participants):
+        return
+    instance._chat_participants = participants
+    announce_participants_changed(instance.pk)
@@ -1,3 +1,169 @@
-from django.test import TestCase
+import asyncio
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from accounts.models import CustomUser
+from delivery.models import Delivery
+from .consumers import ChatConsumer, RoomState
+from .writer import MessageWriter
+from .receipts import mark_read_up_to
+from notification.models import Notification
+from datetime import timedelta
+from django.utils import timezone
+from .models import ChatRoom, Message
 
-# Create your tests here.
+
+class ChatRoomMixin:
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(
+            email='sender@example.com', password='pass', phone_number='+923004440001'
+        )
+        self.driver = CustomUser.objects.create_user(
+            email='driver@example.com', password='pass', role='driver', phone_number='+923004440002'
+        )
+        self.other_driver = CustomUser.objects.create_user(
+            email='other@example.com', password='pass', role='driver', phone_number='+923004440003'
+        )
+        self.delivery = Delivery.objects.create(
+            sender_id=self.sender, driver_id=self.driver, pickup_address={}, dropoff_address={}
+        )
+        self.room = ChatRoom.objects.create(delivery=self.delivery)
+
+
+class RoomStateTests(ChatRoomMixin, TestCase):
+    def test_participants_resolved_in_one_query(self):
+        with self.assertNumQueries(1):
+            state = RoomState.load(self.room.chat_room_id)
+        with self.assertNumQueries(0):
+            self.assertEqual(state.receiver_for(self.sender), self.driver.id)
+            self.assertEqual(state.receiver_for(self.driver), self.sender.id)
+            self.assertFalse(state.is_member(self.other_driver))
+
+
+class ReadReceiptTests(ChatRoomMixin, TestCase):
+    def test_read_up_to_marks_earlier_messages_only(self):
+        start = timezone.now() - timedelta(seconds=10)
+        messages = [
+            Message.objects.create(
+                chat_room=self.room, sender=self.sender, receiver=self.driver,
+                content=f'm{i}', created_at=start + timedelta(seconds=i)
+            )
+            for i in range(4)
+        ]
+        # Written on commit, after the messages they are about
+        for message in messages:
+            Notification.objects.create(
+                user_id=self.driver, delivery_id=self.delivery, type='New Message', message='x', chat_message=message
+            )
+
+        room = RoomState.load(self.room.chat_room_id)
+        with self.assertNumQueries(3):
+            updated, _ = mark_read_up_to(room, self.driver, messages[2].message_id)
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(
+            list(Message.objects.order_by('created_at').values_list('is_read', flat=True)),
+            [True, True, True, False]
+        )
+        self.assertEqual(
+            list(Notification.objects.filter(user_id=self.driver, is_read=False).values_list('chat_message', flat=True)),
+            [messages[3].message_id]
+        )
+
+
+class MessageListQueryTests(ChatRoomMixin, TestCase):
+    def page_queries(self, count):
+        Message.objects.bulk_create([
+            Message(chat_room=self.room, sender=self.sender, receiver=self.driver, content=f'm{i}')
+            for i in range(count)
+        ])
+        client = APIClient()
+        client.force_authenticate(self.sender)
+        url = reverse('chat:message-list-create', kwargs={'chat_room_id': self.room.chat_room_id})
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, {'page_size': 20})
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_independent_of_page_size(self):
+        small = self.page_queries(2)
+        self.assertEqual(self.page_queries(8), small)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class ChatConsumerTests(ChatRoomMixin, TransactionTestCase):
+    def communicator(self, user):
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/ws/chat/{self.room.chat_room_id}/')
+        communicator.scope['user'] = user
+        communicator.scope['url_route'] = {'kwargs': {'room_uuid': str(self.room.chat_room_id)}}
+        return communicator
+
+    async def test_message_saved_and_broadcast(self):
+        communicator = self.communicator(self.sender)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        await communicator.send_json_to({'content': 'hello'})
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['message']['receiver_id'], str(self.driver.id))
+        await communicator.disconnect()  # flushes the write-behind queue
+
+        message = await database_sync_to_async(Message.objects.get)(receiver=self.driver)
+        self.assertEqual(str(message.message_id), response['message']['message_id'])
+        self.assertEqual(message.created_at.isoformat(), response['message']['created_at'])
+
+    async def test_read_up_to_event_broadcast(self):
+        message = await database_sync_to_async(Message.objects.create)(
+            chat_room=self.room, sender=self.sender, receiver=self.driver, content='hi'
+        )
+        communicator = self.communicator(self.driver)
+        await communicator.connect()
+
+        await communicator.send_json_to({'type': 'read_up_to', 'message_id': str(message.message_id)})
+        response = await communicator.receive_json_from()
+        self.assertEqual((response['type'], response['updated']), ('messages_read', 1))
+        await communicator.disconnect()
+
+    async def test_reassigned_driver_disconnected(self):
+        communicator = self.communicator(self.driver)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        def reassign():
+            self.delivery.driver_id = self.other_driver
+            self.delivery.save()
+        await database_sync_to_async(reassign)()
+
+        output = await communicator.receive_output()
+        self.assertEqual(output['type'], 'websocket.close')
+
+
+class MessageWriterTests(ChatRoomMixin, TransactionTestCase):
+    def message(self, content):
+        return Message(chat_room=self.room, sender=self.sender, receiver=self.driver, content=content)
+
+    async def test_flushes_on_size_and_timer(self):
+        writer = MessageWriter(flush_interval=0.05, flush_size=3)
+        count = database_sync_to_async(Message.objects.count)
+
+        for i in range(3):
+            writer.add(self.message(f'm{i}'))
+        self.assertEqual(len(writer._tasks), 1)  # held until it finishes
+        await asyncio.sleep(0.01)  # size threshold reached, flush already scheduled
+        self.assertEqual(await count(), 3)
+        self.assertEqual(len(writer._tasks), 0)
+
+        writer.add(self.message('late'))
+        self.assertEqual(await count(), 3)
+        await asyncio.sleep(0.2)
+        self.assertEqual(await count(), 4)
+
+    def test_bad_row_does_not_lose_batch(self):
+        orphan = self.message('orphan')
+        orphan.chat_room_id = self.room.chat_room_id.__class__(int=0)
+        MessageWriter.write([self.message('ok'), orphan])
+        self.assertEqual(list(Message.objects.values_list('content', flat=True)), ['ok'])
@@ -2,11 +2,15 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from DropX.authentication import CachedJWTAuthentication
 from rest_framework.parsers import MultiPartParser, FormParser
 from .models import ChatRoom, Message
 from .serializers import ChatRoomSerializer, MessageSerializer
+from DropX.pagination import CreatedAtCursorPagination
+from .consumers import RoomState, room_group
+from .receipts import mark_read_up_to
 from notification.models import Notification
+from notification.dispatch import notify
 from django.utils import timezone
 from rest_framework.exceptions import PermissionDenied
 from delivery.models import Delivery
@@ -15,11 +19,15 @@ from django.shortcuts import get_object_or_404
 from django.db.models import Q
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
 
 class ChatRoomListCreateView(generics.ListCreateAPIView):
     serializer_class = ChatRoomSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def get_queryset(self):
         user = self.request.user
@@ -44,32 +52,20 @@ class ChatRoomListCreateView(generics.ListCreateAPIView):
 class MessageListCreateView(generics.ListCreateAPIView):
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = CreatedAtCursorPagination  # newest page first, ?cursor= walks back in time
 
     def get_queryset(self):
         chat_room_id = self.kwargs.get('chat_room_id') 
         if not chat_room_id:
             return Message.objects.none()
-        try:
-            chat_room = ChatRoom.objects.get(chat_room_id=chat_room_id)
-            user = self.request.user
-            delivery = chat_room.delivery
-            
-            # Check if user is the sender
-            is_sender = user.id == delivery.sender_id.id
-            
-            # Check if user is the driver (via driver_id or driver_post_id)
-            is_driver = (
-                (delivery.driver_id and user.id == delivery.driver_id.id) or
-                (delivery.driver_post_id and user.id == delivery.driver_post_id.user.id)
-            )
-            
-            if not (is_sender or is_driver):
-                return Message.objects.none()
-            return Message.objects.filter(chat_room=chat_room).order_by('created_at')
-        except ChatRoom.DoesNotExist:
+
+        # Sender or driver (via driver_id or driver_post_id), resolved in one query
+        room = RoomState.load(chat_room_id)
+        if room is None or not room.is_participant(self.request.user):
             return Message.objects.none()
+        return Message.objects.filter(chat_room_id=room.chat_room_id).select_related('receiver')
 
     def perform_create(self, serializer):
         chat_room_id = self.kwargs.get('chat_room_id') 
@@ -81,31 +77,26 @@ class MessageListCreateView(generics.ListCreateAPIView):
         else:
             receiver = chat_room.delivery.sender_id
 
-        serializer.save(
+        message = serializer.save(
             sender=user,
             receiver=receiver,
             chat_room=chat_room
         )
 
-        Notification.objects.create(
-            user_id=receiver,
-            delivery_id=chat_room.delivery,
-            type='New Message',
-            message=f'New message in chat for delivery {chat_room.delivery.delivery_id}.',
-            created_at=timezone.now()
-        )
+        notify(receiver, chat_room.delivery, 'New Message',
+               f'New message in chat for delivery {chat_room.delivery.delivery_id}.', chat_message=message)
 
 
 class MessageDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Message.objects.all()
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     lookup_field = 'message_id'
 
 class MarkMessageAsReadView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request, message_id):
         message = get_object_or_404(Message, message_id=message_id)
@@ -115,17 +106,51 @@ class MarkMessageAsReadView(APIView):
         message.save()
         Notification.objects.filter(
             user_id=request.user.id,
-            delivery_id=message.chat_room.delivery,
+            chat_message=message,
             type='New Message',
             is_read=False
         ).update(is_read=True)
         return Response({'message': 'Message marked as read'}, status=status.HTTP_200_OK)
 
 
+class MarkReadUpToView(APIView):
+    """Mark every message in the room up to and including ``message_id`` as read."""
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [CachedJWTAuthentication]
+
+    def post(self, request, chat_room_id):
+        room = RoomState.load(chat_room_id)
+        if room is None or not room.is_participant(request.user):
+            return Response({'error': 'Chat room not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            message_id = uuid.UUID(str(request.data.get('message_id')))
+        except ValueError:
+            return Response({'error': 'message_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = mark_read_up_to(room, request.user, message_id)
+        if result is None:
+            return Response({'error': 'Message not found in this room'}, status=status.HTTP_404_NOT_FOUND)
+        updated, read_until = result
+
+        try:
+            async_to_sync(get_channel_layer().group_send)(room_group(room.chat_room_id), {
+                'type': 'messages_read',
+                'reader_id': str(request.user.id),
+                'message_id': str(message_id),
+                'read_until': read_until.isoformat(),
+                'updated': updated,
+            })
+        except Exception as e:
+            logger.warning(f"Could not broadcast read receipt for room {room.chat_room_id}: {str(e)}")
+
+        return Response({'updated': updated, 'read_until': read_until}, status=status.HTTP_200_OK)
+
+
 class ImageMessageCreateView(APIView):
     """Upload an image message and broadcast via WebSocket"""
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     parser_classes = [MultiPartParser, FormParser]
 
     def post(self, request, chat_room_id):
@@ -176,13 +201,8 @@ class ImageMessageCreateView(APIView):
         )
 
         # Create notification
-        Notification.objects.create(
-            user_id=receiver,
-            delivery_id=delivery,
-            type='New Message',
-            message=f'New image message in chat for delivery {delivery.delivery_id}.',
-            created_at=timezone.now()
-        )
+        notify(receiver, delivery, 'New Message',
+               f'New image message in chat for delivery {delivery.delivery_id}.', chat_message=message)
 
         # Build full image URL
         image_url = request.build_absolute_uri(message.image.url) if message.image else None
@@ -0,0 +1,114 @@
+# chat/writer.py
+"""
+Write-behind persistence for WebSocket chat messages.
+
+The consumer builds the ``Message`` with its id and timestamp already set,
+broadcasts it straight away and hands it to the process-wide writer. The
+writer inserts pending messages with one ``bulk_create`` every
+``FLUSH_INTERVAL`` seconds, or as soon as ``FLUSH_SIZE`` are waiting.
+
+A message is at most ``FLUSH_INTERVAL`` behind the database. A failed batch is
+retried row by row so one bad message cannot take the rest with it. Consumers
+flush on disconnect, and whatever is still pending when the process exits is
+written by an ``atexit`` hook.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHAT_WRITER = {
+    'ENABLED': True,
+    'FLUSH_INTERVAL': 0.2,
+    'FLUSH_SIZE': 100,
+}
+
+
+def writer_settings():
+    return {**DEFAULT_CHAT_WRITER, **getattr(settings, 'CHAT_WRITER', {})}
+
+
+class MessageWriter:
+    def __init__(self, flush_interval, flush_size):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._pending = []
+        self._lock = threading.Lock()
+        self._timer = None
+        self._timer_loop = None
+        self._tasks = set()  # the loop only keeps weak references to running flushes
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, message):
+        """Queue ``message``; must be called from the event loop."""
+        with self._lock:
+            self._pending.append(message)
+            size = len(self._pending)
+
+        loop = asyncio.get_running_loop()
+        if size >= self.flush_size:
+            self._start_flush(loop)
+        elif self._timer is None or self._timer_loop.is_closed():
+            self._timer_loop = loop
+            self._timer = loop.call_later(self.flush_interval, self._start_flush, loop)
+
+    def _start_flush(self, loop):
+        task = loop.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _take(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return batch
+
+    async def flush(self):
+        batch = self._take()
+        if batch:
+            await database_sync_to_async(self.write)(batch)
+
+    def flush_sync(self):
+        batch = self._take()
+        if batch:
+            self.write(batch)
+
+    @staticmethod
+    def write(batch):
+        try:
+            Message.objects.bulk_create(batch)
+            return
+        except Exception as e:
+            logger.warning(f"Chat batch of {len(batch)} failed, retrying one by one: {str(e)}")
+
+        for message in batch:
+            try:
+                message.save(force_insert=True)
+            except Exception as e:
+                logger.error(f"Dropping chat message {message.message_id}: {str(e)}")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                config = writer_settings()
+                _writer = MessageWriter(config['FLUSH_INTERVAL'], config['FLUSH_SIZE'])
+                atexit.register(_writer.flush_sync)
+    return _writer
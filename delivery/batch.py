@@ -0,0 +1,167 @@
+# delivery/batch.py
+"""
+Batch import of deliveries for business senders.
+
+Rows (JSON array, NDJSON or CSV, see delivery.parsers) are validated one by
+one without touching the database; driver posts and cities for the whole batch
+are then looked up with one query each. Valid rows are written in chunks of
+``DELIVERY_BATCH['CHUNK_SIZE']``, each chunk in its own transaction with one
+``bulk_create`` for deliveries, packages, logs and route jobs. Costs are quoted
+on the offline distance estimate for the whole chunk at once (see pricing.quotes); the route jobs
+reprice on the road route in the background pool, in parallel (see route.jobs).
+
+``bulk_create`` skips post_save, so the "Delivery Created" notifications that
+the signal sends for single deliveries are queued here instead.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from driver_post.models import City, DriverPost
+from notification.dispatch import notify
+from pricing.quotes import quote_delivery
+from route.distance import estimate_delivery_distances
+from route.jobs import enqueue_route_jobs
+from .models import Delivery, DeliveryLog, Package, RouteStatus
+from .parsers import RowError
+from .serializers import BatchDeliverySerializer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DELIVERY_BATCH = {
+    'MAX_ROWS': 1000,  # deliveries per request
+    'CHUNK_SIZE': 200,  # deliveries per transaction
+}
+
+
+def batch_settings():
+    return {**DEFAULT_DELIVERY_BATCH, **getattr(settings, 'DELIVERY_BATCH', {})}
+
+
+class BatchTooLarge(Exception):
+    pass
+
+
+def validate_rows(rows, max_rows):
+    """([(row, validated_data)], {row: errors}) for an iterable of raw rows."""
+    valid, errors = [], {}
+    for index, row in enumerate(rows):
+        if index >= max_rows:
+            raise BatchTooLarge(f"A batch can hold at most {max_rows} deliveries.")
+        if isinstance(row, RowError):
+            errors[index] = {'non_field_errors': [row.detail]}
+            continue
+        if not isinstance(row, dict):
+            errors[index] = {'non_field_errors': ["Expected an object."]}
+            continue
+        serializer = BatchDeliverySerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors[index] = serializer.errors
+    return valid, errors
+
+
+def resolve_cities(valid, errors):
+    """
+    Attach driver posts and cities to the validated rows: one query for the
+    posts, one for the cities named in addresses of rows without a post.
+    """
+    post_ids = {data['driver_post_id'] for _, data in valid if data.get('driver_post_id')}
+    posts = DriverPost.objects.select_related('start_city', 'end_city').in_bulk(post_ids) if post_ids else {}
+
+    names = {
+        data[field]['city']
+        for _, data in valid if not data.get('driver_post_id')
+        for field in ('pickup_address', 'dropoff_address')
+    }
+    cities = {}
+    for city in City.objects.filter(name__in=names).order_by('name', 'city_id') if names else ():
+        cities.setdefault(city.name, city)
+
+    resolved = []
+    for index, data in valid:
+        post_id = data.get('driver_post_id')
+        if post_id:
+            post = posts.get(post_id)
+            if post is None:
+                errors[index] = {'driver_post_id': ["Driver post not found."]}
+                continue
+            data['driver_post'], data['pickup_city'], data['dropoff_city'] = post, post.start_city, post.end_city
+        else:
+            data['driver_post'] = None
+            data['pickup_city'] = cities.get(data['pickup_address']['city'])
+            data['dropoff_city'] = cities.get(data['dropoff_address']['city'])
+        resolved.append((index, data))
+    return resolved
+
+
+def create_chunk(sender, chunk):
+    """Write one chunk of resolved rows; returns [(row, delivery)]."""
+    deliveries = []
+    for _, data in chunk:
+        deliveries.append(Delivery(
+            sender_id=sender,
+            driver_post_id=data['driver_post'],
+            pickup_address=dict(data['pickup_address']),
+            dropoff_address=dict(data['dropoff_address']),
+            pickup_city=data['pickup_city'],
+            dropoff_city=data['dropoff_city'],
+            route_status=RouteStatus.PENDING,
+        ))
+
+    # Quote on the offline estimate like CreateDeliveryWithCostView, one corridor query per chunk
+    for delivery, distance, (_, data) in zip(deliveries, estimate_delivery_distances(deliveries), chunk):
+        delivery.total_cost = quote_delivery(delivery, distance, data['packages']).total
+
+    with transaction.atomic():
+        Delivery.objects.bulk_create(deliveries)
+        Package.objects.bulk_create([
+            Package(delivery_id=delivery, **{**package, 'dimensions': dict(package['dimensions'])})
+            for delivery, (_, data) in zip(deliveries, chunk)
+            for package in data['packages']
+        ])
+        DeliveryLog.objects.bulk_create([
+            DeliveryLog(
+                delivery=delivery,
+                action="Delivery Created",
+                comments=f"Delivery created by {sender.email} (batch import)",
+            )
+            for delivery in deliveries
+        ])
+        for delivery in deliveries:
+            notify(sender, delivery, 'Delivery Created', f'Delivery {delivery.delivery_id} created.')
+        enqueue_route_jobs(deliveries)
+
+    return [(index, delivery) for (index, _), delivery in zip(chunk, deliveries)]
+
+
+def import_deliveries(sender, rows):
+    """
+    Create deliveries for ``sender`` from raw ``rows``. Returns one result per
+    row, in row order: ``created`` with the delivery id and quoted cost, or
+    ``invalid`` with the validation errors. Raises BatchTooLarge.
+    """
+    config = batch_settings()
+    valid, errors = validate_rows(rows, config['MAX_ROWS'])
+    resolved = resolve_cities(valid, errors)
+
+    created = {}
+    size = config['CHUNK_SIZE']
+    for start in range(0, len(resolved), size):
+        for index, delivery in create_chunk(sender, resolved[start:start + size]):
+            created[index] = delivery
+
+    results = []
+    for index in sorted([*created, *errors]):
+        if index in created:
+            delivery = created[index]
+            results.append({
+                'row': index, 'status': 'created',
+                'delivery_id': str(delivery.delivery_id), 'total_cost': str(delivery.total_cost),
+            })
+        else:
+            results.append({'row': index, 'status': 'invalid', 'errors': errors[index]})
+    logger.info(f"Batch import by {sender.email}: {len(created)} created, {len(errors)} invalid")
+    return results
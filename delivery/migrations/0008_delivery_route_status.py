@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+def backfill_route_status(apps, schema_editor):
+    # Deliveries created before the route job pipeline either got their route
+    # synchronously or never will.
+    Delivery = apps.get_model('delivery', 'Delivery')
+    Delivery.objects.filter(route__isnull=False).update(route_status='Ready')
+    Delivery.objects.filter(route__isnull=True).update(route_status='Failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0007_remove_delivery_delivery_date_and_more'),
+        ('route', '0003_alter_route_distance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delivery',
+            name='route_status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Ready', 'Ready'), ('Failed', 'Failed')], default='Pending', max_length=20),
+        ),
+        migrations.RunPython(backfill_route_status, migrations.RunPython.noop),
+    ]
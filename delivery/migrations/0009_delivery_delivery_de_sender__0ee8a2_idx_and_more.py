@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delivery', '0008_delivery_route_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['sender_id', '-created_at'], name='delivery_de_sender__0ee8a2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='delivery',
+            index=models.Index(fields=['driver_post_id', '-created_at'], name='delivery_de_driver__aaec87_idx'),
+        ),
+    ]
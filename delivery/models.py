@@ -4,6 +4,8 @@ from driver_post.models import DriverPost, City
 import uuid
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from decimal import Decimal
+from pricing.quotes import quote_delivery
 
 
 class DeliveryStatus(models.TextChoices):
@@ -14,6 +16,12 @@ class DeliveryStatus(models.TextChoices):
     CANCELLED = 'Cancelled', 'Cancelled'
 
 
+class RouteStatus(models.TextChoices):
+    PENDING = 'Pending', 'Pending'  # priced on the offline estimate, route job queued
+    READY = 'Ready', 'Ready'  # road route stored and cost recomputed
+    FAILED = 'Failed', 'Failed'  # router gave up, estimate kept
+
+
 class Delivery(models.Model):
     delivery_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     sender_id = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='sent_deliveries')
@@ -34,9 +42,16 @@ class Delivery(models.Model):
         choices=DeliveryStatus.choices,
         default=DeliveryStatus.PENDING
     )
+    route_status = models.CharField(max_length=20, choices=RouteStatus.choices, default=RouteStatus.PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['sender_id', '-created_at']),
+            models.Index(fields=['driver_post_id', '-created_at']),
+        ]
+
     def __str__(self):
         return f"Delivery created For {self.pickup_city} To {self.dropoff_city} From {self.sender_id.email}"
 
@@ -59,16 +74,12 @@ class Delivery(models.Model):
             )
         return False
 
+    def cost_for_distance(self, distance):
+        return quote_delivery(self, distance).total
+
     def get_remaining_capacity(self):
         if self.driver_post_id:
-            used_weight = sum(
-                d.packages.aggregate(models.Sum('weight'))['weight__sum'] or 0
-                for d in Delivery.objects.filter(
-                    driver_post_id=self.driver_post_id,
-                    status__in=['Assigned', 'In Transit']
-                )
-            )
-            return self.driver_post_id.max_weight - used_weight
+            return self.driver_post_id.max_weight - self.driver_post_id.booked_weight
         return 0
 
 
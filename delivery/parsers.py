@@ -0,0 +1,104 @@
+# delivery/parsers.py
+"""
+Streaming parsers for the delivery batch endpoint.
+
+Both parsers return a generator, so rows are read from the request body while
+the batch is being validated instead of being loaded in one piece. A row that
+cannot be decoded is yielded as a ``RowError`` and reported against its row
+number; the rest of the upload still goes through.
+
+CSV columns::
+
+    reference, driver_post_id,
+    pickup_address_line, pickup_city, pickup_state, pickup_country, pickup_latitude, pickup_longitude,
+    dropoff_address_line, dropoff_city, ..., dropoff_longitude,
+    package_description, package_weight, package_length, package_width, package_height, package_is_fragile
+
+Each line is one package. Consecutive lines with the same non-empty
+``reference`` are packages of one delivery (address columns are taken from the
+first of them).
+"""
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+
+ADDRESS_FIELDS = ('address_line', 'city', 'state', 'country', 'latitude', 'longitude')
+PACKAGE_FIELDS = ('description', 'weight', 'is_fragile')
+DIMENSION_FIELDS = ('length', 'width', 'height')
+
+
+class RowError:
+    def __init__(self, detail):
+        self.detail = detail
+
+
+def _text(stream, parser_context):
+    encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+    return codecs.getreader(encoding)(stream)
+
+
+class NDJSONParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return self.rows(_text(stream, parser_context))
+
+    @staticmethod
+    def rows(lines):
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield RowError(f"Invalid JSON: {e}")
+
+
+class CSVParser(BaseParser):
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return self.rows(csv.DictReader(_text(stream, parser_context)))
+
+    @staticmethod
+    def package(line):
+        package = {name: line[f'package_{name}'] for name in PACKAGE_FIELDS if line.get(f'package_{name}')}
+        if 'is_fragile' in package:
+            package['is_fragile'] = package['is_fragile'].strip().lower() in ('1', 'true', 'yes')
+        package['dimensions'] = {
+            name: line[f'package_{name}'] for name in DIMENSION_FIELDS if line.get(f'package_{name}')
+        }
+        return package
+
+    @classmethod
+    def delivery(cls, line):
+        # pickup_city -> pickup_address['city'] etc.
+        delivery = {
+            f'{prefix}_address': {name: line.get(f'{prefix}_{name}') or '' for name in ADDRESS_FIELDS}
+            for prefix in ('pickup', 'dropoff')
+        }
+        if line.get('driver_post_id'):
+            delivery['driver_post_id'] = line['driver_post_id']
+        delivery['packages'] = [cls.package(line)]
+        return delivery
+
+    @classmethod
+    def rows(cls, reader):
+        current, reference = None, None
+        for line in reader:
+            if None in line:
+                yield RowError(f"Line {reader.line_num} has more values than the header.")
+                continue
+            line_reference = (line.get('reference') or '').strip()
+            if current is not None and line_reference and line_reference == reference:
+                current['packages'].append(cls.package(line))
+                continue
+            if current is not None:
+                yield current
+            current, reference = cls.delivery(line), line_reference
+        if current is not None:
+            yield current
@@ -4,9 +4,12 @@ from accounts.models import CustomUser
 from accounts.serializers import CustomUserSerializer
 from driver_post.serializers import DriverPostSerializer, CitySerializer
 from decimal import Decimal
+from pricing.quotes import quote_delivery
+from route.distance import estimate_delivery_distance
 from route.models import Route
 from route.serializers import RouteSerializer
 from django.utils import timezone
+from DropX.serializers import SparseFieldsetsMixin
 
 
 class DimensionsSerializer(serializers.Serializer):
@@ -53,9 +56,9 @@ class DeliveryWriteSerializer(serializers.ModelSerializer):
         fields = [
             'delivery_id', 'sender_id', 'driver_id', 'driver_post_id',
             'pickup_address', 'dropoff_address', 
-             'total_cost', 'status', 'packages',
+             'total_cost', 'status', 'route_status', 'packages',
         ]
-        read_only_fields = ['delivery_id', 'sender_id', 'driver_id', ]
+        read_only_fields = ['delivery_id', 'sender_id', 'driver_id', 'status', 'route_status', ]  # status moves through delivery.transitions
 
     def create(self, validated_data):
         pickup_data = validated_data.pop('pickup_address')
@@ -72,13 +75,11 @@ class DeliveryWriteSerializer(serializers.ModelSerializer):
 
         delivery = super().create(validated_data)
 
-        # calculate total_cost
-        total_weight = sum(Decimal(p['weight']) for p in packages_data)
-        delivery.total_cost = total_weight * Decimal("0.5")  # example calculation
-        delivery.save()
+        # Quote on the offline distance estimate; the route job reprices on the road route
+        delivery.total_cost = quote_delivery(delivery, estimate_delivery_distance(delivery), packages_data).total
+        delivery.save(update_fields=['total_cost', 'updated_at'])
 
-        for package_data in packages_data:
-            Package.objects.create(delivery_id=delivery, **package_data)
+        Package.objects.bulk_create([Package(delivery_id=delivery, **package_data) for package_data in packages_data])
 
         return delivery
     
@@ -93,7 +94,18 @@ class DeliveryWriteSerializer(serializers.ModelSerializer):
 
 
 
-class DeliveryReadSerializer(serializers.ModelSerializer):
+class BatchDeliverySerializer(serializers.Serializer):
+    """
+    One row of a batch import (see delivery.batch). ``driver_post_id`` is a
+    plain UUID here; posts for the whole batch are looked up in one query.
+    """
+    pickup_address = AddressSerializer()
+    dropoff_address = AddressSerializer()
+    packages = PackageSerializer(many=True, allow_empty=False)
+    driver_post_id = serializers.UUIDField(required=False, allow_null=True)
+
+
+class DeliveryReadSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     sender_id = CustomUserSerializer(read_only=True)
     driver_id = CustomUserSerializer(read_only=True)
     driver_post_id = DriverPostSerializer(read_only=True)
@@ -112,15 +124,38 @@ class DeliveryReadSerializer(serializers.ModelSerializer):
             'delivery_id', 'sender_id', 'driver_id', 'driver_post_id',
             'pickup_address', 'dropoff_address',
             'pickup_city', 'dropoff_city',
-            'total_cost', 'status',
+            'total_cost', 'status', 'route_status',
             'created_at', 'updated_at', 'packages', 'logs', 'route', 
         ]
         read_only_fields = [
             'delivery_id', 'sender_id', 'driver_id', 'created_at',
-            'updated_at', 'logs', 'route', 
+            'updated_at', 'logs', 'route', 'route_status',
         ]
+        expandable_fields = ['driver_post_id', 'packages', 'logs', 'route']
+
+    @staticmethod
+    def setup_eager_loading(queryset, prefix='', fields=None):
+        """
+        Load everything this serializer touches in a fixed number of queries.
+        ``prefix`` is the lookup path when deliveries are nested in another
+        serializer, e.g. ``'delivery_id__'`` for notifications. ``fields``
+        limits loading to the relations a sparse fieldset actually renders.
+        """
+        def wanted(paths):
+            return [prefix + path for path in paths if fields is None or path.split('__')[0] in fields]
+
+        return queryset.select_related(*wanted((
+            'sender_id', 'driver_id', 'pickup_city', 'dropoff_city', 'route',
+            'driver_post_id__user', 'driver_post_id__vehicle',
+            'driver_post_id__start_city', 'driver_post_id__end_city',
+        ))).prefetch_related(*wanted((
+            'packages', 'logs', 'driver_post_id__logs',
+        )))
 
     def get_route(self, obj):
-        route = Route.objects.filter(delivery_id=obj).first()
-        return RouteSerializer(route).data if route else None
+        try:
+            route = obj.route  # cached by select_related('route'), None-safe
+        except Route.DoesNotExist:
+            return None
+        return RouteSerializer(route).data
 
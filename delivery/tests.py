@@ -1,3 +1,310 @@
+import json
+from datetime import date, time, timedelta
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from accounts.models import CustomUser
+from chat.models import ChatRoom
+from driver_post.models import City, DriverPost, PostLog
+from notification.models import Notification
+from payment.models import Payment
+from route.models import Route
+from vehicle.models import Vehicle
+from .models import Delivery, DeliveryLog, DeliveryStatus, Package
+from .serializers import DeliveryReadSerializer, DeliveryWriteSerializer
+from .transitions import TransitionConflict, TransitionError, complete_payment, for_transition, transition
+from DropX.pagination import CreatedAtCursorPagination
 
-# Create your tests here.
+
+class DeliveryReadQueryTests(TestCase):
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(
+            email='sender@example.com', password='pass', phone_number='+923001110001'
+        )
+        self.driver = CustomUser.objects.create_user(
+            email='driver@example.com', password='pass', phone_number='+923001110002'
+        )
+        self.peshawar = City.objects.create(name='Peshawar', country='Pakistan', latitude=34.0151, longitude=71.5249)
+        self.islamabad = City.objects.create(name='Islamabad', country='Pakistan', latitude=33.6844, longitude=73.0479)
+        vehicle = Vehicle.objects.create(
+            user=self.driver, make='Suzuki', model='Bolan', year=2020, number_plate='ABC-123'
+        )
+        self.post = DriverPost.objects.create(
+            user=self.driver, vehicle=vehicle, start_city=self.peshawar, end_city=self.islamabad,
+            departure_date=date.today() + timedelta(days=1), departure_time=time(9, 0), max_weight=500,
+            start_latitude=34.0151, start_longitude=71.5249, end_latitude=33.6844, end_longitude=73.0479,
+        )
+        PostLog.objects.create(post=self.post, action='Post Created')
+
+    def address(self, city, lat, lon):
+        return {'address_line': 'Main Road', 'city': city, 'state': '', 'country': 'Pakistan',
+                'latitude': lat, 'longitude': lon}
+
+    def make_deliveries(self, count):
+        for i in range(count):
+            delivery = Delivery.objects.create(
+                sender_id=self.sender, driver_id=self.driver, driver_post_id=self.post,
+                pickup_address=self.address('Peshawar', 34.0151, 71.5249),
+                dropoff_address=self.address('Islamabad', 33.6844, 73.0479),
+                pickup_city=self.peshawar, dropoff_city=self.islamabad,
+            )
+            Package.objects.create(delivery_id=delivery, description='Box', weight=5, dimensions={})
+            DeliveryLog.objects.create(delivery=delivery, action='Delivery Created')
+            if i % 2:
+                Route.objects.create(delivery_id=delivery, distance=190)
+
+    def count_queries(self):
+        queryset = DeliveryReadSerializer.setup_eager_loading(Delivery.objects.filter(sender_id=self.sender))
+        with CaptureQueriesContext(connection) as queries:
+            data = DeliveryReadSerializer(queryset, many=True).data
+        return len(queries), data
+
+    def test_query_count_independent_of_page_size(self):
+        self.make_deliveries(2)
+        small, _ = self.count_queries()
+        self.make_deliveries(8)
+        large, data = self.count_queries()
+
+        self.assertEqual(small, large)
+        self.assertEqual(len(data), 10)
+        self.assertEqual(sum(1 for d in data if d['route']), 5)
+        self.assertEqual(len(data[0]['driver_post_id']['logs']), 1)
+
+    def request(self, query=''):
+        return Request(APIRequestFactory().get('/api/delivery/' + query))
+
+    def test_sparse_fieldsets(self):
+        self.make_deliveries(1)
+        queryset = Delivery.objects.all()
+
+        full = DeliveryReadSerializer(queryset, many=True, context={'request': self.request()}).data[0]
+        self.assertIn('logs', full)
+
+        card = DeliveryReadSerializer(queryset, many=True, context={'request': self.request('?expand=packages')}).data[0]
+        self.assertIn('packages', card)
+        self.assertNotIn('logs', card)
+        self.assertNotIn('driver_post_id', card)
+        self.assertIn('sender_id', card)
+
+        slim = DeliveryReadSerializer(queryset, many=True, context={'request': self.request('?fields=delivery_id,status')}).data[0]
+        self.assertEqual(set(slim), {'delivery_id', 'status'})
+
+    def test_cursor_pages_do_not_overlap(self):
+        self.make_deliveries(5)
+        paginator = CreatedAtCursorPagination()
+        queryset = Delivery.objects.filter(sender_id=self.sender)
+
+        first = paginator.paginate_queryset(queryset, self.request('?page_size=3'))
+        next_url = paginator.get_next_link()
+        second = paginator.paginate_queryset(queryset, Request(APIRequestFactory().get(next_url)))
+
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({d.pk for d in first} & {d.pk for d in second})
+
+
+class DeliveryTransitionTests(TestCase):
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(
+            email='sender@example.com', password='pass', phone_number='+923001110011'
+        )
+        self.receiver = CustomUser.objects.create_user(
+            email='receiver@example.com', password='pass', phone_number='+923001110012'
+        )
+        self.driver = CustomUser.objects.create_user(
+            email='driver@example.com', password='pass', phone_number='+923001110013', role='Driver'
+        )
+        peshawar = City.objects.create(name='Peshawar', country='Pakistan', latitude=34.0151, longitude=71.5249)
+        islamabad = City.objects.create(name='Islamabad', country='Pakistan', latitude=33.6844, longitude=73.0479)
+        vehicle = Vehicle.objects.create(
+            user=self.driver, make='Suzuki', model='Bolan', year=2020, number_plate='ABC-124'
+        )
+        self.post = DriverPost.objects.create(
+            user=self.driver, vehicle=vehicle, start_city=peshawar, end_city=islamabad,
+            departure_date=date.today() + timedelta(days=1), departure_time=time(9, 0), max_weight=50,
+            start_latitude=34.0151, start_longitude=71.5249, end_latitude=33.6844, end_longitude=73.0479,
+        )
+        self.delivery = Delivery.objects.create(
+            sender_id=self.sender, receiver_id=self.receiver, driver_post_id=self.post,
+            pickup_address={'city': 'Peshawar'}, dropoff_address={'city': 'Islamabad'},
+            pickup_city=peshawar, dropoff_city=islamabad,
+        )
+        Package.objects.create(delivery_id=self.delivery, description='Box', weight=20, dimensions={})
+
+    def load(self):
+        return for_transition().get(pk=self.delivery.pk)
+
+    def booked_weight(self):
+        self.post.refresh_from_db(fields=['booked_weight', 'status'])
+        return self.post.booked_weight
+
+    def test_accept_pickup_complete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(self.load(), DeliveryStatus.ASSIGNED, self.driver, driver=self.driver)
+        self.assertEqual(self.booked_weight(), 20)
+        self.assertEqual(self.post.status, 'Booked')
+        self.assertTrue(ChatRoom.objects.filter(delivery=self.delivery).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(self.load(), DeliveryStatus.IN_TRANSIT, self.driver)
+            transition(self.load(), DeliveryStatus.DELIVERED, self.driver)
+
+        self.delivery.refresh_from_db()
+        self.assertEqual(self.delivery.status, DeliveryStatus.DELIVERED)
+        self.assertEqual(self.delivery.driver_id, self.driver)
+        self.assertEqual(self.booked_weight(), 0)
+        self.assertEqual(
+            list(DeliveryLog.objects.filter(delivery=self.delivery).order_by('created_at').values_list('action', flat=True)),
+            ['Delivery Accepted', 'Delivery Picked Up', 'Delivery Completed'],
+        )
+        for user in (self.sender, self.receiver):
+            self.assertEqual(
+                set(Notification.objects.filter(user_id=user).values_list('type', flat=True)),
+                {'Delivery Created', 'Delivery Accepted', 'Delivery In Transit', 'Delivery Completed'},
+            )
+
+    def test_invalid_transition_changes_nothing(self):
+        with self.assertRaises(TransitionError):
+            transition(self.load(), DeliveryStatus.DELIVERED, self.driver)
+        with self.assertRaises(TransitionError):
+            transition(self.load(), DeliveryStatus.ASSIGNED, self.driver)  # no driver
+
+        self.delivery.refresh_from_db()
+        self.assertEqual(self.delivery.status, DeliveryStatus.PENDING)
+        self.assertFalse(DeliveryLog.objects.filter(delivery=self.delivery).exists())
+
+    def test_status_is_read_only_on_write_serializer(self):
+        serializer = DeliveryWriteSerializer(self.delivery, data={'status': DeliveryStatus.DELIVERED}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertNotIn('status', serializer.validated_data)
+
+    def test_accept_over_capacity_rolls_back(self):
+        Package.objects.create(delivery_id=self.delivery, description='Crate', weight=40, dimensions={})
+
+        with self.assertRaises(TransitionError):
+            transition(self.load(), DeliveryStatus.ASSIGNED, self.driver, driver=self.driver)
+
+        self.delivery.refresh_from_db()
+        self.assertEqual(self.delivery.status, DeliveryStatus.PENDING)
+        self.assertEqual(self.booked_weight(), 0)
+        self.assertFalse(ChatRoom.objects.filter(delivery=self.delivery).exists())
+
+    def test_cancel_after_accept_releases_capacity(self):
+        transition(self.load(), DeliveryStatus.ASSIGNED, self.driver, driver=self.driver)
+        transition(self.load(), DeliveryStatus.CANCELLED, self.sender)
+        self.assertEqual(self.booked_weight(), 0)
+
+    def test_query_budget(self):
+        delivery = self.load()
+        # savepoint, delivery, weight, reserve, post status, chat room, logs, release savepoint
+        with self.assertNumQueries(8):
+            transition(delivery, DeliveryStatus.ASSIGNED, self.driver, driver=self.driver)
+        delivery = self.load()
+        # savepoint, delivery, logs, release savepoint
+        with self.assertNumQueries(4):
+            transition(delivery, DeliveryStatus.IN_TRANSIT, self.driver)
+
+    def test_concurrent_transition_conflicts(self):
+        first, second = self.load(), self.load()
+        transition(first, DeliveryStatus.ASSIGNED, self.driver, driver=self.driver)
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertRaises(TransitionConflict):
+                transition(second, DeliveryStatus.ASSIGNED, self.driver, driver=self.driver)
+        # Only the guarded UPDATE ran, and it writes the changed columns only
+        statements = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(statements), 1)
+        self.assertIn('"status" = ', statements[0])
+        self.assertNotIn('total_cost', statements[0])
+
+        self.assertEqual(second.status, DeliveryStatus.PENDING)
+        self.assertEqual(self.booked_weight(), 20)
+        self.assertEqual(DeliveryLog.objects.filter(delivery=self.delivery, action='Delivery Accepted').count(), 1)
+
+    def test_payment_completion_moves_delivery_in_transit(self):
+        transition(self.load(), DeliveryStatus.ASSIGNED, self.driver, driver=self.driver)
+        payment = Payment.objects.create(
+            delivery_id=self.load(), user_id=self.sender, amount=100, payment_method='Cash', payment_status='Pending'
+        )
+
+        complete_payment(Payment.objects.select_related('delivery_id').get(pk=payment.pk), self.driver)
+
+        payment.refresh_from_db()
+        self.delivery.refresh_from_db()
+        self.assertEqual(payment.payment_status, 'Completed')
+        self.assertEqual(self.delivery.status, DeliveryStatus.IN_TRANSIT)
+        self.assertEqual(DeliveryLog.objects.filter(delivery=self.delivery, action='Payment Completed').count(), 1)
+
+
+class DeliveryBatchTests(TestCase):
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(
+            email='merchant@example.com', password='pass', phone_number='+923001110021', role='Sender'
+        )
+        City.objects.create(name='Peshawar', country='Pakistan', latitude=34.0151, longitude=71.5249)
+        City.objects.create(name='Islamabad', country='Pakistan', latitude=33.6844, longitude=73.0479)
+        self.client = APIClient()
+        self.client.force_authenticate(self.sender)
+        self.url = reverse('delivery:delivery-batch')
+
+    def row(self, weight=5):
+        return {
+            'pickup_address': {'address_line': 'Main Road', 'city': 'Peshawar', 'state': '', 'country': 'Pakistan',
+                               'latitude': 34.0151, 'longitude': 71.5249},
+            'dropoff_address': {'address_line': 'Blue Area', 'city': 'Islamabad', 'state': '', 'country': 'Pakistan',
+                                'latitude': 33.6844, 'longitude': 73.0479},
+            'packages': [{'description': 'Box', 'weight': str(weight), 'dimensions': {'length': 10}}],
+        }
+
+    def post_json(self, rows):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, rows, format='json')
+        return response, len(queries)
+
+    def test_json_batch_reports_each_row(self):
+        rows = [self.row(), {'packages': []}, self.row(weight=10)]
+        response, _ = self.post_json(rows)
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'invalid', 'created'])
+        self.assertIn('pickup_address', response.data['results'][1]['errors'])
+
+        delivery = Delivery.objects.get(pk=response.data['results'][2]['delivery_id'])
+        self.assertEqual(delivery.pickup_city.name, 'Peshawar')
+        self.assertEqual(delivery.packages.get().weight, 10)
+        self.assertGreater(delivery.total_cost, 5)
+        self.assertEqual(delivery.logs.get().action, 'Delivery Created')
+        self.assertEqual(delivery.route_jobs.count(), 1)
+
+    def test_query_count_independent_of_batch_size(self):
+        _, small = self.post_json([self.row() for _ in range(2)])
+        _, large = self.post_json([self.row() for _ in range(20)])
+        self.assertEqual(small, large)
+        self.assertEqual(Delivery.objects.count(), 22)
+
+    def test_ndjson_and_csv(self):
+        ndjson = '\n'.join(json.dumps(self.row()) for _ in range(2)) + '\n{broken\n'
+        response = self.client.post(self.url, ndjson, content_type='application/x-ndjson')
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'created', 'invalid'])
+
+        header = ('reference,pickup_address_line,pickup_city,pickup_latitude,pickup_longitude,'
+                  'dropoff_address_line,dropoff_city,dropoff_latitude,dropoff_longitude,package_description,package_weight')
+        lines = [
+            'A,Main Road,Peshawar,34.0151,71.5249,Blue Area,Islamabad,33.6844,73.0479,Box,5',
+            'A,,,,,,,,,Envelope,1',
+            'B,Main Road,Peshawar,34.0151,71.5249,Blue Area,Islamabad,33.6844,73.0479,Crate,20',
+        ]
+        response = self.client.post(self.url, '\n'.join([header, *lines]), content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        first = Delivery.objects.get(pk=response.data['results'][0]['delivery_id'])
+        self.assertEqual(sorted(first.packages.values_list('description', flat=True)), ['Box', 'Envelope'])
+
+    def test_batch_size_limit(self):
+        with self.settings(DELIVERY_BATCH={'MAX_ROWS': 2}):
+            response, _ = self.post_json([self.row() for _ in range(3)])
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Delivery.objects.exists())
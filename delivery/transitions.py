@@ -0,0 +1,182 @@
+# delivery/transitions.py
+"""
+Delivery state machine.
+
+    Pending -> Assigned -> In Transit -> Delivered
+       |           |
+       +-----------+--> Cancelled
+
+``transition()`` validates the move and writes the delivery and all of its side
+effects inside one transaction: the DeliveryLog rows with one ``bulk_create``,
+the notifications through ``notification.dispatch`` (one ``bulk_create`` on
+commit), the post's capacity booking, the chat room on assignment and the
+payment when a driver confirms it. Side effects used to come from post_save
+signals on Delivery and Payment that saved each other again; none of that
+runs on this path, so every transition has a fixed, small number of queries.
+
+The status change itself is one ``UPDATE ... WHERE status=<expected>`` that
+writes only the changed columns, and it runs first: of two concurrent requests
+for the same move only one matches the row, the other gets
+``TransitionConflict`` (409 in the views) before doing any other work.
+
+Pass deliveries loaded with ``for_transition()`` so the sender, receiver and
+post used for notifications don't cost extra queries.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from chat.models import ChatRoom
+from chat.signals import announce_participants_changed
+from driver_post.capacity import delivery_weight, release_weight, reserve_weight
+from driver_post.models import DriverPost
+from notification.dispatch import notify
+from payment.models import Payment
+from .models import Delivery, DeliveryLog, DeliveryStatus
+
+
+class TransitionError(Exception):
+    """The delivery can't make the requested move (wrong status, no capacity)."""
+
+
+class TransitionConflict(TransitionError):
+    """The delivery's status changed since it was loaded, another request got there first."""
+
+
+ALLOWED_TRANSITIONS = {
+    DeliveryStatus.PENDING: {DeliveryStatus.ASSIGNED, DeliveryStatus.CANCELLED},
+    DeliveryStatus.ASSIGNED: {DeliveryStatus.IN_TRANSIT, DeliveryStatus.CANCELLED},
+    DeliveryStatus.IN_TRANSIT: {DeliveryStatus.DELIVERED},
+}
+
+# status -> (log action, log comment, notification type, message to sender, message to receiver)
+EVENTS = {
+    DeliveryStatus.ASSIGNED: (
+        "Delivery Accepted", "Delivery accepted by {actor}", 'Delivery Accepted',
+        'Delivery {id} accepted by driver {driver}.', 'Delivery {id} has been accepted by a driver.',
+    ),
+    DeliveryStatus.IN_TRANSIT: (
+        "Delivery Picked Up", "Picked up by {actor}", 'Delivery In Transit',
+        'Delivery {id} is in transit.', 'Delivery {id} is on its way.',
+    ),
+    DeliveryStatus.DELIVERED: (
+        "Delivery Completed", "Delivered by {actor}", 'Delivery Completed',
+        'Delivery {id} has been delivered.', 'Delivery {id} has been delivered to you.',
+    ),
+    DeliveryStatus.CANCELLED: (
+        "Delivery Cancelled", "Cancelled by {actor}", 'Delivery Cancelled',
+        'Delivery {id} has been cancelled.', 'Delivery {id} has been cancelled.',
+    ),
+}
+
+
+TRANSITION_RELATED = ('sender_id', 'receiver_id', 'driver_id', 'driver_post_id')
+
+
+def for_transition(queryset=None):
+    queryset = Delivery.objects.all() if queryset is None else queryset
+    return queryset.select_related(*TRANSITION_RELATED)
+
+
+def can_transition(delivery, to_status):
+    return to_status in ALLOWED_TRANSITIONS.get(delivery.status, ())
+
+
+def transition(delivery, to_status, actor, driver=None, payment=None, action=None, comments=None):
+    """
+    Move ``delivery`` to ``to_status`` on behalf of ``actor``.
+
+    ``driver`` is required for Assigned. ``payment`` (Pending) is marked Completed
+    in the same transaction, for drivers confirming payment at pickup.
+    ``action``/``comments`` override the DeliveryLog entry. Raises TransitionError,
+    or TransitionConflict when the row is no longer in ``delivery.status``.
+    """
+    from_status = delivery.status
+    if not can_transition(delivery, to_status):
+        raise TransitionError(f"Cannot move delivery from {from_status} to {to_status}.")
+    if to_status == DeliveryStatus.ASSIGNED and driver is None:
+        raise TransitionError("A driver is required to assign a delivery.")
+
+    log_action, log_comment, notif_type, sender_message, receiver_message = EVENTS[to_status]
+    now = timezone.now()
+    logs = []
+
+    with transaction.atomic():
+        changes = {'status': to_status, 'updated_at': now}
+        if to_status == DeliveryStatus.ASSIGNED:
+            changes['driver_id'] = driver
+        if not Delivery.objects.filter(pk=delivery.pk, status=from_status).update(**changes):
+            raise TransitionConflict(f"Delivery {delivery.delivery_id} is no longer {from_status}.")
+        post_id = delivery.driver_post_id_id
+
+        if to_status == DeliveryStatus.ASSIGNED:
+            # Capacity check and booking are one conditional UPDATE on the post row;
+            # raising here rolls the status update back too
+            if post_id and not reserve_weight(post_id, delivery_weight(delivery)):
+                raise TransitionError("Total package weight exceeds remaining capacity.")
+            if post_id:
+                DriverPost.objects.filter(pk=post_id).update(status='Booked', updated_at=now)
+            ChatRoom.objects.bulk_create([ChatRoom(delivery=delivery)], ignore_conflicts=True)
+            # update() skips the post_save signal that would announce the new driver
+            announce_participants_changed(delivery.pk)
+
+        elif to_status == DeliveryStatus.DELIVERED or (
+            to_status == DeliveryStatus.CANCELLED and from_status == DeliveryStatus.ASSIGNED
+        ):
+            if post_id:
+                release_weight(post_id, delivery_weight(delivery))
+
+        for field, value in changes.items():
+            setattr(delivery, field, value)
+        delivery._chat_participants = (delivery.driver_id_id, delivery.driver_post_id_id)  # already announced
+
+        logs.append(DeliveryLog(
+            delivery=delivery,
+            action=action or log_action,
+            comments=comments or log_comment.format(actor=actor.email),
+            created_at=now,
+        ))
+
+        if payment is not None and payment.payment_status == 'Pending':
+            log = _complete_payment(payment, delivery, actor, now)
+            if log is not None:
+                logs.append(log)
+
+        DeliveryLog.objects.bulk_create(logs)
+
+        assigned_driver = delivery.driver_id
+        notify(delivery.sender_id, delivery, notif_type, sender_message.format(
+            id=delivery.delivery_id, driver=assigned_driver.email if assigned_driver else "unknown"
+        ))
+        if delivery.receiver_id_id:
+            notify(delivery.receiver_id, delivery, notif_type, receiver_message.format(id=delivery.delivery_id))
+
+    return delivery
+
+
+def _complete_payment(payment, delivery, actor, now):
+    # None when a concurrent request completed the payment first
+    if not Payment.objects.filter(pk=payment.pk, payment_status='Pending').update(
+        payment_status='Completed', updated_at=now
+    ):
+        return None
+    payment.payment_status = 'Completed'
+    notify(delivery.sender_id, delivery, 'Payment Completed',
+           f'Payment of {payment.amount} completed for delivery {delivery.delivery_id}.')
+    return DeliveryLog(delivery=delivery, action="Payment Completed",
+                       comments=f"Driver {actor.first_name} confirmed the payment.", created_at=now)
+
+
+def complete_payment(payment, actor):
+    """
+    Driver confirms a pending payment. An Assigned delivery moves to In Transit in
+    the same transaction; otherwise only the payment and its log/notification change.
+    """
+    delivery = payment.delivery_id
+    if delivery.status == DeliveryStatus.ASSIGNED:
+        return transition(delivery, DeliveryStatus.IN_TRANSIT, actor, payment=payment)
+    with transaction.atomic():
+        log = _complete_payment(payment, delivery, actor, timezone.now())
+        if log is None:
+            raise TransitionConflict(f"Payment {payment.payment_id} is no longer Pending.")
+        log.save()
+    return delivery
@@ -9,6 +9,7 @@ urlpatterns = [
     path('<uuid:delivery_id>/accept/', views.DeliveryAcceptView.as_view(), name='delivery-accept'),
     path('<uuid:delivery_id>/reject/', views.DeliveryRejectView.as_view(), name='delivery-reject'),
     path('create-with-cost/', views.CreateDeliveryWithCostView.as_view(), name='create-with-cost'),
+    path('batch/', views.DeliveryBatchCreateView.as_view(), name='delivery-batch'),
     path('driver/pending-deliveries/', views.DriverPendingDeliveryListView.as_view(), name='driver-pending-deliveries'),
 
     path('<uuid:delivery_id>/accept/', views.DeliveryAcceptView.as_view(), name='delivery-accept'),
@@ -1,28 +1,34 @@
 from rest_framework import generics, status
 from rest_framework.views import APIView
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from .models import Delivery, DeliveryStatus, DeliveryLog, Package
+from DropX.authentication import CachedJWTAuthentication
+from .models import Delivery, DeliveryStatus, DeliveryLog, Package, RouteStatus
 from .serializers import DeliveryReadSerializer, DeliveryWriteSerializer
+from .batch import BatchTooLarge, import_deliveries
+from .parsers import CSVParser, NDJSONParser
+from .transitions import TransitionConflict, TransitionError, can_transition, for_transition, transition
 from notification.models import Notification
 from rest_framework import generics, filters
 
 from django.utils import timezone
 from route.models import Route
-import requests
+from route.jobs import enqueue_route_job
 from DropX.permissions import IsSender, IsVerifiedDriver
+from DropX.pagination import CreatedAtCursorPagination
 import logging
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction
 
 logger = logging.getLogger(__name__)
 
 
 class DeliveryListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated, IsSender]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     serializer_class = DeliveryReadSerializer
+    pagination_class = CreatedAtCursorPagination
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['created_at', 'total_cost', 'status']
     # ordering = ['-created_at']
@@ -33,7 +39,12 @@ class DeliveryListCreateView(generics.ListCreateAPIView):
         return DeliveryReadSerializer
 
     def get_queryset(self):
-        return Delivery.objects.filter(sender_id=self.request.user)
+        queryset = Delivery.objects.filter(sender_id=self.request.user)
+        if self.request.method == "GET":
+            queryset = DeliveryReadSerializer.setup_eager_loading(
+                queryset, fields=DeliveryReadSerializer.requested_fields(self.request)
+            )
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(sender_id=self.request.user)
@@ -44,7 +55,12 @@ class DeliveryDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Delivery.objects.all()
     lookup_field = 'delivery_id'
     permission_classes = [IsAuthenticated, IsSender | IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
+
+    def get_queryset(self):
+        if self.request.method == "GET":
+            return DeliveryReadSerializer.setup_eager_loading(Delivery.objects.all())
+        return Delivery.objects.all()
 
     def get_serializer_class(self):
         if self.request.method in ["PUT", "PATCH"]:
@@ -54,139 +70,120 @@ class DeliveryDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class DeliveryAcceptView(APIView):
     permission_classes = [IsAuthenticated, IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request, delivery_id):
         try:
-            delivery = Delivery.objects.get(delivery_id=delivery_id, status=DeliveryStatus.PENDING)
+            delivery = for_transition().select_related(
+                'driver_post_id__start_city', 'driver_post_id__end_city'
+            ).get(delivery_id=delivery_id, status=DeliveryStatus.PENDING)
         except Delivery.DoesNotExist:
             return Response({"error": "Delivery not found or not pending"}, status=status.HTTP_404_NOT_FOUND)
 
-        if delivery.driver_post_id.user != request.user:
+        if delivery.driver_post_id.user_id != request.user.id:
             return Response({"error": "You can only manage deliveries for your own posts."}, status=status.HTTP_403_FORBIDDEN)
 
-        total_weight = sum(p.weight for p in delivery.packages.all())
-        used_weight = sum(
-            d.packages.aggregate(models.Sum('weight'))['weight__sum'] or 0
-            for d in Delivery.objects.filter(
-                driver_post_id=delivery.driver_post_id,
-                status__in=[DeliveryStatus.ASSIGNED, DeliveryStatus.IN_TRANSIT]
-            )
-        )
-        if total_weight + used_weight > delivery.driver_post_id.max_weight:
-            return Response({"error": "Total package weight exceeds remaining capacity."}, status=status.HTTP_400_BAD_REQUEST)
-
         if delivery.pickup_address.get('city') != delivery.driver_post_id.start_city.name \
            or delivery.dropoff_address.get('city') != delivery.driver_post_id.end_city.name:
             return Response({"error": "Pickup and dropoff cities must match driver post route."}, status=status.HTTP_400_BAD_REQUEST)
 
-        delivery.status = DeliveryStatus.ASSIGNED
-        delivery.driver_id = request.user
-        delivery.driver_post_id.status = 'Booked'
-        delivery.driver_post_id.save()
-        delivery.save()
-
-        DeliveryLog.objects.create(
-            delivery=delivery,
-            action="Delivery Accepted",
-            comments=f"Delivery accepted by {request.user.email}"
-        )
+        try:
+            transition(delivery, DeliveryStatus.ASSIGNED, request.user, driver=request.user)
+        except TransitionConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response({"message": f"Delivery {delivery_id} accepted"}, status=status.HTTP_200_OK)
 
 
 class DeliveryRejectView(APIView):
     permission_classes = [IsAuthenticated, IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request, delivery_id):
         try:
-            delivery = Delivery.objects.get(delivery_id=delivery_id, status=DeliveryStatus.PENDING)
+            delivery = for_transition().get(delivery_id=delivery_id, status=DeliveryStatus.PENDING)
         except Delivery.DoesNotExist:
             return Response({"error": "Delivery not found or not pending"}, status=status.HTTP_404_NOT_FOUND)
 
-        if delivery.driver_post_id.user != request.user:
+        if delivery.driver_post_id.user_id != request.user.id:
             return Response({"error": "You can only manage deliveries for your own posts."}, status=status.HTTP_403_FORBIDDEN)
 
-        # ⭐ FIX: Use CANCELLED instead of REJECTED
-        delivery.status = DeliveryStatus.CANCELLED
-        delivery.save()
-
-        DeliveryLog.objects.create(
-            delivery=delivery,
-            action="Delivery Rejected",
-            comments=f"Delivery rejected by {request.user.email}"
-        )
+        # Rejections are cancellations with their own log entry
+        try:
+            transition(
+                delivery, DeliveryStatus.CANCELLED, request.user,
+                action="Delivery Rejected", comments=f"Delivery rejected by {request.user.email}",
+            )
+        except TransitionConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"message": f"Delivery {delivery_id} rejected"}, status=status.HTTP_200_OK)
     
 class DeliveryPickupView(APIView):
     permission_classes = [IsAuthenticated, IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request, delivery_id):
         try:
-            delivery = Delivery.objects.get(delivery_id=delivery_id, status=DeliveryStatus.ASSIGNED)
+            delivery = for_transition().get(delivery_id=delivery_id, status=DeliveryStatus.ASSIGNED)
         except Delivery.DoesNotExist:
             return Response({"error": "Delivery not found or not assigned"}, status=status.HTTP_404_NOT_FOUND)
 
-        if delivery.driver_id != request.user:
+        if delivery.driver_id_id != request.user.id:
             return Response({"error": "You can only manage your own deliveries."}, status=status.HTTP_403_FORBIDDEN)
 
-        delivery.status = DeliveryStatus.IN_TRANSIT
-        delivery.save()
-
-        DeliveryLog.objects.create(
-            delivery=delivery,
-            action="Delivery Picked Up",
-            comments=f"Picked up by {request.user.email}"
-        )
+        try:
+            transition(delivery, DeliveryStatus.IN_TRANSIT, request.user)
+        except TransitionConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response({"message": f"Delivery {delivery_id} is now in transit"}, status=status.HTTP_200_OK)
 
 
 class DeliveryCompleteView(APIView):
     permission_classes = [IsAuthenticated, IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request, delivery_id):
         try:
-            delivery = Delivery.objects.get(delivery_id=delivery_id, status=DeliveryStatus.IN_TRANSIT)
+            delivery = for_transition().get(delivery_id=delivery_id, status=DeliveryStatus.IN_TRANSIT)
         except Delivery.DoesNotExist:
             return Response({"error": "Delivery not in transit"}, status=status.HTTP_404_NOT_FOUND)
 
-        if delivery.driver_id != request.user:
+        if delivery.driver_id_id != request.user.id:
             return Response({"error": "You can only complete your own deliveries."}, status=status.HTTP_403_FORBIDDEN)
 
-        delivery.status = DeliveryStatus.DELIVERED
-        delivery.save()
-
-        DeliveryLog.objects.create(
-            delivery=delivery,
-            action="Delivery Completed",
-            comments=f"Delivered by {request.user.email}"
-        )
+        try:
+            transition(delivery, DeliveryStatus.DELIVERED, request.user)
+        except TransitionConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response({"message": f"Delivery {delivery_id} marked as delivered"}, status=status.HTTP_200_OK)
 
 class DeliveryCancelView(APIView):
     permission_classes = [IsAuthenticated, IsSender]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request, delivery_id):
         try:
-            delivery = Delivery.objects.get(delivery_id=delivery_id, sender_id=request.user)
+            delivery = for_transition().get(delivery_id=delivery_id, sender_id=request.user)
         except Delivery.DoesNotExist:
             return Response({"error": "Delivery not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        if delivery.status not in [DeliveryStatus.PENDING, DeliveryStatus.ASSIGNED]:
+        if not can_transition(delivery, DeliveryStatus.CANCELLED):
             return Response({"error": f"Cannot cancel delivery with status {delivery.status}"}, status=status.HTTP_400_BAD_REQUEST)
 
-        delivery.status = DeliveryStatus.CANCELLED
-        delivery.save()
-
-        DeliveryLog.objects.create(
-            delivery=delivery,
-            action="Delivery Cancelled",
-            comments=f"Cancelled by {request.user.email}"
-        )
+        try:
+            transition(delivery, DeliveryStatus.CANCELLED, request.user)
+        except TransitionConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"message": f"Delivery {delivery_id} cancelled successfully"}, status=status.HTTP_200_OK)
 
@@ -194,51 +191,56 @@ class DeliveryCancelView(APIView):
 class CreateDeliveryWithCostView(generics.CreateAPIView):
     serializer_class = DeliveryWriteSerializer
     permission_classes = [IsAuthenticated, IsSender]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def perform_create(self, serializer):
-        delivery = serializer.save(sender_id=self.request.user)
-        packages = Package.objects.filter(delivery_id=delivery)
-        total_weight = sum(package.weight for package in packages)
+        with transaction.atomic():
+            # Priced by the serializer on the offline estimate; the route job fetches
+            # the road route after commit and reprices (see route.jobs)
+            delivery = serializer.save(sender_id=self.request.user)
+
+            DeliveryLog.objects.create(
+                delivery=delivery,
+                action="Delivery Created",
+                comments=f"Delivery created by {self.request.user.email}",
+            )
+            enqueue_route_job(delivery)
+
+class DeliveryBatchCreateView(APIView):
+    """
+    Create many deliveries at once from a JSON array, NDJSON or CSV body.
+    Returns a result per row; valid rows are created even if others fail.
+    """
+    permission_classes = [IsAuthenticated, IsSender]
+    authentication_classes = [CachedJWTAuthentication]
+    parser_classes = [JSONParser, NDJSONParser, CSVParser]
 
-        pickup = delivery.pickup_address
-        dropoff = delivery.dropoff_address
+    def post(self, request):
+        rows = request.data
+        if isinstance(rows, dict):
+            return Response({"error": "Expected a list of deliveries."}, status=status.HTTP_400_BAD_REQUEST)
 
-        distance = 0
-        path = None
         try:
-            pickup_lon = float(pickup['longitude'])
-            pickup_lat = float(pickup['latitude'])
-            dropoff_lon = float(dropoff['longitude'])
-            dropoff_lat = float(dropoff['latitude'])
-
-            url = f"http://router.project-osrm.org/route/v1/driving/{pickup_lon},{pickup_lat};{dropoff_lon},{dropoff_lat}?overview=full&geometries=geojson"
-            response = requests.get(url, timeout=10)
-            data = response.json()
-
-            if data.get('code') == 'Ok' and data.get('routes'):
-                route_data = data['routes'][0]
-                distance = route_data.get('distance', 0) / 1000
-                geometry = route_data.get('geometry')
-                if geometry and 'coordinates' in geometry and 'type' in geometry:
-                    path = geometry
-                    Route.objects.create(delivery_id=delivery, distance=distance, path=path)
-        except Exception as e:
-            logger.error(f"Route creation error for delivery {delivery.delivery_id}: {str(e)}")
-
-        delivery.total_cost = (Decimal(str(distance)) * Decimal("1.0")) + (total_weight * Decimal("0.5"))
-        delivery.save()
-
-        DeliveryLog.objects.create(
-            delivery=delivery,
-            action="Delivery Created",
-            comments=f"Delivery created by {self.request.user.email}",
-        )
+            results = import_deliveries(request.user, rows)
+        except BatchTooLarge as e:
+            return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        created = sum(1 for result in results if result['status'] == 'created')
+        failed = len(results) - created
+        if not created:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif failed:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+        return Response({"created": created, "failed": failed, "results": results}, status=response_status)
+
 
 class DriverPendingDeliveryListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     serializer_class = DeliveryReadSerializer
+    pagination_class = CreatedAtCursorPagination
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ['created_at', 'total_cost', 'status']
     # ordering = ['-created_at']
@@ -250,14 +252,15 @@ class DriverPendingDeliveryListView(generics.ListAPIView):
         driver_posts = user.driver_posts.all()
 
         # Return ALL deliveries connected to ANY of the driver's posts
-        return Delivery.objects.filter(
-            driver_post_id__in=driver_posts
+        return DeliveryReadSerializer.setup_eager_loading(
+            Delivery.objects.filter(driver_post_id__in=driver_posts),
+            fields=DeliveryReadSerializer.requested_fields(self.request),
         ).order_by('-created_at')
 
 
 # class DriverPendingDeliveryListView(generics.ListAPIView):
 #     permission_classes = [IsAuthenticated, IsVerifiedDriver]
-#     authentication_classes = [JWTAuthentication]
+#     authentication_classes = [CachedJWTAuthentication]
 #     serializer_class = DeliveryReadSerializer
 
 #     def get_queryset(self):
@@ -0,0 +1,50 @@
+# driver_post/capacity.py
+"""
+Booking ledger for driver posts.
+
+``DriverPost.booked_weight`` holds the package weight of the post's Assigned
+and In Transit deliveries, ``booked_count`` the number of senders matched to
+the post. Both are only changed with conditional ``F()`` updates, so a check
+and its write are a single statement: two concurrent accepts can never both
+squeeze into the last free kilos.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .models import DriverPost
+
+
+def delivery_weight(delivery):
+    return delivery.packages.aggregate(total=Sum('weight'))['total'] or Decimal('0')
+
+
+def reserve_weight(post_id, weight):
+    """Add ``weight`` to the post's booked weight if it fits. Returns True on success."""
+    return bool(
+        DriverPost.objects.filter(pk=post_id, booked_weight__lte=F('max_weight') - weight).update(
+            booked_weight=F('booked_weight') + weight
+        )
+    )
+
+
+def release_weight(post_id, weight):
+    DriverPost.objects.filter(pk=post_id).update(
+        booked_weight=Greatest(F('booked_weight') - weight, Value(Decimal('0')))
+    )
+
+
+def reserve_slot(post_id, limit):
+    """
+    Take one of the post's ``limit`` booking slots; the post flips to Booked
+    when the last one is taken. Returns True on success.
+    """
+    return bool(
+        DriverPost.objects.filter(
+            pk=post_id, status__in=['Active', 'Booked'], booked_count__lt=limit
+        ).update(
+            booked_count=F('booked_count') + 1,
+            status=Case(When(booked_count__gte=limit - 1, then=Value('Booked')), default=F('status')),
+        )
+    )
@@ -0,0 +1,51 @@
+# driver_post/expiry.py
+"""
+Post expiry.
+
+A post is expired as soon as its departure date has passed, but the stored
+``status`` is only flipped by the ``expire_posts`` sweeper, in small batches
+off the request path. Until it catches up, reads go through ``open_posts`` /
+``DriverPost.current_status``, which already treat such posts as expired.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DriverPost
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('Active', 'Booked')
+
+
+def open_posts(queryset=None):
+    """Posts that can still be booked: open status and departure today or later."""
+    queryset = DriverPost.objects.all() if queryset is None else queryset
+    return queryset.filter(status__in=OPEN_STATUSES, departure_date__gte=timezone.now().date())
+
+
+def expire_posts(batch_size=500, max_batches=None):
+    """
+    Mark open posts whose departure date has passed as Expired, ``batch_size``
+    rows per transaction so no statement locks more than one batch.
+    Returns the number of posts expired.
+    """
+    today = timezone.now().date()
+    expired = batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            post_ids = list(
+                DriverPost.objects.filter(status__in=OPEN_STATUSES, departure_date__lt=today)
+                .order_by('departure_date')
+                .values_list('post_id', flat=True)[:batch_size]
+            )
+            if not post_ids:
+                break
+            expired += DriverPost.objects.filter(post_id__in=post_ids, status__in=OPEN_STATUSES).update(
+                status='Expired', updated_at=timezone.now()
+            )
+        batches += 1
+    if expired:
+        logger.info(f"Expired {expired} driver posts")
+    return expired
@@ -0,0 +1,81 @@
+# driver_post/geo.py
+"""
+Grid-bucket spatial index for driver posts.
+
+Every post stores the grid cell of its start and end point (``start_cell`` /
+``end_cell``, indexed columns kept up to date in ``DriverPost.save``). A
+radius search first collects the handful of cells that cover the search
+circle, pulls candidates with an indexed ``IN`` lookup and only then checks
+the exact great-circle distance, so it never scans the whole table.
+"""
+import math
+
+from django.conf import settings
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+def parse_point(lat, lon):
+    """(lat, lon) as floats; ValueError unless both are finite and in range."""
+    lat, lon = float(lat), float(lon)
+    if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"Invalid coordinates: {lat}, {lon}")
+    return lat, lon
+
+
+def grid_degrees():
+    return getattr(settings, 'DRIVER_POST_GRID_DEGREES', 0.25)
+
+
+def cell_for(lat, lon, size=None):
+    """Grid cell key for a point, or None if the point is missing."""
+    if lat is None or lon is None:
+        return None
+    size = size or grid_degrees()
+    return f"{math.floor(float(lat) / size)}:{math.floor(float(lon) / size)}"
+
+
+def cells_within(lat, lon, radius_km, size=None):
+    """Every cell that intersects the bounding box of the search circle."""
+    size = size or grid_degrees()
+    lat, lon = float(lat), float(lon)
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+
+    lat_range = range(math.floor((lat - dlat) / size), math.floor((lat + dlat) / size) + 1)
+    lon_range = range(math.floor((lon - dlon) / size), math.floor((lon + dlon) / size) + 1)
+    return [f"{y}:{x}" for y in lat_range for x in lon_range]
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(h))
+
+
+def posts_near(queryset, pickup, dropoff=None, radius_km=25, limit=50):
+    """
+    Posts from ``queryset`` starting within ``radius_km`` of ``pickup`` (and,
+    if given, ending within ``radius_km`` of ``dropoff``), closest first.
+    Each returned post has ``pickup_distance_km`` / ``dropoff_distance_km`` set.
+    """
+    queryset = queryset.filter(start_cell__in=cells_within(pickup[0], pickup[1], radius_km))
+    if dropoff is not None:
+        queryset = queryset.filter(end_cell__in=cells_within(dropoff[0], dropoff[1], radius_km))
+
+    matches = []
+    for post in queryset:
+        pickup_km = distance_km(pickup[0], pickup[1], post.start_latitude, post.start_longitude)
+        if pickup_km > radius_km:
+            continue
+        dropoff_km = None
+        if dropoff is not None:
+            dropoff_km = distance_km(dropoff[0], dropoff[1], post.end_latitude, post.end_longitude)
+            if dropoff_km > radius_km:
+                continue
+        post.pickup_distance_km = round(pickup_km, 2)
+        post.dropoff_distance_km = round(dropoff_km, 2) if dropoff_km is not None else None
+        matches.append(post)
+
+    matches.sort(key=lambda p: p.pickup_distance_km + (p.dropoff_distance_km or 0))
+    return matches[:limit]
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from driver_post.expiry import expire_posts
+
+
+class Command(BaseCommand):
+    help = "Mark driver posts whose departure date has passed as Expired, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Posts updated per transaction.")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Keep running and sweep every INTERVAL seconds (0 = sweep once and exit).")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_posts(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Expired {expired} driver posts."))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
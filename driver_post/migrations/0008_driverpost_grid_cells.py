@@ -0,0 +1,39 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+def backfill_cells(apps, schema_editor):
+    from driver_post.geo import cell_for
+
+    DriverPost = apps.get_model('driver_post', 'DriverPost')
+    posts = list(DriverPost.objects.all())
+    for post in posts:
+        post.start_cell = cell_for(post.start_latitude, post.start_longitude)
+        post.end_cell = cell_for(post.end_latitude, post.end_longitude)
+    DriverPost.objects.bulk_update(posts, ['start_cell', 'end_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driver_post', '0007_remove_driverpost_available_capacity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverpost',
+            name='end_cell',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='driverpost',
+            name='start_cell',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='driverpost',
+            index=models.Index(fields=['start_cell', 'end_cell'], name='driver_post_start_c_5b91f3_idx'),
+        ),
+        migrations.RunPython(backfill_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driver_post', '0008_driverpost_grid_cells'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='postlog',
+            index=models.Index(fields=['post', '-timestamp'], name='driver_post_post_id_9c3b30_idx'),
+        ),
+    ]
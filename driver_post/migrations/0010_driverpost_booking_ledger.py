@@ -0,0 +1,43 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:51
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_ledger(apps, schema_editor):
+    DriverPost = apps.get_model('driver_post', 'DriverPost')
+    Package = apps.get_model('delivery', 'Package')
+
+    weights = Package.objects.filter(
+        delivery_id__status__in=['Assigned', 'In Transit'], delivery_id__driver_post_id__isnull=False
+    ).values('delivery_id__driver_post_id').annotate(total=Sum('weight'))
+    for row in weights:
+        DriverPost.objects.filter(pk=row['delivery_id__driver_post_id']).update(booked_weight=row['total'])
+
+    counts = DriverPost.objects.annotate(
+        matches=Count('logs', filter=Q(logs__action='Post Matched'))
+    ).filter(matches__gt=0).values_list('pk', 'matches')
+    for post_id, matches in counts:
+        DriverPost.objects.filter(pk=post_id).update(booked_count=matches)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driver_post', '0009_postlog_driver_post_post_id_9c3b30_idx'),
+        ('delivery', '0009_delivery_delivery_de_sender__0ee8a2_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverpost',
+            name='booked_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='driverpost',
+            name='booked_weight',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
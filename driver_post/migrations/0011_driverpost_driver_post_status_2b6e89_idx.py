@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driver_post', '0010_driverpost_booking_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='driverpost',
+            index=models.Index(fields=['status', 'departure_date'], name='driver_post_status_2b6e89_idx'),
+        ),
+    ]
@@ -4,6 +4,7 @@ from vehicle.models import Vehicle
 import uuid
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from .geo import cell_for
 
 class City(models.Model):
     city_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -37,9 +38,15 @@ class DriverPost(models.Model):
     start_longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     end_latitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
     end_longitude = models.DecimalField(max_digits=9, decimal_places=6, blank=True, null=True)
+    # Grid buckets of the start/end point, see driver_post.geo
+    start_cell = models.CharField(max_length=20, null=True, blank=True, editable=False)
+    end_cell = models.CharField(max_length=20, null=True, blank=True, editable=False)
     departure_date = models.DateField()
     departure_time = models.TimeField()
     max_weight = models.DecimalField(max_digits=10, decimal_places=2)
+    # Booking ledger, only updated through driver_post.capacity
+    booked_weight = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    booked_count = models.PositiveIntegerField(default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Active')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -49,11 +56,22 @@ class DriverPost(models.Model):
             models.Index(fields=['user', 'status']),
             models.Index(fields=['start_city', 'end_city']),
             models.Index(fields=['departure_date']),
+            models.Index(fields=['status', 'departure_date']),
+            models.Index(fields=['start_cell', 'end_cell']),
         ]
 
     def __str__(self):
         return f"Post Created By Verified Driver {self.user.email} From {self.start_city} To {self.end_city}"
 
+    @property
+    def current_status(self):
+        """Status as readers should see it, expired as soon as departure has passed."""
+        if self.status in ('Active', 'Booked') and self.departure_date < timezone.now().date():
+            return 'Expired'
+        return self.status
+
+    LEDGER_FIELDS = ('booked_weight', 'booked_count')
+
     def clean(self):
         if self.max_weight <= 0:
             raise ValidationError("Max weight must be positive.")
@@ -65,6 +83,21 @@ class DriverPost(models.Model):
         if (self.end_latitude is not None) != (self.end_longitude is not None):
             raise ValidationError("Both end latitude and longitude must be provided.")
 
+    def save(self, *args, **kwargs):
+        self.start_cell = cell_for(self.start_latitude, self.start_longitude)
+        self.end_cell = cell_for(self.end_latitude, self.end_longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'start_cell', 'end_cell'}
+        elif not self._state.adding:
+            # The booking ledger is only written by driver_post.capacity (F() updates);
+            # a full save would put this instance's stale copy back over it
+            kwargs['update_fields'] = [
+                f.attname for f in self._meta.concrete_fields
+                if not f.primary_key and f.attname not in self.LEDGER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class PostLog(models.Model):
     log_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -73,5 +106,10 @@ class PostLog(models.Model):
     comments = models.TextField(blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', '-timestamp']),
+        ]
+
     def __str__(self):
         return f"Log {self.log_id} for Post {self.post.post_id}"
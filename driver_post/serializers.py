@@ -3,6 +3,7 @@ from .models import DriverPost, City, PostLog
 from accounts.serializers import CustomUserSerializer
 from vehicle.models import Vehicle
 from django.utils import timezone
+from DropX.serializers import SparseFieldsetsMixin
 
 
 class CitySerializer(serializers.ModelSerializer):
@@ -17,7 +18,7 @@ class CitySerializer(serializers.ModelSerializer):
         }
 
 
-class PostLogSerializer(serializers.ModelSerializer):
+class PostLogSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = PostLog
         fields = ['log_id', 'post', 'action', 'comments', 'timestamp']
@@ -43,7 +44,7 @@ class DriverPostSerializer(serializers.ModelSerializer):
     start_city_name = serializers.SerializerMethodField(read_only=True)
     end_city_name = serializers.SerializerMethodField(read_only=True)
     vehicle_name = serializers.CharField(source='vehicle.model', read_only=True)
-    status = serializers.CharField(read_only=True)
+    status = serializers.CharField(source='current_status', read_only=True)
 
     class Meta:
         model = DriverPost
@@ -153,3 +154,19 @@ class DriverPostUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = DriverPost
         fields = ['departure_date', 'departure_time', 'max_weight']
+
+    def validate_max_weight(self, value):
+        if self.instance is not None:
+            # Fresh read, the in-memory ledger may already be stale
+            booked = DriverPost.objects.filter(pk=self.instance.pk).values_list('booked_weight', flat=True).first()
+            if booked is not None and value < booked:
+                raise serializers.ValidationError(f"Max weight cannot be below the {booked} kg already booked.")
+        return value
+
+
+class NearbyDriverPostSerializer(DriverPostSerializer):
+    pickup_distance_km = serializers.FloatField(read_only=True)
+    dropoff_distance_km = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta(DriverPostSerializer.Meta):
+        fields = DriverPostSerializer.Meta.fields + ['pickup_distance_km', 'dropoff_distance_km']
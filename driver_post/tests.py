@@ -1,3 +1,130 @@
+from datetime import timedelta
+from decimal import Decimal
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import CustomUser
+from vehicle.models import Vehicle
+from .models import DriverPost, City
+from .geo import cell_for, cells_within, posts_near
+from .capacity import reserve_weight, release_weight, reserve_slot
+from .expiry import open_posts, expire_posts
 
-# Create your tests here.
+
+class DriverPostTestMixin:
+    def setUp(self):
+        self.driver = CustomUser.objects.create_user(
+            email='driver@example.com', password='pass', role='Driver', phone_number='+923002220001'
+        )
+        self.vehicle = Vehicle.objects.create(
+            user=self.driver, vehicle_type_name='Car', make='Suzuki', model='Alto',
+            year=2020, number_plate='ABC-123', status='approved'
+        )
+        self.peshawar = City.objects.create(name='Peshawar', latitude=34.0151, longitude=71.5249)
+        self.islamabad = City.objects.create(name='Islamabad', latitude=33.6844, longitude=73.0479)
+        self.lahore = City.objects.create(name='Lahore', latitude=31.5204, longitude=74.3587)
+
+    def create_post(self, start, end):
+        return DriverPost.objects.create(
+            user=self.driver, vehicle=self.vehicle, start_city=start, end_city=end,
+            start_latitude=start.latitude, start_longitude=start.longitude,
+            end_latitude=end.latitude, end_longitude=end.longitude,
+            departure_date=timezone.now().date() + timedelta(days=1), departure_time='10:00', max_weight=100
+        )
+
+
+class DriverPostGeoIndexTests(DriverPostTestMixin, TestCase):
+
+    def test_cells_maintained_on_save(self):
+        post = self.create_post(self.peshawar, self.islamabad)
+        self.assertEqual(post.start_cell, cell_for(34.0151, 71.5249))
+        post.end_latitude, post.end_longitude = self.lahore.latitude, self.lahore.longitude
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.end_cell, cell_for(31.5204, 74.3587))
+
+    def test_search_circle_covered_by_cells(self):
+        cells = cells_within(34.0151, 71.5249, 25)
+        self.assertIn(cell_for(34.0151, 71.5249), cells)
+        self.assertIn(cell_for(34.2, 71.7), cells)
+
+    def test_posts_near_pickup_and_dropoff(self):
+        to_islamabad = self.create_post(self.peshawar, self.islamabad)
+        self.create_post(self.peshawar, self.lahore)
+        self.create_post(self.lahore, self.islamabad)
+
+        matches = posts_near(DriverPost.objects.all(), (34.00, 71.55), (33.70, 73.00), radius_km=20)
+        self.assertEqual([p.post_id for p in matches], [to_islamabad.post_id])
+        self.assertLess(matches[0].pickup_distance_km, 20)
+
+        self.assertEqual(len(posts_near(DriverPost.objects.all(), (34.00, 71.55), radius_km=20)), 2)
+
+    def test_invalid_coordinates_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.driver)
+        valid = {'pickup_lat': '34.0', 'pickup_lon': '71.5', 'dropoff_lat': '33.7', 'dropoff_lon': '73.0'}
+        for name in ('nearby', 'corridor-match'):
+            url = reverse(f'driver_post:{name}')
+            self.assertEqual(client.get(url, valid).status_code, 200)
+            for field, value in (('pickup_lat', 'nan'), ('pickup_lon', 'inf'), ('dropoff_lat', '-91'),
+                                 ('dropoff_lon', '180.5'), ('radius_km', 'nan')):
+                response = client.get(url, {**valid, field: value})
+                self.assertEqual(response.status_code, 400, (name, field, value))
+
+
+class BookingLedgerTests(DriverPostTestMixin, TestCase):
+    def test_weight_reserved_until_full_and_released(self):
+        post = self.create_post(self.peshawar, self.islamabad)
+        self.assertTrue(reserve_weight(post.pk, Decimal('60')))
+        self.assertFalse(reserve_weight(post.pk, Decimal('50')))
+        self.assertTrue(reserve_weight(post.pk, Decimal('40')))
+
+        release_weight(post.pk, Decimal('60'))
+        post.refresh_from_db()
+        self.assertEqual(post.booked_weight, Decimal('40'))
+
+    def test_last_slot_books_post(self):
+        post = self.create_post(self.peshawar, self.islamabad)
+        self.assertTrue(reserve_slot(post.pk, 2))
+        post.refresh_from_db()
+        self.assertEqual(post.status, 'Active')
+
+        self.assertTrue(reserve_slot(post.pk, 2))
+        self.assertFalse(reserve_slot(post.pk, 2))
+        post.refresh_from_db()
+        self.assertEqual((post.booked_count, post.status), (2, 'Booked'))
+
+    def test_post_edit_keeps_the_ledger(self):
+        post = self.create_post(self.peshawar, self.islamabad)
+        stale = DriverPost.objects.get(pk=post.pk)
+        self.assertTrue(reserve_weight(post.pk, Decimal('60')))
+        stale.save()  # full save from a copy loaded before the reservation
+
+        client = APIClient()
+        client.force_authenticate(self.driver)
+        url = reverse('driver_post:detail', kwargs={'post_id': post.pk})
+        response = client.patch(url, {'max_weight': '80'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        post.refresh_from_db()
+        self.assertEqual((post.booked_weight, post.max_weight), (Decimal('60'), Decimal('80')))
+
+        response = client.patch(url, {'max_weight': '50'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class PostExpiryTests(DriverPostTestMixin, TestCase):
+    def test_past_posts_virtually_expired_until_swept(self):
+        live = self.create_post(self.peshawar, self.islamabad)
+        stale = [self.create_post(self.peshawar, self.lahore) for _ in range(3)]
+        DriverPost.objects.filter(pk__in=[p.pk for p in stale]).update(
+            departure_date=timezone.now().date() - timedelta(days=1)
+        )
+
+        self.assertEqual(list(open_posts()), [live])
+        self.assertEqual(DriverPost.objects.get(pk=stale[0].pk).current_status, 'Expired')
+
+        self.assertEqual(expire_posts(batch_size=2), 3)
+        self.assertEqual(DriverPost.objects.filter(status='Expired').count(), 3)
+        self.assertEqual(expire_posts(batch_size=2), 0)
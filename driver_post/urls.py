@@ -1,10 +1,12 @@
 from django.urls import path
-from .views import DriverPostListCreateView, DriverPostDetailView, MatchDriverPostView
+from .views import DriverPostListCreateView, DriverPostDetailView, MatchDriverPostView, NearbyDriverPostView, CorridorMatchView
 
 app_name = 'driver_post'
 
 urlpatterns = [
     path('', DriverPostListCreateView.as_view(), name='list-create'),
+    path('nearby/', NearbyDriverPostView.as_view(), name='nearby'),
+    path('corridor-match/', CorridorMatchView.as_view(), name='corridor-match'),
     path('<uuid:post_id>/', DriverPostDetailView.as_view(), name='detail'),
     path('match/<uuid:post_id>/', MatchDriverPostView.as_view(), name='match-post'),
 ]
@@ -2,15 +2,21 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from DropX.authentication import CachedJWTAuthentication
 from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import DriverPost, City, PostLog
-from .serializers import DriverPostSerializer, CitySerializer, PostLogSerializer, DriverPostUpdateSerializer
+from .serializers import DriverPostSerializer, CitySerializer, PostLogSerializer, DriverPostUpdateSerializer, NearbyDriverPostSerializer
+from .geo import parse_point, posts_near
+from .capacity import reserve_slot
+from .expiry import open_posts
+from route.corridor import get_corridor_index
 from accounts.models import DriverProfile
 from DropX.permissions import IsDriver, IsVerifiedDriver, IsSender
+from DropX.pagination import TimestampCursorPagination
 import logging
 from django.utils import timezone
+from django.db import transaction
 from rest_framework.exceptions import ValidationError, PermissionDenied
 
 logger = logging.getLogger(__name__)
@@ -18,14 +24,6 @@ logger = logging.getLogger(__name__)
 MAX_USERS_PER_POST = 3  # max allowed senders per post
 
 
-def auto_expire_posts():
-    """Bulk update expired posts in a single query"""
-    today = timezone.now().date()
-    DriverPost.objects.filter(
-        departure_date__lt=today,
-        status__in=["Active", "Booked"]
-    ).update(status="Expired")
-
 def get_or_create_city(city_data):
     city, _ = City.objects.get_or_create(
         name=city_data.get("name"),
@@ -42,7 +40,7 @@ def get_or_create_city(city_data):
 class DriverPostListCreateView(generics.ListCreateAPIView):
     queryset = DriverPost.objects.all()
     serializer_class = DriverPostSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['start_city__name', 'end_city__name', 'departure_date', 'status']
     ordering_fields = ['created_at', 'departure_date', 'max_weight']
@@ -62,10 +60,9 @@ class DriverPostListCreateView(generics.ListCreateAPIView):
         return context
 
     def get_queryset(self):
-        auto_expire_posts()
         if self.request.user.role == 'driver':
             return DriverPost.objects.filter(user=self.request.user).order_by('-created_at')
-        return DriverPost.objects.filter(status__in=['Active', 'Booked']).order_by('-created_at')
+        return open_posts().order_by('-created_at')
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
@@ -97,7 +94,7 @@ class DriverPostDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = DriverPost.objects.all()
     lookup_field = 'post_id'
     permission_classes = [IsAuthenticated, IsDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -111,7 +108,6 @@ class DriverPostDetailView(generics.RetrieveUpdateDestroyAPIView):
         return DriverPostSerializer
 
     def get_queryset(self):
-        auto_expire_posts()
         return DriverPost.objects.filter(user=self.request.user)
 
     def perform_update(self, serializer):
@@ -119,7 +115,7 @@ class DriverPostDetailView(generics.RetrieveUpdateDestroyAPIView):
         serializer.save()
         if instance.departure_date < timezone.now().date():
             instance.status = "Expired"
-            instance.save()
+            instance.save(update_fields=['status', 'updated_at'])
         PostLog.objects.create(
             post=instance,
             action="Post Updated",
@@ -139,10 +135,10 @@ class PostLogListView(generics.ListAPIView):
     queryset = PostLog.objects.all()
     serializer_class = PostLogSerializer
     permission_classes = [IsAuthenticated, IsDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
+    pagination_class = TimestampCursorPagination
 
     def get_queryset(self):
-        auto_expire_posts()
         return PostLog.objects.filter(post__user=self.request.user).order_by('-timestamp')
 
 
@@ -160,30 +156,26 @@ class CityDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class MatchDriverPostView(APIView):
     permission_classes = [IsAuthenticated, IsSender]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request, post_id):
-        auto_expire_posts()
         try:
-            post = DriverPost.objects.get(post_id=post_id, status__in=['Active', 'Booked'])
-
-            current_matches = PostLog.objects.filter(post=post, action="Post Matched").count()
-            if current_matches >= MAX_USERS_PER_POST:
-                return Response(
-                    {"error": f"This post has reached maximum bookings ({MAX_USERS_PER_POST})"},
-                    status=status.HTTP_400_BAD_REQUEST
+            post = open_posts().get(post_id=post_id)
+
+            with transaction.atomic():
+                # Takes a slot and flips the post to Booked on the last one, in one UPDATE
+                if not reserve_slot(post.pk, MAX_USERS_PER_POST):
+                    return Response(
+                        {"error": f"This post has reached maximum bookings ({MAX_USERS_PER_POST})"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                PostLog.objects.create(
+                    post=post,
+                    action="Post Matched",
+                    comments=f"Post {post.post_id} matched by sender {request.user.email}"
                 )
 
-            PostLog.objects.create(
-                post=post,
-                action="Post Matched",
-                comments=f"Post {post.post_id} matched by sender {request.user.email}"
-            )
-
-            if current_matches + 1 >= MAX_USERS_PER_POST:
-                post.status = "Booked"
-                post.save()
-
             return Response(
                 {"message": f"Post {post_id} matched successfully"},
                 status=status.HTTP_200_OK
@@ -194,3 +186,76 @@ class MatchDriverPostView(APIView):
                 {"error": "Driver post not found or unavailable"},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+
+class NearbyDriverPostView(APIView):
+    """
+    Posts starting near the pickup point (and ending near the dropoff point, if given).
+    Query params: pickup_lat, pickup_lon, dropoff_lat, dropoff_lon, radius_km (default 25, max 200).
+    """
+    permission_classes = [IsAuthenticated, IsDriver | IsSender]
+    authentication_classes = [CachedJWTAuthentication]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            pickup = parse_point(params['pickup_lat'], params['pickup_lon'])
+            dropoff = None
+            if params.get('dropoff_lat') is not None or params.get('dropoff_lon') is not None:
+                dropoff = parse_point(params['dropoff_lat'], params['dropoff_lon'])
+            radius_km = float(params.get('radius_km', 25))
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "pickup_lat and pickup_lon are required; coordinates must be valid latitudes/longitudes "
+                          "and radius_km a number."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 < radius_km <= 200:
+            return Response({"error": "radius_km must be between 0 and 200."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = open_posts().select_related('user', 'vehicle', 'start_city', 'end_city').prefetch_related('logs')
+        posts = posts_near(queryset, pickup, dropoff, radius_km)
+
+        serializer = NearbyDriverPostSerializer(posts, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class CorridorMatchView(APIView):
+    """
+    Posts whose road route passes near the pickup point and then near the dropoff point,
+    so drivers can carry parcels from cities along the way.
+    Query params: pickup_lat, pickup_lon, dropoff_lat, dropoff_lon, radius_km (default 10, max 50).
+    """
+    permission_classes = [IsAuthenticated, IsDriver | IsSender]
+    authentication_classes = [CachedJWTAuthentication]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            pickup = parse_point(params['pickup_lat'], params['pickup_lon'])
+            dropoff = parse_point(params['dropoff_lat'], params['dropoff_lon'])
+            radius_km = float(params.get('radius_km', 10))
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "pickup_lat, pickup_lon, dropoff_lat and dropoff_lon are required, valid coordinates."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 < radius_km <= 50:
+            return Response({"error": "radius_km must be between 0 and 50."}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = get_corridor_index().query(pickup, dropoff, radius_km)
+        posts = open_posts().filter(
+            post_id__in=[m['post_id'] for m in matches],
+        ).select_related('user', 'vehicle', 'start_city', 'end_city').prefetch_related('logs').in_bulk()
+
+        results = []
+        for match in matches:
+            post = posts.get(match['post_id'])
+            if post is None:
+                continue
+            post.pickup_distance_km = match['pickup_distance_km']
+            post.dropoff_distance_km = match['dropoff_distance_km']
+            results.append(post)
+
+        serializer = NearbyDriverPostSerializer(results, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
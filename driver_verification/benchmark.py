@@ -0,0 +1,163 @@
+# driver_verification/benchmark.py
+"""
+Throughput benchmark for the verification pipeline.
+
+Replays CNIC/face image pairs through the same stages a verification job runs
+(decode, face match, OCR, CNIC regex), timing each stage per pair, either
+serially in this process or on a ``ProcessPoolExecutor`` like the real
+workers. ``summarize`` turns the timings into per-stage latency percentiles
+plus peak RSS, and reports are saved as JSON (tagged with the git commit) so
+``compare`` can flag regressions between commits.
+"""
+import json
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .pipeline import face_stage, ocr_stage, parse_cnic_text
+from .preprocess import DEFAULT_PREPROCESS, prepare
+
+STAGES = ('decode', 'face_match', 'ocr', 'cnic_regex')
+PERCENTILES = (50, 90, 95, 99)
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.webp'}
+
+
+def sample_pairs(cnic_dir, face_dir, limit=None):
+    def images(folder):
+        return sorted(str(p) for p in Path(folder).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    return list(zip(images(cnic_dir), images(face_dir)))[:limit]
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (2**20 if sys.platform == 'darwin' else 2**10)
+
+
+def run_pair(cnic_path, face_path, options=None):
+    """Time every stage for one pair. OCR always runs so its cost is measured even when faces don't match."""
+    options = {**DEFAULT_PREPROCESS, **(options or {})}
+    timings, error = {}, None
+
+    started = time.perf_counter()
+    prepared = prepare(cnic_path, face_path, options)
+    timings['decode'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    faces_found, _, face_location, _ = face_stage(prepared)
+    timings['face_match'] = time.perf_counter() - started
+
+    raw_text = ''
+    try:
+        started = time.perf_counter()
+        raw_text = ocr_stage(prepared, face_location, options['OCR_THRESHOLD'])
+        timings['ocr'] = time.perf_counter() - started
+    except Exception as e:  # e.g. Tesseract not installed on this machine
+        error = f"{type(e).__name__}: {e}"
+
+    started = time.perf_counter()
+    _, cnic_number, full_name = parse_cnic_text(raw_text)
+    timings['cnic_regex'] = time.perf_counter() - started
+
+    return {
+        'pair': [Path(cnic_path).name, Path(face_path).name],
+        'timings': timings,
+        'faces_found': faces_found,
+        'cnic_found': cnic_number is not None,
+        'name_found': full_name is not None,
+        'error': error,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_benchmark(pairs, mode='serial', workers=2, options=None):
+    started = time.perf_counter()
+    if mode == 'serial':
+        results = [run_pair(cnic, face, options) for cnic, face in pairs]
+        worker_peak = peak_rss_mb()
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_pair, cnic, face, options) for cnic, face in pairs]
+            results = [future.result() for future in futures]
+        worker_peak = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    wall = time.perf_counter() - started
+    return summarize(results, wall, mode, workers if mode == 'pool' else 1, worker_peak)
+
+
+def summarize(results, wall_seconds, mode, workers, worker_peak_rss_mb):
+    stages = {}
+    for stage in STAGES:
+        samples = np.array([r['timings'][stage] for r in results if stage in r['timings']]) * 1000
+        if not len(samples):
+            stages[stage] = None
+            continue
+        stages[stage] = {
+            'count': int(len(samples)),
+            'mean_ms': float(samples.mean()),
+            'max_ms': float(samples.max()),
+            **{f'p{p}_ms': float(np.percentile(samples, p)) for p in PERCENTILES},
+        }
+    errors = sorted({r['error'] for r in results if r['error']})
+    return {
+        'commit': git_commit(),
+        'created_at': timezone.now().isoformat(),
+        'mode': mode,
+        'workers': workers,
+        'pairs': len(results),
+        'wall_seconds': wall_seconds,
+        'pairs_per_second': len(results) / wall_seconds if wall_seconds else None,
+        'peak_rss_mb': max(peak_rss_mb(), worker_peak_rss_mb),
+        'worker_peak_rss_mb': worker_peak_rss_mb,
+        'stages': stages,
+        'faces_found': sum(r['faces_found'] for r in results),
+        'cnic_found': sum(r['cnic_found'] for r in results),
+        'errors': errors,
+    }
+
+
+def compare(current, baseline, metric='p95_ms'):
+    """Per-stage change of ``metric`` in percent against ``baseline`` (positive: slower)."""
+    changes = {}
+    for stage in STAGES:
+        now, before = current['stages'].get(stage), baseline['stages'].get(stage)
+        if now and before and before[metric]:
+            changes[stage] = (now[metric] - before[metric]) / before[metric] * 100
+    return changes
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def results_dir():
+    return Path(getattr(settings, 'VERIFICATION_BENCHMARK_DIR', Path(settings.BASE_DIR) / 'benchmarks' / 'verification'))
+
+
+def save_report(report, directory=None):
+    directory = Path(directory or results_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+    path = directory / f"{stamp}-{report['commit'] or 'nogit'}-{report['mode']}.json"
+    path.write_text(json.dumps(report, indent=2))
+    return path
+
+
+def latest_report(mode, directory=None, exclude=None):
+    directory = Path(directory or results_dir())
+    if not directory.exists():
+        return None
+    paths = sorted(p for p in directory.glob(f'*-{mode}.json') if p != exclude)
+    return paths[-1] if paths else None
@@ -0,0 +1,162 @@
+# driver_verification/face_index.py
+"""
+Face-embedding index for duplicate-identity detection.
+
+The 128-d ``face_recognition`` encoding of every selfie is stored on its
+``DriverVerification`` as raw float32 bytes (512 bytes). Verified drivers'
+encodings are kept in process memory in one contiguous float32 matrix, so a
+new selfie is compared against all of them with a single vectorised distance
+computation; no stored image is ever decoded again.
+
+Rows are appended in place (the matrix grows by doubling) and the index
+catches up with verifications from other processes through ``sync``, which
+only loads rows verified since its last sync. Past ``FACE_INDEX_BALLTREE_MIN``
+live rows a scikit-learn ``BallTree`` covers the bulk of the matrix and the
+rows appended since it was built are scanned linearly; the tree is rebuilt
+once that tail grows past a tenth of the index.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+
+try:
+    from sklearn.neighbors import BallTree
+except ImportError:  # scikit-learn is optional, the linear scan is exact anyway
+    BallTree = None
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_SIZE = 128
+
+
+def to_bytes(encoding):
+    return np.asarray(encoding, dtype=np.float32).tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(data, dtype=np.float32)
+
+
+class FaceIndex:
+    def __init__(self, balltree_min_size=2000):
+        self.balltree_min_size = balltree_min_size
+        self.built_at = time.monotonic()
+        self.synced_until = None  # latest verified_at loaded from the database
+        self._vectors = np.empty((64, EMBEDDING_SIZE), dtype=np.float32)
+        self._live = np.zeros(64, dtype=bool)
+        self._size = 0
+        self._owners = []  # row -> (verification_id, user_id)
+        self._rows = {}  # verification_id -> row
+        self._tree = None
+        self._tree_rows = 0  # rows [0, _tree_rows) are covered by the tree
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, verification_id, user_id, encoding):
+        with self._lock:
+            row = self._rows.get(verification_id)
+            if row is not None and self._owners[row][1] == user_id and np.array_equal(self._vectors[row], encoding):
+                return  # already indexed, e.g. re-read by sync at its watermark
+            self.remove(verification_id)
+            if self._size == len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.empty_like(self._vectors)])
+                self._live = np.concatenate([self._live, np.zeros_like(self._live)])
+            row = self._size
+            self._vectors[row] = encoding
+            self._live[row] = True
+            self._owners.append((verification_id, user_id))
+            self._rows[verification_id] = row
+            self._size += 1
+
+    def remove(self, verification_id):
+        # The row stays in place (and in the tree), it is just no longer live
+        with self._lock:
+            row = self._rows.pop(verification_id, None)
+            if row is not None:
+                self._live[row] = False
+
+    def _refresh_tree(self):
+        if BallTree is None or len(self) < self.balltree_min_size:
+            self._tree, self._tree_rows = None, 0
+        elif self._tree is None or self._size - self._tree_rows > self._size // 10:
+            self._tree = BallTree(self._vectors[:self._size])
+            self._tree_rows = self._size
+
+    def matches(self, encoding, tolerance, exclude_user_id=None):
+        """Verified faces within ``tolerance`` (euclidean), closest first: [(distance, verification_id, user_id)]."""
+        encoding = np.asarray(encoding, dtype=np.float32)
+        with self._lock:
+            self._refresh_tree()
+            rows, distances = [], []
+            if self._tree is not None:
+                tree_rows, tree_distances = self._tree.query_radius(encoding[None, :], tolerance, return_distance=True)
+                rows.append(tree_rows[0])
+                distances.append(tree_distances[0])
+            tail = self._vectors[self._tree_rows:self._size]
+            tail_distances = np.linalg.norm(tail - encoding, axis=1)
+            close = np.flatnonzero(tail_distances <= tolerance)
+            rows.append(close + self._tree_rows)
+            distances.append(tail_distances[close])
+
+            rows, distances = np.concatenate(rows), np.concatenate(distances)
+            results = []
+            for row, distance in zip(rows, distances):
+                verification_id, user_id = self._owners[row]
+                if self._live[row] and user_id != exclude_user_id:
+                    results.append((float(distance), verification_id, user_id))
+        return sorted(results, key=lambda match: match[0])
+
+    def sync(self):
+        """Load verifications verified since the last sync (e.g. by other processes)."""
+        from .models import DriverVerification
+
+        queryset = DriverVerification.objects.filter(
+            verification_status="Verified", face_encoding__isnull=False
+        )
+        if self.synced_until is not None:
+            # >= so rows sharing the watermark's timestamp aren't missed; add() is idempotent
+            queryset = queryset.filter(verified_at__gte=self.synced_until)
+        rows = queryset.order_by('verified_at').values_list(
+            'verification_id', 'user_id', 'face_encoding', 'verified_at'
+        ).iterator(chunk_size=2000)
+        with self._lock:
+            for verification_id, user_id, encoding, verified_at in rows:
+                self.add(verification_id, user_id, from_bytes(encoding))
+                if verified_at is not None:
+                    self.synced_until = verified_at
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_face_index():
+    """The process-wide index, synced on every call and rebuilt every FACE_INDEX_TTL seconds."""
+    from .pipeline import verification_settings
+
+    global _index
+    config = verification_settings()
+    if _index is None or time.monotonic() - _index.built_at > config['FACE_INDEX_TTL']:
+        with _index_lock:
+            if _index is None or time.monotonic() - _index.built_at > config['FACE_INDEX_TTL']:
+                index = FaceIndex(config['FACE_INDEX_BALLTREE_MIN'])
+                index.sync()
+                _index = index
+                logger.info(f"Face index built with {len(_index)} verified drivers")
+                return _index
+    _index.sync()
+    return _index
+
+
+def reset_face_index():
+    global _index
+    _index = None
+
+
+def index_verification(verification):
+    if _index is not None and verification.face_encoding:
+        _index.add(verification.verification_id, verification.user_id, from_bytes(verification.face_encoding))
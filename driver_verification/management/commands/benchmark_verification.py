@@ -0,0 +1,75 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from driver_verification.benchmark import (
+    PERCENTILES, STAGES, compare, latest_report, run_benchmark, sample_pairs, save_report,
+)
+from driver_verification.pipeline import verification_settings
+from driver_verification.preprocess import DEFAULT_PREPROCESS
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay sample CNIC/face images through the verification stages and report per-stage "
+        "latency percentiles and peak RSS. Reports are saved as JSON and compared with the previous run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cnic-dir', default=str(Path(settings.MEDIA_ROOT) / 'cnic_images'))
+        parser.add_argument('--face-dir', default=str(Path(settings.MEDIA_ROOT) / 'face_images'))
+        parser.add_argument('--limit', type=int, default=None, help="Number of pairs to replay (default: all).")
+        parser.add_argument('--mode', choices=['serial', 'pool'], default='serial')
+        parser.add_argument('--workers', type=int, default=None, help="Pool size (default: DRIVER_VERIFICATION['WORKERS']).")
+        parser.add_argument('--baseline', help="Report to compare with (default: the latest saved report of the same mode).")
+        parser.add_argument('--max-regression', type=float, default=None,
+                            help="Fail if any stage's p95 latency is this many percent slower than the baseline.")
+        parser.add_argument('--no-save', action='store_true', help="Don't store the report.")
+
+    def handle(self, *args, **options):
+        pairs = sample_pairs(options['cnic_dir'], options['face_dir'], options['limit'])
+        if not pairs:
+            raise CommandError("No sample images found.")
+
+        config = verification_settings()
+        workers = options['workers'] or config['WORKERS']
+        preprocess_options = {key: value for key, value in config.items() if key in DEFAULT_PREPROCESS}
+        report = run_benchmark(pairs, options['mode'], workers, preprocess_options)
+
+        self.stdout.write(
+            f"{report['pairs']} pairs, mode={report['mode']}, workers={report['workers']}: "
+            f"{report['wall_seconds']:.1f} s, {report['pairs_per_second']:.2f} pairs/s, "
+            f"peak RSS {report['peak_rss_mb']:.0f} MB"
+        )
+        for stage in STAGES:
+            stats = report['stages'][stage]
+            if stats is None:
+                self.stdout.write(f"  {stage:<11} not measured")
+                continue
+            percentiles = ' '.join(f"p{p}={stats[f'p{p}_ms']:.1f}" for p in PERCENTILES)
+            self.stdout.write(f"  {stage:<11} {percentiles} max={stats['max_ms']:.1f} ms")
+        for error in report['errors']:
+            self.stdout.write(self.style.WARNING(f"  {error}"))
+
+        saved = None
+        if not options['no_save']:
+            saved = save_report(report)
+            self.stdout.write(f"Saved {saved}")
+
+        baseline_path = options['baseline'] or latest_report(report['mode'], exclude=saved)
+        if not baseline_path:
+            return
+        baseline = json.loads(Path(baseline_path).read_text())
+        changes = compare(report, baseline)
+        self.stdout.write(f"p95 vs {baseline.get('commit')} ({Path(baseline_path).name}):")
+        for stage, change in changes.items():
+            self.stdout.write(f"  {stage:<11} {change:+.1f}%")
+
+        if options['max_regression'] is not None:
+            regressed = {stage: change for stage, change in changes.items() if change > options['max_regression']}
+            if regressed:
+                raise CommandError(
+                    "p95 regression over the limit: " + ', '.join(f"{s} {c:+.1f}%" for s, c in regressed.items())
+                )
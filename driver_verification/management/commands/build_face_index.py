@@ -0,0 +1,40 @@
+import face_recognition
+from django.core.management.base import BaseCommand
+
+from driver_verification.face_index import to_bytes
+from driver_verification.models import DriverVerification
+from driver_verification.pipeline import verification_settings
+from driver_verification.preprocess import decode
+
+
+class Command(BaseCommand):
+    help = "Compute and store selfie encodings for verified drivers that don't have one yet (one-off backfill)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="Maximum number of verifications to process.")
+
+    def handle(self, *args, **options):
+        face_side = verification_settings()['FACE_MAX_SIDE']
+        queryset = DriverVerification.objects.filter(
+            verification_status="Verified", face_encoding__isnull=True
+        ).only('verification_id', 'face_image').order_by('verified_at')
+        if options['limit']:
+            queryset = queryset[:options['limit']]
+
+        stored = skipped = 0
+        for verification in queryset.iterator(chunk_size=200):
+            try:
+                image = decode(verification.face_image.path, face_side)[:, :, ::-1]  # BGR -> RGB
+                locations = face_recognition.face_locations(image)
+            except (OSError, ValueError) as e:
+                self.stderr.write(f"{verification.verification_id}: {e}")
+                skipped += 1
+                continue
+            if not locations:
+                skipped += 1
+                continue
+            encoding = face_recognition.face_encodings(image, locations[:1])[0]
+            DriverVerification.objects.filter(pk=verification.pk).update(face_encoding=to_bytes(encoding))
+            stored += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Stored {stored} face encodings, skipped {skipped}."))
@@ -0,0 +1,86 @@
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import face_recognition
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from driver_verification.pipeline import face_stage, verification_settings
+from driver_verification.preprocess import DEFAULT_PREPROCESS, ocr_image, prepare
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.webp'}
+
+
+def sample_images(folder):
+    return sorted(p for p in Path(folder).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def full_resolution_path(cnic_path, face_path):
+    """Face match and OCR input the way the checks ran before ``preprocess``."""
+    cnic_faces = face_recognition.face_encodings(face_recognition.load_image_file(cnic_path))
+    face_faces = face_recognition.face_encodings(face_recognition.load_image_file(face_path))
+    if cnic_faces and face_faces:
+        face_recognition.compare_faces([cnic_faces[0]], face_faces[0])
+    gray = cv2.cvtColor(cv2.imread(str(cnic_path)), cv2.COLOR_BGR2GRAY)
+    return bool(cnic_faces and face_faces), gray
+
+
+def preprocessed_path(cnic_path, face_path, options):
+    prepared = prepare(cnic_path, face_path, options)
+    faces_found, _, location, _ = face_stage(prepared)
+    return faces_found, ocr_image(prepared, location, options['OCR_THRESHOLD'])
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare decode + face match + OCR input preparation at full resolution against the "
+        "preprocessing stage on the sample uploads; reports time and peak traced memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cnic-dir', default=str(Path(settings.MEDIA_ROOT) / 'cnic_images'))
+        parser.add_argument('--face-dir', default=str(Path(settings.MEDIA_ROOT) / 'face_images'))
+        parser.add_argument('--limit', type=int, default=20, help="Number of CNIC/face pairs to replay.")
+
+    def handle(self, *args, **options):
+        pairs = list(zip(sample_images(options['cnic_dir']), sample_images(options['face_dir'])))[:options['limit']]
+        if not pairs:
+            self.stderr.write("No sample images found.")
+            return
+        preprocess_options = {key: value for key, value in verification_settings().items() if key in DEFAULT_PREPROCESS}
+
+        totals = {'full': [0.0, 0], 'preprocessed': [0.0, 0]}
+        disagreements = 0
+        for cnic_path, face_path in pairs:
+            (full_found, _), full_time, full_peak = measure(full_resolution_path, cnic_path, face_path)
+            (pre_found, _), pre_time, pre_peak = measure(preprocessed_path, cnic_path, face_path, preprocess_options)
+            totals['full'][0] += full_time
+            totals['full'][1] = max(totals['full'][1], full_peak)
+            totals['preprocessed'][0] += pre_time
+            totals['preprocessed'][1] = max(totals['preprocessed'][1], pre_peak)
+            disagreements += full_found != pre_found
+            self.stdout.write(
+                f"{cnic_path.name} + {face_path.name}: "
+                f"{full_time * 1000:.0f} ms / {full_peak / 2**20:.1f} MiB -> "
+                f"{pre_time * 1000:.0f} ms / {pre_peak / 2**20:.1f} MiB"
+            )
+
+        (full_time, full_peak), (pre_time, pre_peak) = totals['full'], totals['preprocessed']
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(pairs)} pairs: {full_time / len(pairs) * 1000:.0f} ms -> {pre_time / len(pairs) * 1000:.0f} ms per pair "
+            f"({(1 - pre_time / full_time) * 100:.0f}% less time), peak {full_peak / 2**20:.1f} MiB -> "
+            f"{pre_peak / 2**20:.1f} MiB ({(1 - pre_peak / full_peak) * 100:.0f}% less memory), "
+            f"face detection differs on {disagreements} pairs."
+        ))
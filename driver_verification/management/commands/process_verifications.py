@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from driver_verification.pipeline import process_pending_verifications
+
+
+class Command(BaseCommand):
+    help = "Run pending driver verifications (e.g. ones left behind by a restart) synchronously."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=50, help="Maximum number of verifications to run.")
+
+    def handle(self, *args, **options):
+        processed = process_pending_verifications(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} verifications."))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driver_verification', '0003_driververification_formatted_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driververification',
+            name='face_encoding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
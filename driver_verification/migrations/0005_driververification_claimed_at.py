@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driver_verification', '0004_driververification_face_encoding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driververification',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='driververification',
+            name='verification_status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Processing', 'Processing'), ('Verified', 'Verified'), ('Rejected', 'Rejected')], default='Pending', max_length=50),
+        ),
+    ]
@@ -12,7 +12,7 @@ class DriverVerification(models.Model):
     # Status fields
     verification_status = models.CharField(
         max_length=50,
-        choices=[('Pending', 'Pending'), ('Verified', 'Verified'), ('Rejected', 'Rejected')],
+        choices=[('Pending', 'Pending'), ('Processing', 'Processing'), ('Verified', 'Verified'), ('Rejected', 'Rejected')],
         default='Pending'
     )
     face_verification_status = models.BooleanField(default=False)
@@ -22,6 +22,8 @@ class DriverVerification(models.Model):
     cnic_number = models.CharField(max_length=20, null=True, blank=True)  # Extracted from CNIC
     full_name = models.CharField(max_length=100, null=True, blank=True)   # Extracted from CNIC
     formatted_text = models.TextField(null=True, blank=True) 
+    face_encoding = models.BinaryField(null=True, blank=True, editable=False)  # 128 float32s of the selfie, see face_index
+    claimed_at = models.DateTimeField(null=True, blank=True)  # when a worker moved it to Processing
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
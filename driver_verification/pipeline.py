@@ -0,0 +1,314 @@
+# driver_verification/pipeline.py
+"""
+Driver verification pipeline.
+
+Uploading a verification only stores the images; the checks run after the
+request on a coordinator thread, which hands the CPU-heavy stages (face
+encodings, OCR) to a ``ProcessPoolExecutor`` and records every step as a
+``VerificationLog`` row. The ``DriverVerification`` row itself is the job:
+its id is returned to the client. A run first claims it by moving it from
+``Pending`` to ``Processing`` with a conditional UPDATE, so a job submitted
+twice (or picked up by ``process_verifications`` while a worker has it) runs
+once. Anything still ``Pending`` after a restart, or left ``Processing`` by a
+worker that died, is picked up by ``process_verifications``.
+
+Each upload is decoded once per job (see ``preprocess``) and the face and OCR
+steps share those buffers inside a single worker call, ``analyze``, which only
+takes file paths so it can be pickled into a worker process; it never touches
+the database.
+"""
+import logging
+import re
+import threading
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import face_recognition
+import numpy as np
+import pytesseract
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from accounts.models import DriverProfile
+from accounts.principal import invalidate_principal
+from .models import DriverVerification, VerificationLog
+from .face_index import get_face_index, index_verification, to_bytes
+from .preprocess import DEFAULT_PREPROCESS, ocr_image, prepare
+
+logger = logging.getLogger(__name__)
+
+STALE_AFTER = timedelta(minutes=10)  # Processing verifications older than this are considered lost
+
+DEFAULT_VERIFICATION = {
+    'WORKERS': 2,  # CPU worker processes
+    'RUN_INLINE': False,  # True runs the checks synchronously on commit, in-process (tests)
+    'FACE_DUPLICATE_TOLERANCE': 0.5,  # embedding distance under which two selfies are the same person
+    'FACE_INDEX_TTL': 60 * 60,  # seconds before a process rebuilds its face index
+    'FACE_INDEX_BALLTREE_MIN': 2000,  # verified faces before the index switches to a BallTree
+    **DEFAULT_PREPROCESS,
+}
+
+
+def verification_settings():
+    return {**DEFAULT_VERIFICATION, **getattr(settings, 'DRIVER_VERIFICATION', {})}
+
+
+# --------------------------------------------------------------------------
+# Stages (run in worker processes)
+# --------------------------------------------------------------------------
+
+def face_stage(prepared):
+    """
+    Compare the face on the CNIC with the selfie.
+    Returns (faces_found, is_match, cnic_face_location, selfie_encoding).
+    """
+    cnic_locations = face_recognition.face_locations(prepared.cnic_rgb)
+    face_locations = face_recognition.face_locations(prepared.face_rgb)
+    if not cnic_locations or not face_locations:
+        return False, False, None, None
+    # Reuse the detections instead of letting face_encodings detect again
+    cnic_encoding = face_recognition.face_encodings(prepared.cnic_rgb, cnic_locations[:1])[0]
+    face_encoding = face_recognition.face_encodings(prepared.face_rgb, face_locations[:1])[0]
+    is_match = bool(face_recognition.compare_faces([cnic_encoding], face_encoding)[0])
+    return True, is_match, cnic_locations[0], face_encoding.astype(np.float32)
+
+
+def ocr_stage(prepared, face_location=None, threshold=True):
+    return pytesseract.image_to_string(ocr_image(prepared, face_location, threshold))
+
+
+def analyze(cnic_path, face_path, options=None):
+    """
+    Worker entry point: decode both uploads once, run the face check and, if the
+    faces match, OCR on the same buffers.
+    """
+    options = {**DEFAULT_PREPROCESS, **(options or {})}
+    prepared = prepare(cnic_path, face_path, options)
+    faces_found, is_match, face_location, face_encoding = face_stage(prepared)
+    raw_text = None
+    if is_match:
+        raw_text = ocr_stage(prepared, face_location, options['OCR_THRESHOLD'])
+    return {
+        'faces_found': faces_found,
+        'is_face_match': is_match,
+        'face_encoding': face_encoding,
+        'raw_text': raw_text,
+    }
+
+
+def parse_cnic_text(raw_text):
+    """Returns (formatted_text, cnic_number, full_name) from the OCR output."""
+    lines = [line.strip() for line in raw_text.split('\n') if line.strip()]
+    text_normalized = re.sub(r'[^0-9A-Za-z\s]', '', raw_text)
+
+    cnic_candidate = re.findall(r'\d{5}\s*\d{7}\s*\d', text_normalized)
+    cnic_number = cnic_candidate[0] if cnic_candidate else None
+
+    name = None
+    for i, line in enumerate(lines):
+        if 'Name' in line or 'NAME' in line:
+            if i + 1 < len(lines):
+                name = lines[i + 1]
+            break
+    return '\n'.join(lines), cnic_number, name
+
+
+# --------------------------------------------------------------------------
+# Executors
+# --------------------------------------------------------------------------
+
+_process_pool = None
+_coordinator = None
+_executor_lock = threading.Lock()
+
+
+def get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        with _executor_lock:
+            if _process_pool is None:
+                _process_pool = ProcessPoolExecutor(max_workers=verification_settings()['WORKERS'])
+    return _process_pool
+
+
+def get_coordinator():
+    global _coordinator
+    if _coordinator is None:
+        with _executor_lock:
+            if _coordinator is None:
+                _coordinator = ThreadPoolExecutor(
+                    max_workers=verification_settings()['WORKERS'], thread_name_prefix='verification'
+                )
+    return _coordinator
+
+
+def _call_stage(fn, *args):
+    # Library exceptions (e.g. TesseractNotFoundError) don't always survive pickling
+    # back to the parent, and one that doesn't breaks the whole pool
+    try:
+        return fn(*args)
+    except Exception as e:
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+def _run_stage(fn, *args):
+    global _process_pool
+    if verification_settings()['RUN_INLINE']:
+        return fn(*args)
+    pool = get_process_pool()
+    try:
+        return pool.submit(_call_stage, fn, *args).result()
+    except BrokenProcessPool:
+        # A worker died (OOM, segfault in a native library); start a fresh pool for later jobs
+        with _executor_lock:
+            if _process_pool is pool:
+                _process_pool = None
+        raise
+
+
+def enqueue_verification(verification):
+    """Log the job and start it once the current transaction commits."""
+    VerificationLog.objects.create(
+        verification=verification,
+        action="Verification Queued",
+        comments="Images received, verification will run in the background."
+    )
+
+    def start():
+        if verification_settings()['RUN_INLINE']:
+            run_verification(verification.verification_id)
+        else:
+            get_coordinator().submit(_run_in_worker, verification.verification_id)
+
+    transaction.on_commit(start)
+
+
+def _run_in_worker(verification_id):
+    close_old_connections()
+    try:
+        run_verification(verification_id)
+    finally:
+        close_old_connections()
+
+
+# --------------------------------------------------------------------------
+# Coordinator
+# --------------------------------------------------------------------------
+
+def _log(verification, action, comments):
+    VerificationLog.objects.create(verification=verification, action=action, comments=comments)
+
+
+def _reject(verification, reason, action, comments):
+    verification.verification_status = "Rejected"
+    verification.failure_reason = reason
+    verification.save()
+    _log(verification, action, comments)
+
+
+def run_verification(verification_id):
+    claimed = DriverVerification.objects.filter(
+        verification_id=verification_id, verification_status="Pending"
+    ).update(verification_status="Processing", claimed_at=timezone.now())
+    if not claimed:
+        return
+    verification = DriverVerification.objects.select_related('user').get(verification_id=verification_id)
+
+    try:
+        _log(verification, "Verification Started", "Face check and CNIC OCR running.")
+
+        options = {key: value for key, value in verification_settings().items() if key in DEFAULT_PREPROCESS}
+        result = _run_stage(analyze, verification.cnic_image.path, verification.face_image.path, options)
+
+        # --- FACE VERIFICATION ---
+        is_face_match = result['is_face_match']
+        if not result['faces_found']:
+            verification.face_verification_status = False
+            _reject(verification, "Face not detected in one of the images.",
+                    "Face Verification Failed", "No face detected in uploaded images.")
+            return
+
+        verification.face_verification_status = is_face_match
+        verification.face_encoding = to_bytes(result['face_encoding'])
+        if not is_face_match:
+            _reject(verification, "Face did not match.", "Verification Failed",
+                    f"Face match: False, CNIC: {verification.cnic_number}, Name: {verification.full_name}")
+            return
+        _log(verification, "Face Verified", "Face matched, checking CNIC details.")
+
+        # --- PREVENT MULTIPLE ACCOUNTS WITH THE SAME FACE ---
+        duplicates = get_face_index().matches(
+            result['face_encoding'],
+            verification_settings()['FACE_DUPLICATE_TOLERANCE'],
+            exclude_user_id=verification.user_id,
+        )
+        if duplicates:
+            distance, duplicate_id, _ = duplicates[0]
+            _reject(verification, "This face is already verified on another account.",
+                    "Face Duplicate Blocked", f"Selfie matches verified verification {duplicate_id} (distance {distance:.3f}).")
+            return
+
+        # --- CNIC OCR EXTRACTION ---
+        verification.formatted_text, verification.cnic_number, verification.full_name = parse_cnic_text(result['raw_text'])
+
+        # --- PREVENT MULTIPLE ACCOUNTS USING SAME CNIC ---
+        if verification.cnic_number and DriverVerification.objects.filter(
+            cnic_number=verification.cnic_number,
+            verification_status="Verified"
+        ).exclude(user=verification.user).exists():
+            verification.document_verification_status = False
+            _reject(verification, "This CNIC is already verified by another user.",
+                    "CNIC Duplicate Blocked", "CNIC already used by another verified driver.")
+            return
+
+        # FINAL DECISION - Both CNIC number and Name must be extracted
+        if verification.cnic_number and verification.full_name:
+            verification.document_verification_status = True
+            verification.verification_status = "Verified"
+            verification.verified_at = timezone.now()
+        else:
+            verification.document_verification_status = False
+            verification.verification_status = "Rejected"
+            missing = []
+            if not verification.cnic_number:
+                missing.append("CNIC number")
+            if not verification.full_name:
+                missing.append("Name")
+            verification.failure_reason = f"Could not extract {' and '.join(missing)} from CNIC image. Please upload a clearer image."
+
+        with transaction.atomic():
+            verification.save()
+            if verification.verification_status == "Verified":
+                DriverProfile.objects.filter(user=verification.user).update(is_driver_verified=True)
+                transaction.on_commit(lambda: invalidate_principal(verification.user_id))
+                transaction.on_commit(lambda: index_verification(verification))
+            _log(
+                verification,
+                "Verification Passed" if verification.verification_status == "Verified" else "Verification Failed",
+                f"Face match: {is_face_match}, CNIC: {verification.cnic_number}, Name: {verification.full_name}"
+            )
+
+    except Exception as e:
+        logger.error(f"Verification error: {str(e)}")
+        _reject(verification, str(e)[:255], "Verification Error", str(e))
+
+
+def process_pending_verifications(limit=50):
+    """
+    Run verifications still Pending (e.g. lost in a restart) synchronously.
+    Verifications stuck in Processing (worker died mid-check) are put back in
+    the queue first. Returns the number run.
+    """
+    DriverVerification.objects.filter(
+        verification_status="Processing", claimed_at__lt=timezone.now() - STALE_AFTER
+    ).update(verification_status="Pending")
+    verification_ids = list(
+        DriverVerification.objects.filter(verification_status="Pending")
+        .order_by('created_at').values_list('verification_id', flat=True)[:limit]
+    )
+    for verification_id in verification_ids:
+        run_verification(verification_id)
+    return len(verification_ids)
@@ -0,0 +1,100 @@
+# driver_verification/preprocess.py
+"""
+Decode each verification upload once and derive the buffers the checks need.
+
+Phone photos are often 3000-4000 px on the long side, but face detection only
+needs ~1000 px and Tesseract does better on a clean binarised image than on a
+full-colour photo. ``prepare`` decodes every file once (JPEGs are decoded at a
+reduced scale straight away when they are much larger than needed) and hands
+back:
+
+- ``cnic_rgb`` / ``face_rgb``: RGB images bounded to ``FACE_MAX_SIDE`` for
+  face detection and encoding,
+- ``cnic_gray``: the CNIC in grayscale bounded to ``OCR_MAX_SIDE``, from which
+  ``ocr_image`` builds the thresholded crop for Tesseract.
+
+The same arrays are reused by the face and OCR steps of ``pipeline.analyze``.
+"""
+import cv2
+from PIL import Image
+
+DEFAULT_PREPROCESS = {
+    'FACE_MAX_SIDE': 1024,  # px, longest side used for face detection/encoding
+    'OCR_MAX_SIDE': 1800,  # px, longest side of the image handed to Tesseract
+    'OCR_THRESHOLD': True,  # adaptive threshold before OCR (False: plain grayscale)
+}
+
+# cv2 can decode JPEGs directly at 1/2, 1/4 or 1/8 scale, which is much cheaper
+# than decoding at full size and resizing
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+class PreparedImages:
+    __slots__ = ('cnic_rgb', 'face_rgb', 'cnic_gray', 'ocr_scale')
+
+    def __init__(self, cnic_rgb, face_rgb, cnic_gray):
+        self.cnic_rgb = cnic_rgb
+        self.face_rgb = face_rgb
+        self.cnic_gray = cnic_gray
+        # cnic_gray pixels per cnic_rgb pixel, to map face boxes onto the OCR image
+        self.ocr_scale = cnic_gray.shape[1] / cnic_rgb.shape[1]
+
+
+def decode(path, max_side):
+    """BGR image with its longest side at most ``max_side``, decoded once."""
+    with Image.open(path) as header:  # reads the header only
+        longest = max(header.size)
+        is_jpeg = header.format == 'JPEG'
+
+    flag = cv2.IMREAD_COLOR
+    if is_jpeg:
+        for factor, reduced in _REDUCED_FLAGS:
+            if longest / factor >= max_side:
+                flag = reduced
+                break
+
+    image = cv2.imread(str(path), flag)
+    if image is None:
+        raise ValueError(f"Could not read image {path}")
+    return bound(image, max_side)
+
+
+def bound(image, max_side):
+    height, width = image.shape[:2]
+    longest = max(height, width)
+    if longest <= max_side:
+        return image
+    scale = max_side / longest
+    return cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def prepare(cnic_path, face_path, options=None):
+    options = {**DEFAULT_PREPROCESS, **(options or {})}
+    face_side, ocr_side = options['FACE_MAX_SIDE'], options['OCR_MAX_SIDE']
+
+    cnic_bgr = decode(cnic_path, max(face_side, ocr_side))
+    cnic_gray = cv2.cvtColor(bound(cnic_bgr, ocr_side), cv2.COLOR_BGR2GRAY)
+    cnic_rgb = cv2.cvtColor(bound(cnic_bgr, face_side), cv2.COLOR_BGR2RGB)
+    del cnic_bgr
+
+    face_rgb = cv2.cvtColor(decode(face_path, face_side), cv2.COLOR_BGR2RGB)
+    return PreparedImages(cnic_rgb, face_rgb, cnic_gray)
+
+
+def ocr_image(prepared, face_location=None, threshold=True):
+    """
+    Tesseract input: the CNIC photo blanked out (it only produces noise) and,
+    with ``threshold``, binarised with a local threshold that copes with the
+    uneven lighting and printed background pattern of phone photos.
+    """
+    image = prepared.cnic_gray
+    if face_location is not None:
+        image = image.copy()
+        top, right, bottom, left = (round(v * prepared.ocr_scale) for v in face_location)
+        # The box from face_locations is tight around the face; widen it to the whole portrait
+        pad_x, pad_y = (right - left) // 4, (bottom - top) // 2
+        image[max(top - pad_y, 0):bottom + pad_y, max(left - pad_x, 0):right + pad_x] = 255
+    if not threshold:
+        return image
+    image = cv2.medianBlur(image, 3)
+    return cv2.adaptiveThreshold(image, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
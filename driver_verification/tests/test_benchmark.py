@@ -0,0 +1,39 @@
+from driver_verification.benchmark import compare, latest_report, save_report, summarize
+
+
+def fake_result(decode_ms, face_ms, ocr_ms=None):
+    timings = {'decode': decode_ms / 1000, 'face_match': face_ms / 1000, 'cnic_regex': 0.0001}
+    if ocr_ms is not None:
+        timings['ocr'] = ocr_ms / 1000
+    return {
+        'pair': ['cnic.jpg', 'face.jpg'], 'timings': timings, 'faces_found': True,
+        'cnic_found': ocr_ms is not None, 'name_found': False,
+        'error': None if ocr_ms is not None else "TesseractNotFoundError: missing", 'peak_rss_mb': 100.0,
+    }
+
+
+def test_summarize_reports_stage_percentiles():
+    results = [fake_result(10 * i, 100 * i) for i in range(1, 101)]
+
+    report = summarize(results, wall_seconds=50.0, mode='serial', workers=1, worker_peak_rss_mb=0)
+
+    assert report['pairs'] == 100
+    assert report['pairs_per_second'] == 2.0
+    assert round(report['stages']['decode']['p50_ms'], 1) == 505.0
+    assert round(report['stages']['face_match']['p99_ms'], 1) == 9901.0
+    assert report['stages']['ocr'] is None
+    assert report['errors'] == ["TesseractNotFoundError: missing"]
+
+
+def test_compare_and_stored_reports(tmp_path):
+    baseline = summarize([fake_result(10, 100, 50)], 1.0, 'serial', 1, 0)
+    current = summarize([fake_result(15, 90, 50)], 1.0, 'serial', 1, 0)
+
+    changes = compare(current, baseline)
+    assert round(changes['decode']) == 50
+    assert round(changes['face_match']) == -10
+    assert changes['ocr'] == 0
+
+    first = save_report(baseline, tmp_path)
+    assert latest_report('serial', tmp_path) == first
+    assert latest_report('pool', tmp_path) is None
@@ -0,0 +1,119 @@
+import uuid
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from driver_verification.face_index import FaceIndex, get_face_index, reset_face_index, to_bytes
+from driver_verification.models import DriverVerification
+from driver_verification.pipeline import run_verification
+
+
+def random_faces(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 0.1, size=(count, 128)).astype(np.float32)
+
+
+def test_matches_closest_first_and_excludes_own_user():
+    faces = random_faces(3)
+    index = FaceIndex()
+    index.add("v1", 1, faces[0])
+    index.add("v2", 2, faces[0] + 0.01)
+    index.add("v3", 3, faces[1])
+
+    matches = index.matches(faces[0] + 0.005, tolerance=0.5)
+    assert [m[1] for m in matches] == ["v1", "v2"]
+
+    assert [m[1] for m in index.matches(faces[0], tolerance=0.5, exclude_user_id=1)] == ["v2"]
+
+
+def test_index_grows_and_removes_incrementally():
+    faces = random_faces(200)
+    index = FaceIndex()
+    for i, face in enumerate(faces):
+        index.add(f"v{i}", i, face)
+
+    assert len(index) == 200
+    assert index.matches(faces[150], tolerance=1e-4)[0][1] == "v150"
+
+    index.remove("v150")
+    assert index.matches(faces[150], tolerance=1e-4) == []
+    assert len(index) == 199
+
+
+def test_balltree_and_linear_scan_agree():
+    faces = random_faces(300, seed=1)
+    linear, tree = FaceIndex(balltree_min_size=10**9), FaceIndex(balltree_min_size=50)
+    for i, face in enumerate(faces[:250]):
+        linear.add(f"v{i}", i, face)
+        tree.add(f"v{i}", i, face)
+    tree.matches(faces[0], tolerance=0.1)  # builds the tree
+    for i, face in enumerate(faces[250:], start=250):  # appended after the tree
+        linear.add(f"v{i}", i, face)
+        tree.add(f"v{i}", i, face)
+
+    for probe in (faces[10], faces[260], faces[299] + 0.02):
+        assert [m[1] for m in tree.matches(probe, 1.4)] == [m[1] for m in linear.matches(probe, 1.4)]
+
+
+def make_user():
+    unique_id = str(uuid.uuid4().int)[:6]
+    return CustomUser.objects.create_user(
+        email=f"driver_{unique_id}@example.com",
+        password="pass1234",
+        phone_number=f"+92301{unique_id}9",
+        role="Driver",
+    )
+
+
+@pytest.mark.django_db
+def test_verification_with_an_already_verified_face_is_rejected(settings):
+    settings.DRIVER_VERIFICATION = {'RUN_INLINE': True}
+    reset_face_index()
+    face = random_faces(1, seed=2)[0]
+    DriverVerification.objects.create(
+        user=make_user(),
+        face_image="face_images/test.jpg",
+        cnic_image="cnic_images/test.jpg",
+        verification_status="Verified",
+        verified_at=timezone.now(),
+        face_encoding=to_bytes(face),
+    )
+    verification = DriverVerification.objects.create(
+        user=make_user(),
+        face_image="face_images/other.jpg",
+        cnic_image="cnic_images/other.jpg",
+    )
+
+    result = {'faces_found': True, 'is_face_match': True, 'face_encoding': face + 0.01, 'raw_text': ""}
+    with patch("driver_verification.pipeline.analyze", return_value=result):
+        run_verification(verification.verification_id)
+
+    verification.refresh_from_db()
+    assert verification.verification_status == "Rejected"
+    assert verification.failure_reason == "This face is already verified on another account."
+    assert verification.logs.filter(action="Face Duplicate Blocked").exists()
+    reset_face_index()
+
+
+@pytest.mark.django_db
+def test_repeated_syncs_do_not_grow_the_index():
+    reset_face_index()
+    for face in random_faces(3, seed=3):
+        DriverVerification.objects.create(
+            user=make_user(),
+            face_image="face_images/test.jpg",
+            cnic_image="cnic_images/test.jpg",
+            verification_status="Verified",
+            verified_at=timezone.now(),
+            face_encoding=to_bytes(face),
+        )
+
+    index = get_face_index()
+    size = index._size
+    for _ in range(3):
+        assert get_face_index() is index
+    assert (len(index), index._size) == (3, size)
+    reset_face_index()
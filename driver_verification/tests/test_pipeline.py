@@ -0,0 +1,62 @@
+import uuid
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from driver_verification.face_index import reset_face_index
+from driver_verification.models import DriverVerification
+from driver_verification.pipeline import STALE_AFTER, process_pending_verifications, run_verification
+
+
+def make_verification(**fields):
+    unique_id = str(uuid.uuid4().int)[:6]
+    user = CustomUser.objects.create_user(
+        email=f"driver_{unique_id}@example.com",
+        password="pass1234",
+        phone_number=f"+92302{unique_id}9",
+        role="Driver",
+    )
+    return DriverVerification.objects.create(
+        user=user, face_image="face_images/test.jpg", cnic_image="cnic_images/test.jpg", **fields
+    )
+
+
+NO_FACE = {'faces_found': False, 'is_face_match': False, 'face_encoding': None, 'raw_text': ""}
+
+
+@pytest.mark.django_db
+def test_second_run_is_a_no_op(settings):
+    settings.DRIVER_VERIFICATION = {'RUN_INLINE': True}
+    reset_face_index()
+    verification = make_verification()
+
+    with patch("driver_verification.pipeline.analyze", return_value=NO_FACE) as analyze:
+        run_verification(verification.verification_id)
+        run_verification(verification.verification_id)
+
+    assert analyze.call_count == 1
+    verification.refresh_from_db()
+    assert verification.verification_status == "Rejected"
+    assert verification.logs.filter(action="Verification Started").count() == 1
+
+
+@pytest.mark.django_db
+def test_claimed_verification_is_skipped_until_stale(settings):
+    settings.DRIVER_VERIFICATION = {'RUN_INLINE': True}
+    reset_face_index()
+    verification = make_verification(verification_status="Processing", claimed_at=timezone.now())
+
+    with patch("driver_verification.pipeline.analyze", return_value=NO_FACE) as analyze:
+        assert process_pending_verifications() == 0
+        assert analyze.call_count == 0
+
+        DriverVerification.objects.filter(pk=verification.pk).update(
+            claimed_at=timezone.now() - STALE_AFTER - STALE_AFTER
+        )
+        assert process_pending_verifications() == 1
+        assert analyze.call_count == 1
+
+    verification.refresh_from_db()
+    assert verification.verification_status == "Rejected"
@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+from driver_verification.preprocess import decode, ocr_image, prepare
+
+
+def write_jpeg(path, width, height):
+    image = np.full((height, width, 3), 200, dtype=np.uint8)
+    cv2.rectangle(image, (width // 10, height // 10), (width // 3, height // 3), (20, 20, 20), -1)
+    cv2.imwrite(str(path), image)
+    return path
+
+
+def test_decode_bounds_large_photos(tmp_path):
+    path = write_jpeg(tmp_path / "large.jpg", 4000, 3000)
+
+    image = decode(path, 1024)
+
+    assert max(image.shape[:2]) == 1024
+    assert image.shape[:2] == (768, 1024)
+
+
+def test_decode_keeps_small_images(tmp_path):
+    path = write_jpeg(tmp_path / "small.jpg", 800, 500)
+
+    assert decode(path, 1024).shape[:2] == (500, 800)
+
+
+def test_prepare_shares_one_decode_per_upload(tmp_path):
+    cnic = write_jpeg(tmp_path / "cnic.jpg", 3600, 2400)
+    face = write_jpeg(tmp_path / "face.jpg", 3000, 3000)
+
+    prepared = prepare(cnic, face, {'FACE_MAX_SIDE': 900, 'OCR_MAX_SIDE': 1800})
+
+    assert prepared.cnic_rgb.shape == (600, 900, 3)
+    assert prepared.cnic_gray.shape == (1200, 1800)
+    assert prepared.face_rgb.shape == (900, 900, 3)
+    assert prepared.ocr_scale == 2
+
+
+def test_ocr_image_blanks_portrait_and_binarises(tmp_path):
+    cnic = write_jpeg(tmp_path / "cnic.jpg", 1200, 800)
+    face = write_jpeg(tmp_path / "face.jpg", 400, 400)
+    prepared = prepare(cnic, face, {'FACE_MAX_SIDE': 600, 'OCR_MAX_SIDE': 1200})
+
+    # (top, right, bottom, left) in cnic_rgb coordinates
+    image = ocr_image(prepared, face_location=(100, 500, 200, 400))
+
+    assert set(np.unique(image)) <= {0, 255}
+    assert (image[200:400, 800:1000] == 255).all()
+    assert (prepared.cnic_gray[200:400, 800:1000] > 150).all()  # the shared buffer is untouched
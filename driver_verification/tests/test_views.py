@@ -5,64 +5,76 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from unittest.mock import patch
 from rest_framework_simplejwt.tokens import RefreshToken
+from driver_verification.face_index import reset_face_index
+import numpy as np
+import os
 import uuid
 
+DUMMY_IMAGE = os.path.join(os.path.dirname(__file__), "dummy.jpg")
+
 @pytest.mark.django_db
-@patch("face_recognition.face_encodings", return_value=[[0.1, 0.2, 0.3]])
+@patch("face_recognition.face_locations", return_value=[(20, 80, 80, 20)])
+@patch("face_recognition.face_encodings", return_value=[np.full(128, 0.1)])
 @patch("face_recognition.compare_faces", return_value=[True])
 @patch("pytesseract.image_to_string", return_value="Name\nTest User\n12345 1234567 1")
-def test_driver_verification(mock1, mock2, mock3):
+def test_driver_verification(mock1, mock2, mock3, mock4, settings, tmp_path, django_capture_on_commit_callbacks):
+    settings.DRIVER_VERIFICATION = {'RUN_INLINE': True}
+    settings.MEDIA_ROOT = tmp_path
+    reset_face_index()
     client = APIClient()
 
     # 1️⃣ Create unique user
-    unique_id = str(uuid.uuid4())[:8]
+    unique_id = str(uuid.uuid4().int)[:6]
     user = CustomUser.objects.create_user(
         email=f"testdriver_{unique_id}@example.com",
         password="pass1234",
         first_name=f"Test{unique_id}",
         last_name=f"Driver{unique_id}",
-        phone_number=f"+92300{unique_id}99",
+        phone_number=f"+92300{unique_id}9",
+        role="Driver",
     )
 
-    # 2️⃣ Set is_driver=True if required by permission class
-    user.is_driver = True
-    user.save()
-
-    # 3️⃣ Create driver profile
+    # 2️⃣ Create driver profile
     DriverProfile.objects.create(
         user=user,
         license_number=f"LIC{unique_id}",
-        is_driver_verified=True
+        is_driver_verified=False
     )
 
-    # 4️⃣ Generate JWT token and set header
+    # 3️⃣ Generate JWT token and set header
     refresh = RefreshToken.for_user(user)
     token = str(refresh.access_token)
     client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
 
-    # 5️⃣ Prepare in-memory fake images
-    face_file = SimpleUploadedFile("face.jpg", b"fake image content", content_type="image/jpeg")
-    cnic_file = SimpleUploadedFile("cnic.jpg", b"fake image content", content_type="image/jpeg")
+    # 4️⃣ Prepare in-memory fake images
+    with open(DUMMY_IMAGE, "rb") as f:
+        image_content = f.read()
+    face_file = SimpleUploadedFile("face.jpg", image_content, content_type="image/jpeg")
+    cnic_file = SimpleUploadedFile("cnic.jpg", image_content, content_type="image/jpeg")
+
+    # 5️⃣ Upload: the job is queued, the checks run once the request commits
+    url = reverse("driver_verification:driver-verification")
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(url, {
+            "face_image": face_file,
+            "cnic_image": cnic_file
+        }, format="multipart")
 
-    # 6️⃣ Call verification endpoint
-    url = reverse("driver-verification")
-    response = client.post(url, {
-        "face_image": face_file,
-        "cnic_image": cnic_file
-    }, format="multipart")
+    assert response.status_code == 202
+    assert response.data["status"] == "Pending"
+    job_id = response.data["job_id"]
 
-    # 7️⃣ Debug prints
-    print("User:", user.email)
-    print("Is authenticated?", user.is_authenticated)
-    print("Has driver_profile?", hasattr(user, 'driver_profile'))
-    print("Driver verified?", getattr(user.driver_profile, 'is_driver_verified', None))
-    print("Response status:", response.status_code)
-    print("Response data:", response.data)
+    # 6️⃣ Poll the job
+    response = client.get(reverse("driver_verification:verification-detail", kwargs={'verification_id': job_id}))
 
-    # 8️⃣ Assertions
-    assert response.status_code == 201
+    assert response.status_code == 200
     assert response.data["status"] == "Verified"
     assert response.data["is_face_verified"] is True
     assert response.data["is_document_verified"] is True
     assert response.data["cnic_number"] is not None
     assert response.data["full_name"] == "Test User"
+    assert [log["action"] for log in response.data["logs"]] == [
+        "Verification Queued", "Verification Started", "Face Verified", "Verification Passed"
+    ]
+    user.driver_profile.refresh_from_db()
+    assert user.driver_profile.is_driver_verified is True
@@ -1,10 +1,11 @@
 from django.urls import path
-from .views import DriverVerificationListCreateView, VerificationLogListView
+from .views import DriverVerificationListCreateView, DriverVerificationDetailView, VerificationLogListView
 
 app_name = 'driver_verification'
 
 urlpatterns = [
     path('verifications/', DriverVerificationListCreateView.as_view(), name='driver-verification'),
+    path('verifications/<uuid:verification_id>/', DriverVerificationDetailView.as_view(), name='verification-detail'),
     path('verification-logs/', VerificationLogListView.as_view(), name='verification-logs'),
 ]
 
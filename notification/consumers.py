@@ -0,0 +1,101 @@
+import json
+import logging
+import uuid
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.utils.dateparse import parse_datetime
+
+from .dispatch import serialize, user_group
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+CATCH_UP_LIMIT = 100
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Live notifications for the connected user.
+
+    Everything written by ``notification.dispatch`` is pushed to the user's
+    group as ``{"type": "notifications", "notifications": [...]}``. A client
+    that reconnects passes the last notification it has seen, as
+    ``?since=<notification_id or ISO timestamp>`` or a
+    ``{"type": "catch_up", "since": ...}`` message, and gets what it missed
+    (oldest first, ``has_more`` set when it should ask again). A timestamp's
+    ``+`` may be sent unescaped in the query string. A ``since`` that is neither
+    a timestamp nor one of the user's notifications gets an error frame, not a
+    replay from the beginning.
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
+
+        self.group_name = user_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        since = parse_qs(self.scope.get('query_string', b'').decode()).get('since')
+        if since:
+            await self.send_catch_up(since[0])
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data or '')
+        except json.JSONDecodeError:
+            return
+
+        if data.get('type') == 'ping':
+            await self.send(json.dumps({'type': 'pong'}))
+        elif data.get('type') == 'catch_up':
+            await self.send_catch_up(data.get('since'))
+
+    async def notification_batch(self, event):
+        await self.send(json.dumps({'type': 'notifications', 'notifications': event['notifications']}))
+
+    async def send_catch_up(self, since):
+        result = await self.notifications_since(since)
+        if result is None:
+            await self.send(json.dumps({'type': 'error', 'error': f"Invalid 'since' cursor: {since}"}))
+            return
+        notifications, has_more = result
+        await self.send(json.dumps({'type': 'catch_up', 'notifications': notifications, 'has_more': has_more}))
+
+    @staticmethod
+    def parse_timestamp(since):
+        # parse_qs decodes an unescaped "+00:00" offset to " 00:00"
+        for candidate in (since, since.replace(' ', '+')):
+            try:
+                cursor = parse_datetime(candidate)
+            except ValueError:
+                cursor = None
+            if cursor is not None:
+                return cursor
+        return None
+
+    @database_sync_to_async
+    def notifications_since(self, since):
+        """(notifications, has_more) after ``since``, or None if ``since`` is not a valid cursor."""
+        queryset = Notification.objects.filter(user_id=self.scope['user'])
+        if since:
+            cursor = self.parse_timestamp(str(since))
+            if cursor is None:
+                try:
+                    cursor = queryset.filter(notification_id=uuid.UUID(str(since))).values_list('created_at', flat=True).first()
+                except ValueError:
+                    pass
+            if cursor is None:
+                return None
+            queryset = queryset.filter(created_at__gt=cursor)
+
+        rows = list(queryset.order_by('created_at')[:CATCH_UP_LIMIT + 1])
+        return [serialize(n) for n in rows[:CATCH_UP_LIMIT]], len(rows) > CATCH_UP_LIMIT
@@ -0,0 +1,138 @@
+# notification/dispatch.py
+"""
+Notification dispatcher.
+
+``notify()`` does not write anything by itself: notifications raised inside a
+transaction are collected per savepoint and written with one ``bulk_create``
+per savepoint when it commits (or straight away outside a transaction); those
+raised in a savepoint that rolls back are dropped with it. Duplicates of the same
+(user, delivery, type) are dropped by the unique constraint on
+``Notification`` instead of an ``exists()`` check per recipient. Whatever was
+actually inserted is then pushed to the recipients' notification groups over
+Channels.
+"""
+import logging
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import connection, transaction
+
+from .models import Notification, REPEATABLE_TYPES
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def user_group(user_id):
+    return f'notifications_{user_id}'
+
+
+def notify(user, delivery, notif_type, message, chat_message=None):
+    """Queue a notification for ``user``; written when the current transaction commits."""
+    if user is None:
+        return
+    notification = Notification(
+        user_id=user, delivery_id=delivery, type=notif_type, message=message, chat_message=chat_message
+    )
+
+    if not connection.in_atomic_block:
+        _write([notification])
+        return
+
+    # One batch per savepoint stack, registered with on_commit from inside it,
+    # so Django discards a batch together with the savepoint (or transaction)
+    # that rolls back. A batch whose callback is gone is never reused: the
+    # outermost block alone can't tell, @transaction.atomic reuses one Atomic
+    # for every call
+    outermost = connection.atomic_blocks[0]
+    if getattr(_local, 'block', None) is not outermost:
+        _local.block, _local.batches = outermost, {}
+    key = tuple(connection.savepoint_ids)
+    live = {callback[1] for callback in connection.run_on_commit if isinstance(callback[1], Batch)}
+    batch = _local.batches.get(key)
+    if batch not in live:
+        _local.batches = {k: b for k, b in _local.batches.items() if b in live}
+        batch = _local.batches[key] = Batch(key)
+    # Registered every time, like the savepoint it was queued in; only the
+    # first callback finds anything to write
+    transaction.on_commit(batch)
+    batch.add(notification)
+
+
+class Batch:
+    """Notifications queued in one savepoint, written with one ``bulk_create`` on commit."""
+
+    def __init__(self, key):
+        self.key = key
+        self.pending = {}
+
+    def add(self, notification):
+        if notification.type in REPEATABLE_TYPES:
+            key = notification.notification_id
+        else:
+            key = (notification.user_id_id, notification.delivery_id_id, notification.type)
+        self.pending.setdefault(key, notification)
+
+    def __call__(self):
+        # The savepoints enclosing this one were committed with it, so their
+        # batches go out in the same write
+        batches = getattr(_local, 'batches', None) or {}
+        enclosing = [batches.pop(key) for key in sorted(batches, key=len) if self.key[:len(key)] == key]
+        pending = {}
+        for batch in [*enclosing, self]:
+            for key, notification in batch.pending.items():
+                pending.setdefault(key, notification)
+            batch.pending = {}
+        if pending:
+            _write(list(pending.values()))
+
+
+def _write(notifications):
+    try:
+        Notification.objects.bulk_create(notifications, ignore_conflicts=True)
+        # ignore_conflicts hides which rows lost to the unique constraint, ask for the ones that made it
+        inserted = set(
+            Notification.objects.filter(
+                notification_id__in=[n.notification_id for n in notifications]
+            ).values_list('notification_id', flat=True)
+        )
+    except Exception as e:
+        logger.error(f"Error writing {len(notifications)} notifications: {str(e)}")
+        return []
+
+    written = [n for n in notifications if n.notification_id in inserted]
+    push(written)
+    return written
+
+
+def serialize(notification):
+    return {
+        'notification_id': str(notification.notification_id),
+        'delivery_id': str(notification.delivery_id_id) if notification.delivery_id_id else None,
+        'type': notification.type,
+        'message': notification.message,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+
+def push(notifications):
+    """Send notifications to their recipients' WebSocket group, one group_send per recipient."""
+    if not notifications:
+        return
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    by_user = {}
+    for notification in notifications:
+        by_user.setdefault(notification.user_id_id, []).append(serialize(notification))
+    for user_id, items in by_user.items():
+        try:
+            async_to_sync(channel_layer.group_send)(
+                user_group(user_id), {'type': 'notification.batch', 'notifications': items}
+            )
+        except Exception as e:
+            logger.warning(f"Could not push notifications to user {user_id}: {str(e)}")
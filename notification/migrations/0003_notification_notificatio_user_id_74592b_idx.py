@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0002_notification_notificatio_user_id_971103_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user_id', '-created_at'], name='notificatio_user_id_74592b_idx'),
+        ),
+    ]
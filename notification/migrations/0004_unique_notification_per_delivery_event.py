@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:55
+
+from django.db import migrations, models
+
+
+def remove_duplicates(apps, schema_editor):
+    # Keep the oldest notification of each (user, delivery, type)
+    Notification = apps.get_model('notification', 'Notification')
+    seen = set()
+    duplicates = []
+    rows = Notification.objects.exclude(type__in=['New Message']).exclude(delivery_id__isnull=True).order_by(
+        'created_at'
+    ).values_list('notification_id', 'user_id', 'delivery_id', 'type')
+    for notification_id, *key in rows.iterator():
+        key = tuple(key)
+        if key in seen:
+            duplicates.append(notification_id)
+        else:
+            seen.add(key)
+    for start in range(0, len(duplicates), 500):
+        Notification.objects.filter(notification_id__in=duplicates[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0003_notification_notificatio_user_id_74592b_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='notification',
+            constraint=models.UniqueConstraint(condition=models.Q(('type__in', ('New Message',)), _negated=True), fields=('user_id', 'delivery_id', 'type'), name='unique_notification_per_delivery_event'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_message_created_at_default'),
+        ('notification', '0004_unique_notification_per_delivery_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='chat_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='chat.message'),
+        ),
+    ]
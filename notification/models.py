@@ -4,6 +4,9 @@ from accounts.models import CustomUser
 from delivery.models import Delivery
 from django.db import models
 
+# Types that may be sent many times for the same delivery, exempt from deduplication
+REPEATABLE_TYPES = ('New Message',)
+
 class Notification(models.Model):
     notification_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user_id = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='notifications')
@@ -11,6 +14,10 @@ class Notification(models.Model):
     type = models.CharField(max_length=50)
     message = models.TextField()
     is_read = models.BooleanField(default=False)    
+    # The chat message a 'New Message' notification is about, see chat.receipts
+    chat_message = models.ForeignKey(
+        'chat.Message', on_delete=models.SET_NULL, related_name='notifications', null=True, blank=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -20,4 +27,12 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['user_id']),
             models.Index(fields=['delivery_id']),
+            models.Index(fields=['user_id', '-created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_id', 'delivery_id', 'type'],
+                condition=~models.Q(type__in=REPEATABLE_TYPES),
+                name='unique_notification_per_delivery_event',
+            ),
         ]
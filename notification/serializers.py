@@ -2,8 +2,9 @@ from rest_framework import serializers
 from .models import Notification
 from accounts.serializers import CustomUserSerializer
 from delivery.serializers import DeliveryReadSerializer
+from DropX.serializers import SparseFieldsetsMixin
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     user_id = CustomUserSerializer(read_only=True)
     delivery_id = DeliveryReadSerializer(read_only=True)
     # For manual creation (if needed)
@@ -24,6 +25,7 @@ class NotificationSerializer(serializers.ModelSerializer):
             'created_at',
         ]
         read_only_fields = ['notification_id', 'created_at', 'user_id', 'delivery_id']
+        expandable_fields = ['user_id', 'delivery_id']
 
     def validate(self, data):
         if 'user_id_id' in data:
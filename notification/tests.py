@@ -1,5 +1,9 @@
 # notification/tests.py
-from django.test import TestCase
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from .consumers import NotificationConsumer
 from rest_framework.test import APIClient
 from .models import Notification
 from delivery.models import Delivery, Package, DeliveryStatus
@@ -8,6 +12,7 @@ from driver_post.models import DriverPost, City
 from vehicle.models import Vehicle
 from rest_framework_simplejwt.tokens import RefreshToken
 import uuid
+from .dispatch import notify, serialize
 
 class NotificationTests(TestCase):
     def setUp(self):
@@ -90,8 +95,8 @@ class NotificationTests(TestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.sender_token}')
         response = self.client.get('/api/notification/')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['type'], 'Delivery Created')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['type'], 'Delivery Created')
 
     def test_mark_notification_read(self):
         notification = Notification.objects.get(user_id=self.sender, delivery_id=self.delivery)
@@ -109,4 +114,145 @@ class NotificationTests(TestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.sender_token}')
         response = self.client.post('/api/notification/mark-all-read/')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(Notification.objects.filter(user_id=self.sender, is_read=False).count(), 0)
\ No newline at end of file
+        self.assertEqual(Notification.objects.filter(user_id=self.sender, is_read=False).count(), 0)
+
+class NotificationDispatchTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='dispatch@example.com', password='pass', phone_number='+923003330001'
+        )
+        self.delivery = Delivery.objects.create(
+            sender_id=self.user, pickup_address={}, dropoff_address={}
+        )
+        Notification.objects.all().delete()
+
+    def test_batch_written_once_on_commit_and_deduplicated(self):
+        # one INSERT for the batch, one SELECT for what to push
+        with self.assertNumQueries(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                notify(self.user, self.delivery, 'Delivery Accepted', 'first')
+                notify(self.user, self.delivery, 'Delivery Accepted', 'again')
+                notify(self.user, self.delivery, 'New Message', 'one')
+                notify(self.user, self.delivery, 'New Message', 'two')
+
+        self.assertEqual(Notification.objects.filter(type='Delivery Accepted').count(), 1)
+        self.assertEqual(Notification.objects.filter(type='New Message').count(), 2)
+
+    def test_existing_row_not_duplicated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notify(self.user, self.delivery, 'Delivery Cancelled', 'cancelled')
+        with self.captureOnCommitCallbacks(execute=True):
+            notify(self.user, self.delivery, 'Delivery Cancelled', 'cancelled')
+        self.assertEqual(Notification.objects.filter(type='Delivery Cancelled').count(), 1)
+
+
+class NotificationRollbackTests(TransactionTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='rollback@example.com', password='pass', phone_number='+923003330002'
+        )
+        self.delivery = Delivery.objects.create(
+            sender_id=self.user, pickup_address={}, dropoff_address={}
+        )
+        Notification.objects.all().delete()
+
+    def test_rolled_back_batch_not_carried_over(self):
+        # One Atomic reused for every call, like a @transaction.atomic function
+        atomic = transaction.atomic()
+        try:
+            with atomic:
+                notify(self.user, self.delivery, 'Delivery Cancelled', 'rolled back')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with atomic:
+            notify(self.user, self.delivery, 'Delivery Accepted', 'kept')
+
+        self.assertEqual(list(Notification.objects.values_list('type', flat=True)), ['Delivery Accepted'])
+
+    def test_rolled_back_savepoint_dropped_outer_batch_kept(self):
+        with transaction.atomic():
+            notify(self.user, self.delivery, 'Delivery Accepted', 'outer')
+            try:
+                with transaction.atomic():
+                    notify(self.user, self.delivery, 'Delivery Cancelled', 'inner')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            with transaction.atomic():
+                notify(self.user, self.delivery, 'Delivery In Transit', 'released')
+
+        self.assertEqual(
+            set(Notification.objects.values_list('type', flat=True)), {'Delivery Accepted', 'Delivery In Transit'}
+        )
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class NotificationConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='socket@example.com', password='pass', phone_number='+923003330002'
+        )
+        self.delivery = Delivery.objects.create(sender_id=self.user, pickup_address={}, dropoff_address={})
+        Notification.objects.all().delete()
+
+    def communicator(self, query=''):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), f'/ws/notifications/{query}')
+        communicator.scope['user'] = self.user
+        return communicator
+
+    async def test_dispatched_notifications_pushed_to_user(self):
+        communicator = self.communicator()
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        await database_sync_to_async(notify)(self.user, self.delivery, 'Delivery Accepted', 'accepted')
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['type'], 'notifications')
+        self.assertEqual(response['notifications'][0]['type'], 'Delivery Accepted')
+        await communicator.disconnect()
+
+    async def test_catch_up_since_cursor(self):
+        first = await database_sync_to_async(Notification.objects.create)(
+            user_id=self.user, delivery_id=self.delivery, type='Delivery Accepted', message='seen'
+        )
+        await database_sync_to_async(Notification.objects.create)(
+            user_id=self.user, delivery_id=self.delivery, type='Delivery In Transit', message='missed'
+        )
+
+        communicator = self.communicator(f'?since={first.notification_id}')
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        self.assertEqual([n['message'] for n in response['notifications']], ['missed'])
+        self.assertFalse(response['has_more'])
+        await communicator.disconnect()
+
+    async def test_catch_up_since_unescaped_timestamp(self):
+        first = await database_sync_to_async(Notification.objects.create)(
+            user_id=self.user, delivery_id=self.delivery, type='Delivery Accepted', message='seen'
+        )
+        await database_sync_to_async(Notification.objects.create)(
+            user_id=self.user, delivery_id=self.delivery, type='Delivery In Transit', message='missed'
+        )
+        since = serialize(first)['created_at']
+        self.assertIn('+', since)
+
+        communicator = self.communicator(f'?since={since}')
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        self.assertEqual([n['message'] for n in response['notifications']], ['missed'])
+        await communicator.disconnect()
+
+    async def test_catch_up_rejects_unknown_cursor(self):
+        await database_sync_to_async(Notification.objects.create)(
+            user_id=self.user, delivery_id=self.delivery, type='Delivery Accepted', message='old'
+        )
+        communicator = self.communicator('?since=yesterday')
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['type'], 'error')
+
+        await communicator.send_json_to({'type': 'catch_up', 'since': str(uuid.uuid4())})
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['type'], 'error')
+        await communicator.disconnect()
@@ -2,9 +2,11 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from DropX.authentication import CachedJWTAuthentication
 from .models import Notification
 from .serializers import NotificationSerializer
+from delivery.serializers import DeliveryReadSerializer
+from DropX.pagination import CreatedAtCursorPagination
 import logging
 from django.shortcuts import get_object_or_404
 
@@ -14,23 +16,30 @@ class NotificationListView(generics.ListAPIView):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        return Notification.objects.filter(user_id=self.request.user).order_by('-created_at')
+        queryset = Notification.objects.filter(user_id=self.request.user).order_by('-created_at')
+        fields = NotificationSerializer.requested_fields(self.request)
+        if fields is None or 'user_id' in fields:
+            queryset = queryset.select_related('user_id')
+        if fields is None or 'delivery_id' in fields:
+            queryset = DeliveryReadSerializer.setup_eager_loading(queryset, prefix='delivery_id__')
+        return queryset
 
 class NotificationDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def get_queryset(self):
         return Notification.objects.filter(user_id=self.request.user)
 
 class MarkNotificationAsReadView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request, notification_id):
         try:
@@ -45,7 +54,7 @@ class MarkNotificationAsReadView(APIView):
 
 class MarkAllNotificationsAsReadView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request):
         try:
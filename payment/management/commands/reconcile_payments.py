@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from payment.reconcile import reconcile_payments
+
+
+class Command(BaseCommand):
+    help = "Reconcile payment statuses and amounts with their deliveries, in keyset-paged batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches.")
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches.")
+        parser.add_argument('--interval', type=float, default=None,
+                            help="Keep running, starting a new pass this many seconds after the last one.")
+
+    def handle(self, *args, **options):
+        while True:
+            summary = reconcile_payments(options['batch_size'], options['max_batches'], options['pause'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Scanned {summary['scanned']} payments in {summary['batches']} batches: "
+                f"{summary['completed']} completed, {summary['failed']} failed, {summary['repriced']} repriced, "
+                f"{summary['needs_refund']} need a refund."
+            ))
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
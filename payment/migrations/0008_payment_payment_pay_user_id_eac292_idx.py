@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0007_remove_payment_delivery_log_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['user_id', '-created_at'], name='payment_pay_user_id_eac292_idx'),
+        ),
+    ]
@@ -77,4 +77,5 @@ class Payment(models.Model):
             models.Index(fields=['user_id']),
             models.Index(fields=['payment_method']),
             models.Index(fields=['payment_status']),
+            models.Index(fields=['user_id', '-created_at']),
         ]
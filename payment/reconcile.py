@@ -0,0 +1,147 @@
+# payment/reconcile.py
+"""
+Payment reconciliation.
+
+Payments and their deliveries drift apart: a driver picks up or delivers
+without confirming the payment, a sender cancels after paying, or the route
+job reprices a pending delivery after its payment was created. These used to
+be patched up by post_save signals on every Delivery and Payment save. Now
+``reconcile_payments`` walks all payments with their delivery in keyset pages
+(``payment_id > last seen``, so a page costs the same at any depth) and fixes
+each page with a handful of bulk statements:
+
+* delivery In Transit/Delivered, payment Pending -> payment Completed
+* delivery Cancelled, payment Pending -> payment Failed
+* delivery Pending, payment Pending with a different amount -> amount = total_cost
+* delivery Cancelled, payment Completed -> counted as ``needs_refund`` only,
+  refunds stay manual (RefundPaymentView)
+
+Every update is guarded by the state it was selected for, so reruns and
+concurrent runs change nothing twice. Run it with ``reconcile_payments``
+(``--interval`` keeps it running periodically).
+"""
+import logging
+import time
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from delivery.models import Delivery, DeliveryLog, DeliveryStatus
+from notification.dispatch import notify
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+COMPLETED_DELIVERY = (DeliveryStatus.IN_TRANSIT, DeliveryStatus.DELIVERED)
+
+
+def _changed(ids, now, **state):
+    """Ids among ``ids`` that this run just moved to ``state`` (updated_at is the run's timestamp)."""
+    return set(Payment.objects.filter(pk__in=ids, updated_at=now, **state).values_list('pk', flat=True))
+
+
+def reconcile_page(payments, now):
+    """Reconcile one page of payments (with ``delivery_id`` and ``user_id`` loaded). Returns counts."""
+    complete, fail, reprice = [], [], []
+    needs_refund = 0
+    for payment in payments:
+        delivery = payment.delivery_id
+        if payment.payment_status == 'Pending':
+            if delivery.status in COMPLETED_DELIVERY:
+                complete.append(payment)
+            elif delivery.status == DeliveryStatus.CANCELLED:
+                fail.append(payment)
+            elif delivery.status == DeliveryStatus.PENDING and payment.amount != delivery.total_cost:
+                reprice.append(payment)
+        elif payment.payment_status == 'Completed' and delivery.status == DeliveryStatus.CANCELLED:
+            needs_refund += 1
+
+    logs = []
+    with transaction.atomic():
+        if complete:
+            ids = [p.pk for p in complete]
+            updated = Payment.objects.filter(
+                pk__in=ids, payment_status='Pending', delivery_id__status__in=COMPLETED_DELIVERY
+            ).update(payment_status='Completed', updated_at=now)
+            done = set(ids) if updated == len(ids) else _changed(ids, now, payment_status='Completed')
+            complete = [p for p in complete if p.pk in done]
+            for payment in complete:
+                delivery = payment.delivery_id
+                logs.append(DeliveryLog(
+                    delivery=delivery, action="Payment Completed", created_at=now,
+                    comments=f"Payment {payment.payment_id} completed by reconciliation, delivery is {delivery.status}.",
+                ))
+                notify(payment.user_id, delivery, 'Payment Completed',
+                       f'Payment of {payment.amount} completed for delivery {delivery.delivery_id}.')
+
+        if fail:
+            ids = [p.pk for p in fail]
+            updated = Payment.objects.filter(
+                pk__in=ids, payment_status='Pending', delivery_id__status=DeliveryStatus.CANCELLED
+            ).update(payment_status='Failed', failure_reason="Delivery cancelled", updated_at=now)
+            done = set(ids) if updated == len(ids) else _changed(ids, now, payment_status='Failed')
+            fail = [p for p in fail if p.pk in done]
+            for payment in fail:
+                delivery = payment.delivery_id
+                logs.append(DeliveryLog(
+                    delivery=delivery, action="Payment Failed", created_at=now,
+                    comments=f"Payment {payment.payment_id} failed by reconciliation, delivery was cancelled.",
+                ))
+                notify(payment.user_id, delivery, 'Payment Failed',
+                       f'Payment of {payment.amount} failed for delivery {delivery.delivery_id}: Delivery cancelled.')
+
+        if reprice:
+            ids = [p.pk for p in reprice]
+            updated = Payment.objects.filter(
+                pk__in=ids, payment_status='Pending', delivery_id__status=DeliveryStatus.PENDING
+            ).exclude(amount=F('delivery_id__total_cost')).update(
+                amount=Subquery(Delivery.objects.filter(pk=OuterRef('delivery_id')).values('total_cost')[:1]),
+                updated_at=now,
+            )
+            done = set(ids) if updated == len(ids) else _changed(ids, now)
+            reprice = [p for p in reprice if p.pk in done]
+            for payment in reprice:
+                delivery = payment.delivery_id
+                logs.append(DeliveryLog(
+                    delivery=delivery, action="Payment Amount Updated", created_at=now,
+                    comments=f"Payment {payment.payment_id} amount {payment.amount} -> {delivery.total_cost}.",
+                ))
+
+        DeliveryLog.objects.bulk_create(logs)
+
+    return {'completed': len(complete), 'failed': len(fail), 'repriced': len(reprice), 'needs_refund': needs_refund}
+
+
+def reconcile_payments(batch_size=500, max_batches=None, pause=0):
+    """Reconcile every payment, one keyset page per transaction. Returns a summary dict."""
+    summary = {'scanned': 0, 'batches': 0, 'completed': 0, 'failed': 0, 'repriced': 0, 'needs_refund': 0}
+    queryset = Payment.objects.select_related('delivery_id', 'user_id').only(
+        'payment_id', 'payment_status', 'amount', 'user_id__id', 'user_id__email',
+        'delivery_id__delivery_id', 'delivery_id__status', 'delivery_id__total_cost',
+        # read by chat.signals.remember_chat_participants on every instance
+        'delivery_id__driver_id', 'delivery_id__driver_post_id',
+    ).order_by('payment_id')
+    started = time.monotonic()
+
+    last = None
+    while max_batches is None or summary['batches'] < max_batches:
+        page = queryset.filter(payment_id__gt=last) if last is not None else queryset
+        payments = list(page[:batch_size])
+        if not payments:
+            break
+        last = payments[-1].payment_id
+
+        for key, count in reconcile_page(payments, timezone.now()).items():
+            summary[key] += count
+        summary['scanned'] += len(payments)
+        summary['batches'] += 1
+        if pause:
+            time.sleep(pause)
+
+    logger.info(
+        f"Payment reconciliation: scanned {summary['scanned']} in {summary['batches']} batches "
+        f"({time.monotonic() - started:.1f}s), completed {summary['completed']}, failed {summary['failed']}, "
+        f"repriced {summary['repriced']}, {summary['needs_refund']} need a refund"
+    )
+    return summary
@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from .models import Payment
 from delivery.models import Delivery
+from DropX.serializers import SparseFieldsetsMixin
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     delivery_id_id = serializers.UUIDField(write_only=True)
     delivery_id = serializers.UUIDField(source='delivery_id.delivery_id', read_only=True)
     user_id = serializers.UUIDField(source='user_id.id', read_only=True)
@@ -37,7 +38,16 @@ class PaymentSerializer(serializers.ModelSerializer):
             'delivery_id', 'user_id', 'driver_phone', 'driver_easypaisa_phone'
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance is not None:
+            # A payment stays on its delivery, and its amount follows that delivery
+            self.fields['delivery_id_id'].read_only = True
+            self.fields['delivery_id_id'].required = False
+
     def validate(self, data):
+        if self.instance is not None:
+            return data
         delivery = Delivery.objects.filter(delivery_id=data.get('delivery_id_id')).first()
         if not delivery:
             raise serializers.ValidationError("Invalid delivery_id.")
@@ -1,3 +1,140 @@
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from delivery.models import Delivery, DeliveryLog, DeliveryStatus
+from notification.models import Notification
+from .models import Payment
+from .reconcile import reconcile_payments
+
+
+class PaymentReconciliationTests(TestCase):
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(
+            email='payer@example.com', password='pass', phone_number='+923001110041'
+        )
+
+    def payment(self, delivery_status, payment_status='Pending', total_cost=100):
+        delivery = Delivery.objects.create(
+            sender_id=self.sender, pickup_address={'city': 'Peshawar'}, dropoff_address={'city': 'Islamabad'},
+            total_cost=total_cost,
+        )
+        Delivery.objects.filter(pk=delivery.pk).update(status=delivery_status)
+        payment = delivery.payments.get()  # created by payment.signals
+        Payment.objects.filter(pk=payment.pk).update(payment_status=payment_status)
+        return payment
+
+    def status(self, payment):
+        payment.refresh_from_db()
+        return payment.payment_status
+
+    def test_reconciles_mismatches_idempotently(self):
+        in_transit = self.payment(DeliveryStatus.IN_TRANSIT)
+        cancelled = self.payment(DeliveryStatus.CANCELLED)
+        repriced = self.payment(DeliveryStatus.PENDING)
+        Delivery.objects.filter(pk=repriced.delivery_id_id).update(total_cost=Decimal('120.00'))  # route job
+        paid_then_cancelled = self.payment(DeliveryStatus.CANCELLED, 'Completed')
+        settled = self.payment(DeliveryStatus.DELIVERED, 'Completed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = reconcile_payments(batch_size=2)
+
+        self.assertEqual(summary, {
+            'scanned': 5, 'batches': 3, 'completed': 1, 'failed': 1, 'repriced': 1, 'needs_refund': 1,
+        })
+        self.assertEqual(self.status(in_transit), 'Completed')
+        self.assertEqual(self.status(cancelled), 'Failed')
+        self.assertEqual(cancelled.failure_reason, "Delivery cancelled")
+        repriced.refresh_from_db()
+        self.assertEqual(repriced.amount, Decimal('120.00'))
+        self.assertEqual(self.status(paid_then_cancelled), 'Completed')
+        self.assertEqual(self.status(settled), 'Completed')
+        self.assertTrue(DeliveryLog.objects.filter(delivery=in_transit.delivery_id, action="Payment Completed").exists())
+        self.assertTrue(Notification.objects.filter(delivery_id=cancelled.delivery_id, type='Payment Failed').exists())
+
+        again = reconcile_payments(batch_size=2)
+        self.assertEqual((again['completed'], again['failed'], again['repriced']), (0, 0, 0))
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            reconcile_payments(batch_size=100)
+        return len(queries)
+
+    def test_page_cost_does_not_grow_with_mismatches(self):
+        self.payment(DeliveryStatus.IN_TRANSIT)
+        self.payment(DeliveryStatus.CANCELLED)
+        few = self.count_queries()
+
+        for _ in range(5):
+            self.payment(DeliveryStatus.IN_TRANSIT)
+            self.payment(DeliveryStatus.CANCELLED)
+        self.assertEqual(self.count_queries(), few)
+
+    def test_payment_and_delivery_saves_have_no_status_side_effects(self):
+        payment = self.payment(DeliveryStatus.IN_TRANSIT)
+        delivery = payment.delivery_id
+        delivery.refresh_from_db()
+        delivery.save()
+        payment.refresh_from_db()
+        payment.save()
+
+        delivery.refresh_from_db()
+        self.assertEqual(self.status(payment), 'Pending')  # left for the reconciliation run
+        self.assertEqual(delivery.status, DeliveryStatus.IN_TRANSIT)
+
+        call_command('reconcile_payments', '--batch-size', '10')
+        self.assertEqual(self.status(payment), 'Completed')
+
+
+class PaymentDetailUpdateTests(TestCase):
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(
+            email='notes@example.com', password='pass', phone_number='+923001110042'
+        )
+        self.delivery = Delivery.objects.create(
+            sender_id=self.sender, pickup_address={'city': 'Peshawar'}, dropoff_address={'city': 'Islamabad'},
+            total_cost=100,
+        )
+        self.payment = self.delivery.payments.get()
+
+    def test_patch_saves_submitted_fields_only(self):
+        client = APIClient()
+        client.force_authenticate(self.sender)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.patch(
+                reverse('payment:detail', kwargs={'payment_id': self.payment.payment_id}),
+                {'sender_notes': 'ref 42'}, format='json',
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.sender_notes, 'ref 42')
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "payment_payment"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"payment_status"', updates[0])
+
+    def test_patch_cannot_move_payment_to_another_delivery(self):
+        other = Delivery.objects.create(
+            sender_id=CustomUser.objects.create_user(
+                email='other-payer@example.com', password='pass', phone_number='+923001110043'
+            ),
+            pickup_address={'city': 'Peshawar'}, dropoff_address={'city': 'Islamabad'}, total_cost=5,
+        )
+        client = APIClient()
+        client.force_authenticate(self.sender)
+        response = client.patch(
+            reverse('payment:detail', kwargs={'payment_id': self.payment.payment_id}),
+            {'delivery_id_id': str(other.delivery_id), 'amount': '5.00', 'cod_notes': 'cash'}, format='json',
+        )
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.delivery_id_id, self.delivery.delivery_id)
+        self.assertEqual(self.payment.amount, Decimal('100.00'))
+        self.assertEqual(self.payment.cod_notes, 'cash')
@@ -1,33 +1,46 @@
 from rest_framework import generics, status
 from rest_framework.views import APIView
+from rest_framework.exceptions import APIException, ValidationError as DRFValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from DropX.authentication import CachedJWTAuthentication
 from django.shortcuts import get_object_or_404
 from .models import Payment
 from .serializers import PaymentSerializer
 from DropX.permissions import IsSender, IsVerifiedDriver
+from DropX.pagination import CreatedAtCursorPagination
 from delivery.models import Delivery, DeliveryLog, DeliveryStatus
 import logging
 import uuid
 from django.core.exceptions import ValidationError
 from delivery.models import DeliveryStatus
+from notification.dispatch import notify
+from delivery.transitions import TRANSITION_RELATED, TransitionConflict, TransitionError, complete_payment
 
 logger = logging.getLogger(__name__)
 
+
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The payment was changed by another request."
+    default_code = 'conflict'
+
+
 class PaymentListView(generics.ListAPIView):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated, IsSender | IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         user = self.request.user
         role = (user.role or "").lower()  # ✅ lowercase for safety
+        payments = Payment.objects.select_related('delivery_id__driver_id', 'user_id')
         if role == 'sender':
-            return Payment.objects.filter(user_id=user)
+            return payments.filter(user_id=user)
         elif role == 'driver':
-            return Payment.objects.filter(delivery_id__driver_id=user)
+            return payments.filter(delivery_id__driver_id=user)
         return Payment.objects.none()
 
 
@@ -35,7 +48,7 @@ class PaymentCreateView(generics.CreateAPIView):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def perform_create(self, serializer):
         delivery = get_object_or_404(Delivery, delivery_id=serializer.validated_data['delivery_id_id'])
@@ -68,6 +81,10 @@ class PaymentCreateView(generics.CreateAPIView):
                 action="Payment Pending",
                 comments=f"Payment {payment.payment_id} created with method {payment_method}. Use chat to confirm."
             )
+            message = f'Payment of {payment.amount} is pending for delivery {delivery.delivery_id}.'
+            if payment_method == 'Cash' and delivery.driver_id:
+                message += " Please negotiate in chat."
+            notify(user, delivery, 'Payment Pending', message)
             logger.info(f"Payment {payment.payment_id} created for delivery {delivery.delivery_id}")
         except Exception as e:
             logger.error(f"Error creating payment: {str(e)}")
@@ -78,7 +95,7 @@ class PaymentDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated, IsSender | IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     lookup_field = 'payment_id'
 
     def get_queryset(self):
@@ -90,31 +107,44 @@ class PaymentDetailView(generics.RetrieveUpdateDestroyAPIView):
             return Payment.objects.filter(delivery_id__driver_id=user)
         return Payment.objects.none()
 
+    editable_fields = ('sender_notes', 'cod_notes', 'payment_method')
+
     def perform_update(self, serializer):
-        # Allow driver to update status to Completed after manual verification
         instance = serializer.instance
-        if self.request.user.role.lower() == 'driver' and 'payment_status' in serializer.validated_data:
-            new_status = serializer.validated_data['payment_status']
-            if new_status == 'Completed' and instance.payment_status == 'Pending':
-                serializer.save()
-                DeliveryLog.objects.create(
-                    delivery=instance.delivery_id,
-                    action="Payment Completed",
-                    comments="Driver confirmed manual payment."
-                )
-                # Optionally trigger delivery acceptance here
-                instance.delivery_id.status = DeliveryStatus.IN_TRANSIT  # Assume Delivery has a status field; add if not
-                instance.delivery_id.save()
+        new_status = serializer.validated_data.get('payment_status')
+        data = {name: value for name, value in serializer.validated_data.items() if name in self.editable_fields}
+
+        # Only the editable fields that were submitted are written; a full save
+        # would put back the payment_status this instance was read with
+        if data:
+            for name, value in data.items():
+                setattr(instance, name, value)
+            update_fields = [*data, 'updated_at']
+            if 'payment_method' in data:
+                update_fields.append('driver_easypaisa_phone')  # filled in by Payment.save
+            instance.save(update_fields=update_fields)
+
+        # Allow driver to update status to Completed after manual verification
+        if self.request.user.role.lower() == 'driver' and new_status == 'Completed' and instance.payment_status == 'Pending':
+            # The delivery moves to In Transit with the payment (see delivery.transitions)
+            try:
+                complete_payment(instance, self.request.user)
+            except TransitionConflict as e:
+                raise Conflict(str(e))
+            except TransitionError as e:
+                raise DRFValidationError(str(e))
 
 class CompletePaymentView(APIView):
     permission_classes = [IsAuthenticated, IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request, payment_id):
-        payment = get_object_or_404(Payment, payment_id=payment_id)
+        payment = get_object_or_404(
+            Payment.objects.select_related(*(f'delivery_id__{f}' for f in TRANSITION_RELATED)), payment_id=payment_id
+        )
 
         # Driver must own the delivery
-        if payment.delivery_id.driver_id != request.user:
+        if payment.delivery_id.driver_id_id != request.user.id:
             return Response(
                 {"error": "Not allowed. This payment does not belong to your delivery."},
                 status=status.HTTP_403_FORBIDDEN
@@ -124,21 +154,12 @@ class CompletePaymentView(APIView):
         if payment.payment_status == "Completed":
             return Response({"message": "Payment already completed."}, status=200)
 
-        # Change status
-        payment.payment_status = "Completed"
-        payment.save()
-
-        # Update delivery status
-        delivery = payment.delivery_id
-        delivery.status = DeliveryStatus.IN_TRANSIT
-        delivery.save()
-
-        # Log entry
-        DeliveryLog.objects.create(
-            delivery=delivery,
-            action="Payment Completed",
-            comments=f"Driver {request.user.first_name} confirmed the payment."
-        )
+        try:
+            complete_payment(payment, request.user)
+        except TransitionConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except TransitionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(
             {"message": "Payment marked as completed successfully."},
@@ -147,7 +168,7 @@ class CompletePaymentView(APIView):
 
 class RefundPaymentView(APIView):
     permission_classes = [IsAuthenticated, IsSender]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request, payment_id):
         payment = get_object_or_404(Payment, payment_id=payment_id, user_id=request.user)
@@ -165,4 +186,8 @@ class RefundPaymentView(APIView):
             action="Payment Refunded",
             comments=f"Manual refund {refund_amount} processed."
         )
+        notify(
+            payment.user_id, payment.delivery_id, 'Payment Refunded',
+            f'Payment of {payment.amount} refunded ({refund_amount}) for delivery {payment.delivery_id.delivery_id}.'
+        )
         return Response({'message': 'Refund processed (manual)'}, status=status.HTTP_200_OK)
@@ -0,0 +1,6 @@
+from django.contrib import admin
+from .models import Tariff
+
+# Register your models here.
+
+admin.site.register(Tariff)
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('driver_post', '0011_driverpost_driver_post_status_2b6e89_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tariff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_fare', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('per_km', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('per_kg', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('fragile_multiplier', models.DecimalField(decimal_places=2, default=1, max_digits=5)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incoming_tariffs', to='driver_post.city')),
+                ('origin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_tariffs', to='driver_post.city')),
+            ],
+            options={
+                'unique_together': {('origin', 'destination')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# pricing/models.py
+from django.db import models
+from driver_post.models import City
+
+
+class Tariff(models.Model):
+    """Rates for one (pickup city, dropoff city) pair; other pairs use PRICING's defaults."""
+    origin = models.ForeignKey(City, on_delete=models.CASCADE, related_name='outgoing_tariffs')
+    destination = models.ForeignKey(City, on_delete=models.CASCADE, related_name='incoming_tariffs')
+    base_fare = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    per_km = models.DecimalField(max_digits=10, decimal_places=2)
+    per_kg = models.DecimalField(max_digits=10, decimal_places=2)
+    fragile_multiplier = models.DecimalField(max_digits=5, decimal_places=2, default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Tariff {self.origin} To {self.destination}"
+
+    class Meta:
+        unique_together = ('origin', 'destination')
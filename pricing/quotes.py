@@ -0,0 +1,201 @@
+# pricing/quotes.py
+"""
+Delivery quotes.
+
+    total = base_fare + distance_km * per_km
+            + sum(chargeable_kg * per_kg * (fragile_multiplier if fragile else 1))
+
+``chargeable_kg`` is the larger of a package's weight and its volumetric
+weight (length * width * height in cm / ``VOLUMETRIC_DIVISOR``). Rates come
+from the ``Tariff`` row of the (pickup city, dropoff city) pair, or from
+``PRICING`` for pairs without one.
+
+All tariffs are loaded into a per-process table with one query and reloaded
+every ``TARIFF_TABLE_TTL`` seconds (immediately in the process that saves a
+tariff), so a quote never queries. Quotes themselves are memoized for
+``QUOTE_CACHE_TTL`` seconds on (city pair, distance, packages), which is what
+repeated previews of the same parcel hit.
+"""
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.conf import settings
+
+DEFAULT_PRICING = {
+    'BASE_FARE': '0',
+    'PER_KM': '1.0',
+    'PER_KG': '0.5',
+    'FRAGILE_MULTIPLIER': '1.5',
+    'VOLUMETRIC_DIVISOR': 5000,
+    'DISTANCE_PRECISION': 1,
+    'QUOTE_CACHE_TTL': 60,
+    'QUOTE_CACHE_SIZE': 10000,
+    'TARIFF_TABLE_TTL': 300,
+}
+
+CENTS = Decimal('0.01')
+
+
+def pricing_settings():
+    return {**DEFAULT_PRICING, **getattr(settings, 'PRICING', {})}
+
+
+class Rates(NamedTuple):
+    base_fare: Decimal
+    per_km: Decimal
+    per_kg: Decimal
+    fragile_multiplier: Decimal
+
+
+class Quote(NamedTuple):
+    total: Decimal
+    distance_km: Decimal
+    chargeable_weight: Decimal
+    base_fare: Decimal
+    distance_charge: Decimal
+    weight_charge: Decimal
+    tariff: str  # 'city_pair' or 'default'
+
+    def as_dict(self):
+        return {name: str(value) if isinstance(value, Decimal) else value for name, value in self._asdict().items()}
+
+
+def default_rates(config=None):
+    config = config or pricing_settings()
+    return Rates(*(Decimal(str(config[name])) for name in ('BASE_FARE', 'PER_KM', 'PER_KG', 'FRAGILE_MULTIPLIER')))
+
+
+class TariffTable:
+    def __init__(self):
+        from .models import Tariff
+
+        self.built_at = time.monotonic()
+        self._rates = {
+            (origin_id, destination_id): Rates(*rates)
+            for origin_id, destination_id, *rates in Tariff.objects.values_list(
+                'origin_id', 'destination_id', 'base_fare', 'per_km', 'per_kg', 'fragile_multiplier'
+            )
+        }
+
+    def __len__(self):
+        return len(self._rates)
+
+    def get(self, origin_id, destination_id):
+        return self._rates.get((origin_id, destination_id))
+
+
+class _QuoteCache:
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, quote = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return quote
+
+    def set(self, key, quote, ttl, max_size):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, quote)
+            self._data.move_to_end(key)
+            while len(self._data) > max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_table = None
+_table_lock = threading.Lock()
+_quotes = _QuoteCache()
+
+
+def get_tariff_table():
+    global _table
+    ttl = pricing_settings()['TARIFF_TABLE_TTL']
+    if _table is None or time.monotonic() - _table.built_at > ttl:
+        with _table_lock:
+            if _table is None or time.monotonic() - _table.built_at > ttl:
+                _table = TariffTable()
+    return _table
+
+
+def reset_pricing():
+    global _table
+    _table = None
+    _quotes.clear()
+
+
+def _decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def package_key(package):
+    """(weight, (length, width, height) or None, is_fragile) from a Package, a dict or validated data."""
+    get = package.get if isinstance(package, dict) else lambda name, default=None: getattr(package, name, default)
+    dimensions = get('dimensions') or {}
+    try:
+        size = tuple(_decimal(dimensions[name]) for name in ('length', 'width', 'height'))
+    except (KeyError, TypeError, ArithmeticError, ValueError):
+        size = None
+    return _decimal(get('weight') or 0), size, bool(get('is_fragile', False))
+
+
+def chargeable_weight(weight, size, divisor):
+    if size is None:
+        return weight
+    length, width, height = size
+    return max(weight, length * width * height / Decimal(divisor))
+
+
+def quote(distance_km, packages, origin_id=None, destination_id=None):
+    """Quote for ``packages`` (Package instances or dicts) over ``distance_km``; no queries once warm."""
+    config = pricing_settings()
+    distance = round(_decimal(distance_km or 0), config['DISTANCE_PRECISION'])
+    keys = tuple(package_key(package) for package in packages)
+    cache_key = (origin_id, destination_id, distance, tuple(sorted(keys, key=repr)))
+
+    cached = _quotes.get(cache_key)
+    if cached is not None:
+        return cached
+
+    rates = get_tariff_table().get(origin_id, destination_id)
+    tariff = 'city_pair' if rates is not None else 'default'
+    rates = rates or default_rates(config)
+
+    total_weight, weight_charge = Decimal('0'), Decimal('0')
+    for weight, size, is_fragile in keys:
+        chargeable = chargeable_weight(weight, size, config['VOLUMETRIC_DIVISOR'])
+        total_weight += chargeable
+        weight_charge += chargeable * rates.per_kg * (rates.fragile_multiplier if is_fragile else 1)
+
+    distance_charge = distance * rates.per_km
+    result = Quote(
+        total=(rates.base_fare + distance_charge + weight_charge).quantize(CENTS),
+        distance_km=distance,
+        chargeable_weight=total_weight.quantize(CENTS),
+        base_fare=rates.base_fare.quantize(CENTS),
+        distance_charge=distance_charge.quantize(CENTS),
+        weight_charge=weight_charge.quantize(CENTS),
+        tariff=tariff,
+    )
+    _quotes.set(cache_key, result, config['QUOTE_CACHE_TTL'], config['QUOTE_CACHE_SIZE'])
+    return result
+
+
+def quote_delivery(delivery, distance_km, packages=None):
+    """Quote for a saved delivery; loads its packages with one query unless ``packages`` is given."""
+    if packages is None:
+        packages = delivery.packages.values('weight', 'dimensions', 'is_fragile')
+    return quote(distance_km, list(packages), delivery.pickup_city_id, delivery.dropoff_city_id)
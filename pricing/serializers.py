@@ -0,0 +1,10 @@
+from rest_framework import serializers
+
+from delivery.serializers import AddressSerializer, PackageSerializer
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    pickup_address = AddressSerializer()
+    dropoff_address = AddressSerializer()
+    packages = PackageSerializer(many=True, allow_empty=False)
+    driver_post_id = serializers.UUIDField(required=False, allow_null=True)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Tariff
+from .quotes import reset_pricing
+
+
+@receiver([post_save, post_delete], sender=Tariff)
+def tariffs_changed(sender, **kwargs):
+    # Other processes pick the change up when their table expires (PRICING['TARIFF_TABLE_TTL'])
+    reset_pricing()
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from delivery.models import Delivery
+from driver_post.models import City
+from .models import Tariff
+from .quotes import chargeable_weight, quote, reset_pricing
+
+
+class QuoteTests(TestCase):
+    def setUp(self):
+        reset_pricing()
+        self.addCleanup(reset_pricing)
+        self.peshawar = City.objects.create(name='Peshawar', country='Pakistan', latitude=34.0151, longitude=71.5249)
+        self.islamabad = City.objects.create(name='Islamabad', country='Pakistan', latitude=33.6844, longitude=73.0479)
+
+    def test_default_rates_match_the_old_formula(self):
+        # distance * 1.0 + weight * 0.5
+        result = quote(100, [{'weight': Decimal('5'), 'dimensions': {}}])
+        self.assertEqual(result.total, Decimal('102.50'))
+        self.assertEqual(result.tariff, 'default')
+
+    def test_volume_and_fragility(self):
+        self.assertEqual(chargeable_weight(Decimal('1'), (Decimal(50), Decimal(40), Decimal(30)), 5000), 12)
+
+        bulky = quote(0, [{'weight': 1, 'dimensions': {'length': 50, 'width': 40, 'height': 30}}])
+        self.assertEqual(bulky.chargeable_weight, Decimal('12.00'))
+        self.assertEqual(bulky.total, Decimal('6.00'))
+
+        fragile = quote(0, [{'weight': 10, 'dimensions': {}, 'is_fragile': True}])
+        self.assertEqual(fragile.total, Decimal('7.50'))
+
+    def test_city_pair_tariff_and_cache(self):
+        Tariff.objects.create(
+            origin=self.peshawar, destination=self.islamabad,
+            base_fare=100, per_km=2, per_kg=1, fragile_multiplier=1,
+        )
+        packages = [{'weight': 5, 'dimensions': {}}]
+        first = quote(180.04, packages, self.peshawar.pk, self.islamabad.pk)
+        self.assertEqual(first.total, Decimal('465.00'))  # 100 + 180 * 2 + 5
+        self.assertEqual(first.tariff, 'city_pair')
+
+        with self.assertNumQueries(0):
+            self.assertIs(quote(180.01, packages, self.peshawar.pk, self.islamabad.pk), first)
+            self.assertEqual(quote(180, packages, self.islamabad.pk, self.peshawar.pk).tariff, 'default')
+
+        Tariff.objects.filter(origin=self.peshawar).get().delete()  # invalidates table and cache
+        self.assertEqual(quote(180, packages, self.peshawar.pk, self.islamabad.pk).tariff, 'default')
+
+    def test_preview_endpoint(self):
+        sender = CustomUser.objects.create_user(
+            email='quotes@example.com', password='pass', phone_number='+923001110031', role='Sender'
+        )
+        client = APIClient()
+        client.force_authenticate(sender)
+        address = {'address_line': 'Main Road', 'state': '', 'country': 'Pakistan'}
+        response = client.post(reverse('pricing:quote'), {
+            'pickup_address': {**address, 'city': 'Peshawar', 'latitude': 34.0151, 'longitude': 71.5249},
+            'dropoff_address': {**address, 'city': 'Islamabad', 'latitude': 33.6844, 'longitude': 73.0479},
+            'packages': [{'description': 'Box', 'weight': '5', 'dimensions': {}}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(Decimal(response.data['distance_km']), 100)
+        self.assertEqual(
+            Decimal(response.data['total']),
+            Decimal(response.data['distance_km']) + Decimal('2.50'),
+        )
+        self.assertFalse(Delivery.objects.exists())
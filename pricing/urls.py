@@ -0,0 +1,9 @@
+# pricing/urls.py
+from django.urls import path
+from .views import QuotePreviewView
+
+app_name = 'pricing'
+
+urlpatterns = [
+    path('quote/', QuotePreviewView.as_view(), name='quote'),
+]
@@ -0,0 +1,40 @@
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from DropX.authentication import CachedJWTAuthentication
+from DropX.permissions import IsSender
+from delivery.models import Delivery
+from driver_post.models import City, DriverPost
+from route.distance import estimate_delivery_distance
+from .quotes import quote_delivery
+from .serializers import QuoteRequestSerializer
+
+
+class QuotePreviewView(APIView):
+    """Price a delivery without creating it, on the same offline estimate creation uses."""
+    permission_classes = [IsAuthenticated, IsSender]
+    authentication_classes = [CachedJWTAuthentication]
+
+    def post(self, request):
+        serializer = QuoteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        delivery = Delivery(pickup_address=data['pickup_address'], dropoff_address=data['dropoff_address'])
+        if data.get('driver_post_id'):
+            post = DriverPost.objects.select_related('start_city', 'end_city').filter(
+                post_id=data['driver_post_id']
+            ).first()
+            if post is None:
+                return Response({"error": "Driver post not found."}, status=status.HTTP_404_NOT_FOUND)
+            delivery.pickup_city, delivery.dropoff_city = post.start_city, post.end_city
+        else:
+            names = (data['pickup_address']['city'], data['dropoff_address']['city'])
+            cities = {}
+            for city in City.objects.filter(name__in=names).order_by('name', 'city_id'):
+                cities.setdefault(city.name, city)
+            delivery.pickup_city, delivery.dropoff_city = cities.get(names[0]), cities.get(names[1])
+
+        quote = quote_delivery(delivery, estimate_delivery_distance(delivery), data['packages'])
+        return Response(quote.as_dict(), status=status.HTTP_200_OK)
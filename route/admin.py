@@ -1,6 +1,10 @@
 from django.contrib import admin
-from .models import Route
+from .models import Route, RouteCacheEntry, CorridorFactor, RouteJob, PostRoute
 
 # Register your models here.
 
-admin.site.register(Route)
\ No newline at end of file
+admin.site.register(Route)
+admin.site.register(RouteCacheEntry)
+admin.site.register(CorridorFactor)
+admin.site.register(RouteJob)
+admin.site.register(PostRoute)
@@ -0,0 +1,294 @@
+# route/corridor.py
+"""
+Route-corridor matching.
+
+Each driver post gets a ``PostRoute``: the road route from start to end city,
+simplified with Douglas-Peucker. Every simplified segment is registered in a
+grid (cell -> segment rows) held in process memory. A query for a pickup and
+dropoff point only looks at segments in the cells around those points,
+measures point-to-segment distance for all of them in one NumPy pass, and
+keeps the posts that pass the pickup first and the dropoff later on.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from driver_post.geo import cell_for, cells_within
+from .services import get_route, routing_settings
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE = 111.32
+ACTIVE_POST_STATUSES = ('Active', 'Booked')
+
+# segment row layout
+LAT1, LON1, LAT2, LON2, OFFSET_KM, LENGTH_KM, SLOT = range(7)
+
+
+def simplify(coordinates, tolerance_km):
+    """Douglas-Peucker on GeoJSON [[lon, lat], ...] coordinates."""
+    points = np.asarray(coordinates, dtype=np.float64)
+    if len(points) < 3:
+        return points.tolist()
+
+    lat0 = np.radians(points[:, 1].mean())
+    xy = np.column_stack((points[:, 0] * np.cos(lat0) * KM_PER_DEGREE, points[:, 1] * KM_PER_DEGREE))
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end <= start + 1:
+            continue
+        a, ab = xy[start], xy[end] - xy[start]
+        inner = xy[start + 1:end] - a
+        length2 = ab @ ab
+        if length2 == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            t = np.clip(inner @ ab / length2, 0.0, 1.0)
+            offset = inner - t[:, None] * ab
+            distances = np.hypot(offset[:, 0], offset[:, 1])
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance_km:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return points[keep].tolist()
+
+
+def _segment_rows(coordinates, slot):
+    points = np.asarray(coordinates, dtype=np.float64)[:, ::-1]  # -> (lat, lon)
+    if len(points) < 2:
+        return np.empty((0, 7))
+    a, b = points[:-1], points[1:]
+    mean_lat = np.radians((a[:, 0] + b[:, 0]) / 2)
+    dy = (b[:, 0] - a[:, 0]) * KM_PER_DEGREE
+    dx = (b[:, 1] - a[:, 1]) * KM_PER_DEGREE * np.cos(mean_lat)
+    lengths = np.hypot(dx, dy)
+    offsets = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+    return np.column_stack((a, b, offsets, lengths, np.full(len(a), slot, dtype=np.float64)))
+
+
+class CorridorIndex:
+    def __init__(self, cell_degrees):
+        self.cell_degrees = cell_degrees
+        self.built_at = time.monotonic()
+        self._chunks = []
+        self._rows = np.empty((0, 7))
+        self._dirty = False
+        self._grid = defaultdict(list)  # cell -> row numbers
+        self._size = 0
+        self._post_ids = []  # slot -> post_id
+        self._slots = {}  # post_id -> slot
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add(self, post_id, coordinates):
+        with self._lock:
+            self.remove(post_id)
+            slot = len(self._post_ids)
+            self._post_ids.append(post_id)
+            self._slots[post_id] = slot
+
+            rows = _segment_rows(coordinates, slot)
+            for i, row in enumerate(rows):
+                for cell in self._cells_along(row):
+                    self._grid[cell].append(self._size + i)
+            self._chunks.append(rows)
+            self._size += len(rows)
+            self._dirty = True
+
+    def remove(self, post_id):
+        # Rows stay in place, the slot is simply no longer live
+        with self._lock:
+            slot = self._slots.pop(post_id, None)
+            if slot is not None:
+                self._post_ids[slot] = None
+
+    def _cells_along(self, row):
+        # Sample the segment finely enough that no cell it crosses is skipped
+        span = max(abs(row[LAT2] - row[LAT1]), abs(row[LON2] - row[LON1]))
+        steps = int(span / (self.cell_degrees / 4)) + 1
+        t = np.linspace(0.0, 1.0, steps + 1)
+        lats = row[LAT1] + (row[LAT2] - row[LAT1]) * t
+        lons = row[LON1] + (row[LON2] - row[LON1]) * t
+        return {cell_for(lat, lon, self.cell_degrees) for lat, lon in zip(lats, lons)}
+
+    def _segments(self):
+        if self._dirty:
+            self._rows = np.concatenate([self._rows] + self._chunks) if self._chunks else self._rows
+            self._chunks = []
+            self._dirty = False
+        return self._rows
+
+    def _nearest(self, point, radius_km):
+        """Per live slot within radius: (slots, distance_km, along_km) for every nearby segment."""
+        lat, lon = point
+        hits = [self._grid[cell] for cell in cells_within(lat, lon, radius_km, self.cell_degrees) if cell in self._grid]
+        if not hits:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+
+        rows = self._segments()[np.unique(np.fromiter(chain.from_iterable(hits), dtype=np.int64))]
+        cos_lat = np.cos(np.radians(lat))
+        ax = (rows[:, LON1] - lon) * KM_PER_DEGREE * cos_lat
+        ay = (rows[:, LAT1] - lat) * KM_PER_DEGREE
+        bx = (rows[:, LON2] - lon) * KM_PER_DEGREE * cos_lat
+        by = (rows[:, LAT2] - lat) * KM_PER_DEGREE
+        abx, aby = bx - ax, by - ay
+        length2 = abx * abx + aby * aby
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.where(length2 > 0, -(ax * abx + ay * aby) / length2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        distances = np.hypot(ax + t * abx, ay + t * aby)
+
+        within = distances <= radius_km
+        slots = rows[within, SLOT].astype(np.int64)
+        along = rows[within, OFFSET_KM] + t[within] * rows[within, LENGTH_KM]
+        return slots, distances[within], along
+
+    def query(self, pickup, dropoff, radius_km, limit=50):
+        """
+        Posts whose route passes within ``radius_km`` of ``pickup`` and, further
+        along the route, within ``radius_km`` of ``dropoff``. Closest first.
+        """
+        with self._lock:
+            p_slots, p_dist, p_along = self._nearest(pickup, radius_km)
+            d_slots, d_dist, d_along = self._nearest(dropoff, radius_km)
+            if not len(p_slots) or not len(d_slots):
+                return []
+
+            n = len(self._post_ids)
+            pickup_along = np.full(n, np.inf)
+            pickup_dist = np.full(n, np.inf)
+            np.minimum.at(pickup_along, p_slots, p_along)
+            np.minimum.at(pickup_dist, p_slots, p_dist)
+            dropoff_along = np.full(n, -np.inf)
+            dropoff_dist = np.full(n, np.inf)
+            np.maximum.at(dropoff_along, d_slots, d_along)
+            np.minimum.at(dropoff_dist, d_slots, d_dist)
+
+            candidates = np.nonzero(pickup_along < dropoff_along)[0]
+            detour = pickup_dist[candidates] + dropoff_dist[candidates]
+            matches = []
+            for slot in candidates[np.argsort(detour, kind='stable')]:
+                post_id = self._post_ids[slot]
+                if post_id is None:
+                    continue
+                matches.append({
+                    'post_id': post_id,
+                    'pickup_distance_km': round(float(pickup_dist[slot]), 2),
+                    'dropoff_distance_km': round(float(dropoff_dist[slot]), 2),
+                    'pickup_along_km': round(float(pickup_along[slot]), 2),
+                    'dropoff_along_km': round(float(dropoff_along[slot]), 2),
+                })
+                if len(matches) >= limit:
+                    break
+            return matches
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def build_index():
+    from .models import PostRoute
+
+    config = routing_settings()
+    index = CorridorIndex(config['CORRIDOR_CELL_DEGREES'])
+    routes = PostRoute.objects.filter(
+        post__status__in=ACTIVE_POST_STATUSES,
+        post__departure_date__gte=timezone.now().date(),
+    ).values_list('post_id', 'path').iterator(chunk_size=2000)
+    for post_id, path in routes:
+        if path and path.get('coordinates'):
+            index.add(post_id, path['coordinates'])
+    return index
+
+
+def get_corridor_index():
+    """The process-wide index, rebuilt from the database every CORRIDOR_INDEX_TTL seconds."""
+    global _index
+    ttl = routing_settings()['CORRIDOR_INDEX_TTL']
+    if _index is None or time.monotonic() - _index.built_at > ttl:
+        with _index_lock:
+            if _index is None or time.monotonic() - _index.built_at > ttl:
+                _index = build_index()
+                logger.info(f"Corridor index built with {len(_index)} posts")
+    return _index
+
+
+def reset_corridor_index():
+    global _index
+    _index = None
+
+
+def index_post_route(post_route):
+    if _index is not None and post_route.path:
+        _index.add(post_route.post_id, post_route.path['coordinates'])
+
+
+def unindex_post(post_id):
+    if _index is not None:
+        _index.remove(post_id)
+
+
+def compute_post_route(post):
+    """Fetch, simplify and store the road route of ``post``. Returns the PostRoute or None."""
+    from .models import PostRoute
+
+    if None in (post.start_latitude, post.start_longitude, post.end_latitude, post.end_longitude):
+        return None
+    result = get_route([(post.start_latitude, post.start_longitude), (post.end_latitude, post.end_longitude)])
+    if result is None or not result.path:
+        return None
+
+    coordinates = simplify(result.path['coordinates'], routing_settings()['CORRIDOR_SIMPLIFY_KM'])
+    post_route, _ = PostRoute.objects.update_or_create(
+        post=post,
+        defaults={'distance': result.distance, 'path': {'type': 'LineString', 'coordinates': coordinates}},
+    )
+    return post_route
+
+
+def enqueue_post_route(post):
+    """Compute the post's route on the route job pool once the current transaction commits."""
+    from .jobs import get_executor
+
+    def run():
+        if routing_settings()['RUN_JOBS_INLINE']:
+            _compute_post_route_safely(post.post_id)
+        else:
+            get_executor().submit(_compute_post_route_in_worker, post.post_id)
+
+    transaction.on_commit(run)
+
+
+def _compute_post_route_safely(post_id):
+    from driver_post.models import DriverPost
+
+    try:
+        post = DriverPost.objects.get(post_id=post_id)
+        compute_post_route(post)
+    except Exception as e:
+        logger.error(f"Post route computation failed for post {post_id}: {str(e)}")
+
+
+def _compute_post_route_in_worker(post_id):
+    from django.db import close_old_connections
+
+    close_old_connections()
+    try:
+        _compute_post_route_safely(post_id)
+    finally:
+        close_old_connections()
@@ -0,0 +1,149 @@
+# route/distance.py
+"""
+Offline distance estimation.
+
+Road distance is estimated as great-circle distance times a road factor. The
+factor is calibrated per (pickup city, dropoff city) corridor from real routes
+returned by the routing backend, and falls back to
+ROUTING['DEFAULT_ROAD_FACTOR'] for corridors we have not seen yet.
+Everything here is pure NumPy, so thousands of pairs are estimated in one call.
+"""
+import logging
+
+import numpy as np
+from django.db.models import Q
+
+from .services import routing_settings
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_CALIBRATION_SAMPLES = 50  # running mean window, newer routes keep counting
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km. Accepts scalars or arrays (broadcast)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def default_road_factor():
+    return float(routing_settings()['DEFAULT_ROAD_FACTOR'])
+
+
+def corridor_factors(corridors):
+    """
+    Map {(origin_city_id, destination_city_id): factor} for the given corridors
+    in a single query. Unknown corridors are left out.
+    """
+    from .models import CorridorFactor
+
+    corridors = {c for c in corridors if c[0] and c[1]}
+    if not corridors:
+        return {}
+    query = Q()
+    for origin_id, destination_id in corridors:
+        query |= Q(origin_id=origin_id, destination_id=destination_id)
+    return {
+        (origin_id, destination_id): factor
+        for origin_id, destination_id, factor in CorridorFactor.objects.filter(query).values_list(
+            'origin_id', 'destination_id', 'factor'
+        )
+    }
+
+
+def estimate_batch(origins, destinations, factors=None):
+    """
+    Estimated road distance in km for every origin/destination pair.
+
+    ``origins`` and ``destinations`` are (N, 2) sequences of (lat, lon).
+    ``factors`` is an optional length N sequence of road factors; NaN/None
+    entries use the default factor.
+    """
+    origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+    destinations = np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+    straight = haversine_km(origins[:, 0], origins[:, 1], destinations[:, 0], destinations[:, 1])
+
+    if factors is None:
+        return straight * default_road_factor()
+    factors = np.asarray([np.nan if f is None else f for f in factors], dtype=np.float64)
+    factors = np.where(np.isnan(factors), default_road_factor(), factors)
+    return straight * factors
+
+
+def estimate_distance(origin, destination, factor=None):
+    """Estimated road distance in km between two (lat, lon) points."""
+    return float(estimate_batch([origin], [destination], [factor])[0])
+
+
+def delivery_points(delivery):
+    """
+    (pickup, dropoff) as (lat, lon), preferring the address coordinates and
+    falling back to the city coordinates. Missing points are None.
+    """
+    def point(address, city):
+        try:
+            return float(address['latitude']), float(address['longitude'])
+        except (KeyError, TypeError, ValueError):
+            pass
+        if city is not None and city.latitude is not None and city.longitude is not None:
+            return float(city.latitude), float(city.longitude)
+        return None
+
+    return (
+        point(delivery.pickup_address, delivery.pickup_city),
+        point(delivery.dropoff_address, delivery.dropoff_city),
+    )
+
+
+def estimate_delivery_distances(deliveries):
+    """
+    Estimated km for each delivery (None where coordinates are missing),
+    with one query for the corridor factors of the whole batch.
+    """
+    deliveries = list(deliveries)
+    factors = corridor_factors((d.pickup_city_id, d.dropoff_city_id) for d in deliveries)
+
+    rows, origins, destinations, row_factors = [], [], [], []
+    for i, delivery in enumerate(deliveries):
+        pickup, dropoff = delivery_points(delivery)
+        if pickup is None or dropoff is None:
+            continue
+        rows.append(i)
+        origins.append(pickup)
+        destinations.append(dropoff)
+        row_factors.append(factors.get((delivery.pickup_city_id, delivery.dropoff_city_id)))
+
+    distances = [None] * len(deliveries)
+    if rows:
+        for i, km in zip(rows, estimate_batch(origins, destinations, row_factors)):
+            distances[i] = float(km)
+    return distances
+
+
+def estimate_delivery_distance(delivery):
+    return estimate_delivery_distances([delivery])[0]
+
+
+def record_route_observation(pickup_city, dropoff_city, pickup, dropoff, road_km):
+    """Fold a real backend route into the corridor's calibrated road factor."""
+    from .models import CorridorFactor
+
+    if pickup_city is None or dropoff_city is None or not road_km:
+        return None
+    straight = float(haversine_km(pickup[0], pickup[1], dropoff[0], dropoff[1]))
+    if straight < 1.0:  # too short to say anything about the corridor
+        return None
+
+    observed = road_km / straight
+    corridor, created = CorridorFactor.objects.get_or_create(
+        origin=pickup_city, destination=dropoff_city,
+        defaults={'factor': observed, 'samples': 1},
+    )
+    if not created:
+        samples = min(corridor.samples, MAX_CALIBRATION_SAMPLES - 1)
+        corridor.factor = (corridor.factor * samples + observed) / (samples + 1)
+        corridor.samples = corridor.samples + 1
+        corridor.save(update_fields=['factor', 'samples', 'updated_at'])
+    return corridor
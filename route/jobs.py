@@ -0,0 +1,169 @@
+# route/jobs.py
+"""
+Background route computation.
+
+Creating a delivery only writes a ``RouteJob`` row; the job is handed to an
+in-process thread pool once the transaction commits. The worker asks the
+routing backend for the road route, stores the ``Route``, recomputes
+``total_cost`` and flips ``Delivery.route_status``. A failed attempt is
+retried after ``JOB_RETRY_DELAY`` seconds, doubled for every attempt after the
+first, so a routing backend that is down is not hammered. Jobs live in the
+database, so anything left behind by a restart (including retries that were
+still waiting) is picked up by ``process_route_jobs``.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import transaction, close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from delivery.models import Delivery, DeliveryStatus, RouteStatus
+from .models import Route, RouteJob
+from .services import get_route, routing_settings, RoutingError
+from .distance import delivery_points, record_route_observation
+
+logger = logging.getLogger(__name__)
+
+STALE_AFTER = timedelta(minutes=10)  # Running jobs older than this are considered lost
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = routing_settings()['WORKERS']
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='route-job')
+    return _executor
+
+
+def submit(job_id):
+    if routing_settings()['RUN_JOBS_INLINE']:
+        run_route_job(job_id)
+    else:
+        get_executor().submit(_run_in_worker, job_id)
+
+
+def _run_in_worker(job_id):
+    # Worker threads hold their own DB connection, drop it if it went stale
+    close_old_connections()
+    try:
+        run_route_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def enqueue_route_job(delivery):
+    """Persist a job for ``delivery`` and start it after the current transaction commits."""
+    job = RouteJob.objects.create(delivery=delivery)
+    transaction.on_commit(lambda: submit(job.job_id))
+    return job
+
+
+def enqueue_route_jobs(deliveries):
+    """``enqueue_route_job`` for many deliveries: one insert, all jobs handed to the pool on commit."""
+    jobs = RouteJob.objects.bulk_create([RouteJob(delivery=delivery) for delivery in deliveries])
+    job_ids = [job.job_id for job in jobs]
+    transaction.on_commit(lambda: [submit(job_id) for job_id in job_ids])
+    return jobs
+
+
+def compute_route(delivery):
+    pickup, dropoff = delivery_points(delivery)
+    if pickup is None or dropoff is None:
+        raise RoutingError("Delivery has no pickup/dropoff coordinates.")
+
+    result = get_route([pickup, dropoff])
+    if result is None:
+        raise RoutingError("No route found.")
+
+    with transaction.atomic():
+        Route.objects.update_or_create(
+            delivery_id=delivery,
+            defaults={'distance': result.distance, 'path': result.path},
+        )
+        record_route_observation(delivery.pickup_city, delivery.dropoff_city, pickup, dropoff, result.distance)
+
+        # Only reprice while nobody has acted on the quoted cost yet
+        Delivery.objects.filter(pk=delivery.pk, status=DeliveryStatus.PENDING).update(
+            total_cost=delivery.cost_for_distance(result.distance),
+            updated_at=timezone.now(),
+        )
+        Delivery.objects.filter(pk=delivery.pk).update(route_status=RouteStatus.READY)
+    return result
+
+
+def _due(now):
+    return Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+
+
+def run_route_job(job_id, retry=True):
+    try:
+        now = timezone.now()
+        claimed = RouteJob.objects.filter(_due(now), job_id=job_id, status='Pending').update(
+            status='Running', attempts=F('attempts') + 1, updated_at=now
+        )
+        if not claimed:
+            return
+
+        job = RouteJob.objects.select_related('delivery__pickup_city', 'delivery__dropoff_city').get(job_id=job_id)
+        try:
+            compute_route(job.delivery)
+        except Exception as e:
+            _handle_failure(job, e, retry)
+            return
+
+        RouteJob.objects.filter(job_id=job_id).update(status='Done', last_error=None, updated_at=timezone.now())
+        logger.info(f"Route job {job_id} finished for delivery {job.delivery_id}")
+    except Exception as e:
+        logger.error(f"Route job {job_id} crashed: {str(e)}")
+
+
+def _handle_failure(job, error, retry):
+    config = routing_settings()
+    if job.attempts < config['JOB_MAX_ATTEMPTS']:
+        delay = config['JOB_RETRY_DELAY'] * 2 ** (job.attempts - 1)
+        logger.warning(f"Route job {job.job_id} attempt {job.attempts} failed, retrying in {delay}s: {str(error)}")
+        now = timezone.now()
+        RouteJob.objects.filter(job_id=job.job_id).update(
+            status='Pending', last_error=str(error), next_attempt_at=now + timedelta(seconds=delay), updated_at=now
+        )
+        if retry and not delay:
+            submit(job.job_id)
+        elif retry and not config['RUN_JOBS_INLINE']:
+            # Lost on restart, but the job stays Pending for process_route_jobs
+            timer = threading.Timer(delay, submit, args=[job.job_id])
+            timer.daemon = True
+            timer.start()
+        return
+
+    logger.error(f"Route job {job.job_id} failed after {job.attempts} attempts: {str(error)}")
+    RouteJob.objects.filter(job_id=job.job_id).update(
+        status='Failed', last_error=str(error), updated_at=timezone.now()
+    )
+    Delivery.objects.filter(pk=job.delivery_id).update(route_status=RouteStatus.FAILED)
+
+
+def process_pending_jobs(limit=100):
+    """
+    Run queued jobs that are due synchronously, oldest first; retries still
+    waiting out their backoff are left alone. Jobs stuck in Running (worker
+    died mid-job) are put back in the queue first. Returns the number processed.
+    """
+    now = timezone.now()
+    RouteJob.objects.filter(status='Running', updated_at__lt=now - STALE_AFTER).update(
+        status='Pending', updated_at=now
+    )
+    job_ids = list(
+        RouteJob.objects.filter(_due(now), status='Pending')
+        .order_by('created_at').values_list('job_id', flat=True)[:limit]
+    )
+    for job_id in job_ids:
+        run_route_job(job_id, retry=False)
+    return len(job_ids)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from driver_post.models import DriverPost
+from route.corridor import compute_post_route, ACTIVE_POST_STATUSES
+
+
+class Command(BaseCommand):
+    help = "Compute the corridor route of upcoming driver posts that do not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help="Maximum number of posts to route.")
+
+    def handle(self, *args, **options):
+        posts = DriverPost.objects.filter(
+            status__in=ACTIVE_POST_STATUSES,
+            departure_date__gte=timezone.now().date(),
+            route__isnull=True,
+        ).order_by('departure_date')[:options['limit']]
+
+        built = 0
+        for post in posts:
+            try:
+                if compute_post_route(post):
+                    built += 1
+            except Exception as e:
+                self.stderr.write(f"Post {post.post_id}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Built {built} post routes."))
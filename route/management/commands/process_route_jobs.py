@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from route.jobs import process_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued route jobs that are due (including ones left behind by a restart) synchronously."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help="Maximum number of jobs to run.")
+
+    def handle(self, *args, **options):
+        processed = process_pending_jobs(limit=options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} route jobs."))
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driver_post', '0007_remove_driverpost_available_capacity'),
+        ('route', '0004_routecacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorridorFactor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('factor', models.FloatField()),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incoming_corridors', to='driver_post.city')),
+                ('origin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_corridors', to='driver_post.city')),
+            ],
+            options={
+                'unique_together': {('origin', 'destination')},
+            },
+        ),
+    ]
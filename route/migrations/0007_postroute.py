@@ -0,0 +1,26 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('driver_post', '0008_driverpost_grid_cells'),
+        ('route', '0006_routejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostRoute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance', models.FloatField(default=0.0)),
+                ('path', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='route', to='driver_post.driverpost')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('route', '0007_postroute'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routejob',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
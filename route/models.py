@@ -1,6 +1,7 @@
 # route/models.py
 from django.db import models
 from delivery.models import Delivery
+from driver_post.models import City, DriverPost
 import uuid
 from django.utils import timezone
 
@@ -18,4 +19,73 @@ class Route(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['delivery_id']),
-        ]
\ No newline at end of file
+        ]
+
+class RouteCacheEntry(models.Model):
+    """Persistent cache of backend lookups, keyed by rounded coordinates."""
+    key = models.CharField(max_length=40, unique=True)
+    distance = models.FloatField()  # in km
+    path = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Cached route {self.key} ({self.distance:.1f} km)"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_used_at']),
+        ]
+
+
+class CorridorFactor(models.Model):
+    """Calibrated road km per great-circle km between two cities."""
+    origin = models.ForeignKey(City, on_delete=models.CASCADE, related_name='outgoing_corridors')
+    destination = models.ForeignKey(City, on_delete=models.CASCADE, related_name='incoming_corridors')
+    factor = models.FloatField()
+    samples = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.origin} To {self.destination}: x{self.factor:.2f}"
+
+    class Meta:
+        unique_together = ('origin', 'destination')
+
+
+class RouteJob(models.Model):
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Running', 'Running'),
+        ('Done', 'Done'),
+        ('Failed', 'Failed'),
+    ]
+
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    delivery = models.ForeignKey(Delivery, on_delete=models.CASCADE, related_name='route_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)  # retries wait until then
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Route job {self.job_id} ({self.status}) for Delivery {self.delivery_id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class PostRoute(models.Model):
+    """Simplified road route of a driver post, used for corridor matching."""
+    post = models.OneToOneField(DriverPost, on_delete=models.CASCADE, related_name='route')
+    distance = models.FloatField(default=0.0)  # in km
+    path = models.JSONField()  # simplified GeoJSON LineString
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Route for Post {self.post_id}"
@@ -0,0 +1,249 @@
+# route/services.py
+"""
+Routing service layer.
+
+All distance / geometry lookups go through ``get_route`` which puts a two level
+cache (process-local LRU + persistent ``RouteCacheEntry`` table) in front of a
+configurable backend (public OSRM, self-hosted OSRM or a local stub).
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTING = {
+    'BACKEND': 'osrm',
+    'OSRM_URL': 'http://router.project-osrm.org',
+    'TIMEOUT': 10,
+    'COORDINATE_PRECISION': 4,
+    'CACHE_TTL': 60 * 60 * 24 * 7,
+    'CACHE_MAX_ENTRIES': 10000,
+    'MEMORY_CACHE_SIZE': 1024,
+    'DEFAULT_ROAD_FACTOR': 1.3,
+    'WORKERS': 2,
+    'JOB_MAX_ATTEMPTS': 3,
+    'JOB_RETRY_DELAY': 30,  # seconds before the first retry, doubled for each one after
+    'RUN_JOBS_INLINE': False,
+    'CORRIDOR_CELL_DEGREES': 0.1,
+    'CORRIDOR_SIMPLIFY_KM': 0.5,
+    'CORRIDOR_INDEX_TTL': 300,
+}
+
+
+def routing_settings():
+    config = dict(DEFAULT_ROUTING)
+    config.update(getattr(settings, 'ROUTING', {}))
+    return config
+
+
+class RoutingError(Exception):
+    """Raised when the routing backend could not be reached."""
+
+
+class RouteResult:
+    __slots__ = ('distance', 'path')
+
+    def __init__(self, distance, path=None):
+        self.distance = distance  # in km
+        self.path = path  # GeoJSON LineString
+
+    def __repr__(self):
+        return f"RouteResult(distance={self.distance:.3f})"
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Shared HTTP session so connections to the router are pooled and reused."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=1)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+class OSRMBackend:
+    """OSRM HTTP API. Works for the public demo server and self-hosted instances."""
+    name = 'osrm'
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def route(self, points):
+        coords = ";".join(f"{lon},{lat}" for lat, lon in points)
+        url = f"{self.base_url}/route/v1/driving/{coords}?overview=full&geometries=geojson"
+        try:
+            response = get_session().get(url, timeout=self.timeout)
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise RoutingError(f"OSRM request failed: {e}") from e
+
+        if data.get('code') != 'Ok' or not data.get('routes'):
+            logger.warning(f"OSRM returned no route for {coords}: {data.get('code')}")
+            return None
+
+        route = data['routes'][0]
+        geometry = route.get('geometry')
+        if not (geometry and isinstance(geometry, dict) and 'coordinates' in geometry and 'type' in geometry):
+            geometry = None
+        return RouteResult(route.get('distance', 0) / 1000, geometry)
+
+
+class StubBackend:
+    """Straight-line routes computed locally. No network, for tests and offline dev."""
+    name = 'stub'
+
+    def __init__(self, **kwargs):
+        pass
+
+    def route(self, points):
+        from .distance import haversine_km
+
+        lats, lons = zip(*points)
+        distance = float(haversine_km(lats[:-1], lons[:-1], lats[1:], lons[1:]).sum())
+        path = {'type': 'LineString', 'coordinates': [[lon, lat] for lat, lon in points]}
+        return RouteResult(distance, path)
+
+
+BACKENDS = {
+    'osrm': OSRMBackend,
+    'stub': StubBackend,
+}
+
+
+def get_backend():
+    config = routing_settings()
+    backend = config['BACKEND']
+    backend_class = BACKENDS.get(backend) or import_string(backend)
+    if backend_class is OSRMBackend:
+        return OSRMBackend(config['OSRM_URL'], timeout=config['TIMEOUT'])
+    return backend_class()
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+class _MemoryLRU:
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, result = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return result
+
+    def set(self, key, result, ttl, max_size):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, result)
+            self._data.move_to_end(key)
+            while len(self._data) > max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_memory_cache = _MemoryLRU()
+
+
+def cache_key(points, backend_name, precision):
+    rounded = ";".join(f"{round(lat, precision)},{round(lon, precision)}" for lat, lon in points)
+    return hashlib.sha1(f"{backend_name}|{rounded}".encode()).hexdigest()
+
+
+def clear_cache(persistent=False):
+    _memory_cache.clear()
+    if persistent:
+        from .models import RouteCacheEntry
+        RouteCacheEntry.objects.all().delete()
+
+
+def _read_persistent(key, ttl):
+    from .models import RouteCacheEntry
+    entry = RouteCacheEntry.objects.filter(key=key).only('distance', 'path', 'created_at').first()
+    if entry is None:
+        return None
+    now = timezone.now()
+    if entry.created_at < now - timedelta(seconds=ttl):
+        RouteCacheEntry.objects.filter(key=key).delete()
+        return None
+    RouteCacheEntry.objects.filter(key=key).update(last_used_at=now)
+    return RouteResult(entry.distance, entry.path)
+
+
+def _write_persistent(key, result, max_entries):
+    from .models import RouteCacheEntry
+    now = timezone.now()
+    RouteCacheEntry.objects.update_or_create(
+        key=key,
+        defaults={'distance': result.distance, 'path': result.path, 'created_at': now, 'last_used_at': now},
+    )
+    # Evict least recently used rows once the table is over budget
+    overflow = RouteCacheEntry.objects.count() - max_entries
+    if overflow > 0:
+        stale = RouteCacheEntry.objects.order_by('last_used_at').values_list('pk', flat=True)[:overflow]
+        RouteCacheEntry.objects.filter(pk__in=list(stale)).delete()
+
+
+def get_route(points):
+    """
+    Return a ``RouteResult`` for the ordered ``points`` [(lat, lon), ...],
+    or None if the backend found no route. Raises ``RoutingError`` if the
+    backend is unreachable. Successful lookups are cached.
+    """
+    points = [(float(lat), float(lon)) for lat, lon in points]
+    config = routing_settings()
+    backend = get_backend()
+    key = cache_key(points, backend.name, config['COORDINATE_PRECISION'])
+    ttl = config['CACHE_TTL']
+
+    result = _memory_cache.get(key)
+    if result is not None:
+        return result
+
+    result = _read_persistent(key, ttl)
+    if result is None:
+        result = backend.route(points)
+        if result is None:
+            return None
+        _write_persistent(key, result, config['CACHE_MAX_ENTRIES'])
+
+    _memory_cache.set(key, result, ttl, config['MEMORY_CACHE_SIZE'])
+    return result
+
+
+def address_point(address):
+    """(lat, lon) from a pickup/dropoff address dict."""
+    return float(address['latitude']), float(address['longitude'])
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from driver_post.models import DriverPost
+from .models import PostRoute
+from .corridor import enqueue_post_route, index_post_route, unindex_post, ACTIVE_POST_STATUSES
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=DriverPost)
+def queue_post_route(sender, instance, created, **kwargs):
+    if created:
+        enqueue_post_route(instance)
+    elif instance.status not in ACTIVE_POST_STATUSES:
+        unindex_post(instance.post_id)
+
+
+@receiver(post_delete, sender=DriverPost)
+def drop_post_from_index(sender, instance, **kwargs):
+    unindex_post(instance.post_id)
+
+
+@receiver(post_save, sender=PostRoute)
+def add_post_route_to_index(sender, instance, **kwargs):
+    index_post_route(instance)
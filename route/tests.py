@@ -1,3 +1,145 @@
-from django.test import TestCase
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from decimal import Decimal
+from django.utils import timezone
+import numpy as np
+from accounts.models import CustomUser
+from delivery.models import Delivery, Package, RouteStatus
+from driver_post.models import City
+from .models import RouteCacheEntry, CorridorFactor, RouteJob
+from .services import get_route, clear_cache, StubBackend, RoutingError
+from .jobs import enqueue_route_job, process_pending_jobs
+from .corridor import simplify, CorridorIndex
+from .distance import haversine_km, estimate_batch, estimate_distance, corridor_factors, record_route_observation
 
-# Create your tests here.
+PESHAWAR = (34.0151, 71.5249)
+ISLAMABAD = (33.6844, 73.0479)
+
+
+@override_settings(ROUTING={'BACKEND': 'stub', 'CACHE_MAX_ENTRIES': 2})
+class RouteCacheTests(TestCase):
+    def setUp(self):
+        clear_cache()
+
+    def test_repeat_lookup_hits_cache(self):
+        with patch.object(StubBackend, 'route', wraps=StubBackend().route) as backend_route:
+            first = get_route([PESHAWAR, ISLAMABAD])
+            second = get_route([PESHAWAR, ISLAMABAD])
+        self.assertEqual(backend_route.call_count, 1)
+        self.assertAlmostEqual(first.distance, second.distance)
+        self.assertEqual(RouteCacheEntry.objects.count(), 1)
+
+    def test_nearby_coordinates_share_entry(self):
+        get_route([PESHAWAR, ISLAMABAD])
+        with patch.object(StubBackend, 'route') as backend_route:
+            get_route([(34.01512, 71.52491), ISLAMABAD])
+        backend_route.assert_not_called()
+
+    def test_persistent_cache_survives_memory_clear(self):
+        get_route([PESHAWAR, ISLAMABAD])
+        clear_cache()
+        with patch.object(StubBackend, 'route') as backend_route:
+            result = get_route([PESHAWAR, ISLAMABAD])
+        backend_route.assert_not_called()
+        self.assertGreater(result.distance, 100)
+
+    def test_least_recently_used_rows_evicted(self):
+        get_route([PESHAWAR, ISLAMABAD])
+        get_route([ISLAMABAD, PESHAWAR])
+        get_route([PESHAWAR, (31.5204, 74.3587)])
+        self.assertEqual(RouteCacheEntry.objects.count(), 2)
+
+
+class DistanceEstimateTests(TestCase):
+    def setUp(self):
+        self.peshawar = City.objects.create(name='Peshawar', country='Pakistan', latitude=34.0151, longitude=71.5249)
+        self.islamabad = City.objects.create(name='Islamabad', country='Pakistan', latitude=33.6844, longitude=73.0479)
+
+    def test_batch_matches_scalar(self):
+        origins = np.tile(PESHAWAR, (1000, 1))
+        destinations = np.tile(ISLAMABAD, (1000, 1))
+        batch = estimate_batch(origins, destinations)
+        self.assertEqual(batch.shape, (1000,))
+        self.assertAlmostEqual(batch[0], estimate_distance(PESHAWAR, ISLAMABAD))
+        # ~145 km great circle, ~190 km with the default road factor
+        self.assertAlmostEqual(float(haversine_km(*PESHAWAR, *ISLAMABAD)), 145, delta=5)
+
+    def test_corridor_calibration(self):
+        straight = float(haversine_km(*PESHAWAR, *ISLAMABAD))
+        record_route_observation(self.peshawar, self.islamabad, PESHAWAR, ISLAMABAD, straight * 1.2)
+        factors = corridor_factors([(self.peshawar.city_id, self.islamabad.city_id)])
+        self.assertAlmostEqual(factors[(self.peshawar.city_id, self.islamabad.city_id)], 1.2)
+        self.assertEqual(CorridorFactor.objects.count(), 1)
+
+
+@override_settings(ROUTING={'BACKEND': 'stub', 'RUN_JOBS_INLINE': True})
+class RouteJobTests(TestCase):
+    def setUp(self):
+        clear_cache()
+        self.sender = CustomUser.objects.create_user(
+            email='sender@example.com', password='pass', phone_number='+923001110001'
+        )
+        self.delivery = Delivery.objects.create(
+            sender_id=self.sender,
+            pickup_address={'city': 'Peshawar', 'latitude': PESHAWAR[0], 'longitude': PESHAWAR[1]},
+            dropoff_address={'city': 'Islamabad', 'latitude': ISLAMABAD[0], 'longitude': ISLAMABAD[1]},
+        )
+        Package.objects.create(delivery_id=self.delivery, description='Box', weight=10, dimensions={})
+
+    def test_job_stores_route_and_reprices(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = enqueue_route_job(self.delivery)
+
+        job.refresh_from_db()
+        self.delivery.refresh_from_db()
+        self.assertEqual(job.status, 'Done')
+        self.assertEqual(self.delivery.route_status, RouteStatus.READY)
+        self.assertAlmostEqual(self.delivery.route.distance, 145, delta=5)
+        self.assertEqual(self.delivery.total_cost, self.delivery.cost_for_distance(self.delivery.route.distance).quantize(Decimal('0.01')))
+
+    def test_job_gives_up_after_max_attempts(self):
+        with patch.object(StubBackend, 'route', side_effect=RoutingError("down")):
+            with self.captureOnCommitCallbacks(execute=True):
+                job = enqueue_route_job(self.delivery)
+
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('Pending', 1))
+            self.assertGreater(job.next_attempt_at, timezone.now())
+            self.assertEqual(process_pending_jobs(), 0)  # still backing off
+
+            for attempts in (2, 3):
+                RouteJob.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now())
+                self.assertEqual(process_pending_jobs(), 1)
+                job.refresh_from_db()
+                self.assertEqual(job.attempts, attempts)
+
+        self.delivery.refresh_from_db()
+        self.assertEqual(job.status, 'Failed')
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(self.delivery.route_status, RouteStatus.FAILED)
+
+
+class CorridorIndexTests(TestCase):
+    # Peshawar -> Islamabad -> Lahore, GeoJSON order
+    ROUTE = [[71.5249, 34.0151], [72.3, 33.85], [73.0479, 33.6844], [73.7, 32.6], [74.3587, 31.5204]]
+
+    def test_simplify_drops_collinear_points(self):
+        line = [[71.0 + i * 0.01, 34.0] for i in range(100)]
+        self.assertEqual(simplify(line, 0.5), [line[0], line[-1]])
+        bend = [[71.0, 34.0], [71.5, 34.5], [72.0, 34.0]]
+        self.assertEqual(simplify(bend, 0.5), bend)
+
+    def test_query_respects_direction(self):
+        index = CorridorIndex(0.1)
+        index.add('forward', self.ROUTE)
+        index.add('backward', self.ROUTE[::-1])
+
+        matches = index.query(ISLAMABAD, (31.5204, 74.3587), radius_km=10)
+        self.assertEqual([m['post_id'] for m in matches], ['forward'])
+        self.assertLess(matches[0]['pickup_along_km'], matches[0]['dropoff_along_km'])
+
+    def test_removed_post_not_returned(self):
+        index = CorridorIndex(0.1)
+        index.add('forward', self.ROUTE)
+        index.remove('forward')
+        self.assertEqual(index.query(PESHAWAR, ISLAMABAD, radius_km=10), [])
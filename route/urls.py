@@ -1,6 +1,6 @@
 # route/urls.py
 from django.urls import path
-from .views import RouteListCreateView, RouteDetailView, MultiDeliveryRouteView
+from .views import RouteListCreateView, RouteDetailView, MultiDeliveryRouteView, RouteStatusView
 
 app_name = 'route'
 
@@ -8,4 +8,5 @@ urlpatterns = [
     path('', RouteListCreateView.as_view(), name='list-create'),
     path('<uuid:route_id>/', RouteDetailView.as_view(), name='detail'),
     path('multi-delivery/<uuid:driver_post_id>/', MultiDeliveryRouteView.as_view(), name='multi-delivery'),
+    path('status/<uuid:delivery_id>/', RouteStatusView.as_view(), name='status'),
 ]
\ No newline at end of file
@@ -2,14 +2,15 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from DropX.authentication import CachedJWTAuthentication
 from .models import Route
 from .serializers import RouteSerializer
 from delivery.models import Delivery, DeliveryStatus
 from rest_framework import serializers
 from driver_post.models import DriverPost
 from DropX.permissions import IsSender, IsVerifiedDriver
-import requests, json
+from .services import get_route, address_point, RoutingError
+from django.db.models import Q
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,7 +19,7 @@ class RouteListCreateView(generics.ListCreateAPIView):
     queryset = Route.objects.all()
     serializer_class = RouteSerializer
     permission_classes = [IsAuthenticated, IsSender]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def perform_create(self, serializer):
         delivery_id = serializer.validated_data['delivery_id_uuid']
@@ -29,20 +30,10 @@ class RouteListCreateView(generics.ListCreateAPIView):
         distance = 0
         path = None
         try:
-            pickup_lon = float(pickup['longitude'])
-            pickup_lat = float(pickup['latitude'])
-            dropoff_lon = float(dropoff['longitude'])
-            dropoff_lat = float(dropoff['latitude'])
-
-            url = f"http://router.project-osrm.org/route/v1/driving/{pickup_lon},{pickup_lat};{dropoff_lon},{dropoff_lat}?overview=full&geometries=geojson"
-            response = requests.get(url, timeout=10)
-            data = response.json()
-            if data.get('code') == 'Ok' and data.get('routes'):
-                route = data['routes'][0]
-                distance = route.get('distance', 0) / 1000
-                geometry = route.get('geometry')
-                if geometry and 'coordinates' in geometry and 'type' in geometry:
-                    path = geometry
+            result = get_route([address_point(pickup), address_point(dropoff)])
+            if result:
+                distance = result.distance
+                path = result.path
         except Exception as e:
             logger.error(f"Route creation error for delivery {delivery_id}: {str(e)}")
 
@@ -54,7 +45,7 @@ class RouteDetailView(generics.RetrieveUpdateAPIView):
     serializer_class = RouteSerializer
     lookup_field = 'route_id'
     permission_classes = [IsAuthenticated, IsSender | IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def get_queryset(self):
         user = self.request.user
@@ -65,7 +56,7 @@ class RouteDetailView(generics.RetrieveUpdateAPIView):
 
 class MultiDeliveryRouteView(APIView):
     permission_classes = [IsAuthenticated, IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
 
     def post(self, request, driver_post_id):
         try:
@@ -81,34 +72,22 @@ class MultiDeliveryRouteView(APIView):
                 return Response({"error": "No assigned deliveries for this post."},
                                 status=status.HTTP_400_BAD_REQUEST)
 
-            # Build coordinates for OSRM
-            coordinates = []
+            # Pickup then dropoff for every delivery, in order
+            points = []
             for delivery in deliveries:
-                pickup = delivery.pickup_address
-                dropoff = delivery.dropoff_address
-                coordinates.append(f"{float(pickup['longitude'])},{float(pickup['latitude'])}")
-                coordinates.append(f"{float(dropoff['longitude'])},{float(dropoff['latitude'])}")
+                points.append(address_point(delivery.pickup_address))
+                points.append(address_point(delivery.dropoff_address))
 
-            coords_str = ";".join(coordinates)
-
-            # OSRM API call
-            url = f"http://router.project-osrm.org/route/v1/driving/{coords_str}?overview=full&geometries=geojson"
-            response = requests.get(url, timeout=15)
-            data = response.json()
-            logger.debug(f"OSRM multi-delivery response: {data}")
+            result = get_route(points)
 
             total_distance = 0
             path = None
-            if data.get('code') == 'Ok' and data.get('routes'):
-                route_data = data['routes'][0]
-                total_distance = route_data.get('distance', 0) / 1000
-                geometry = route_data.get('geometry')
-                if geometry and isinstance(geometry, dict) and 'coordinates' in geometry:
-                    path = geometry
+            if result:
+                if result.path:
+                    total_distance = result.distance
+                    path = result.path
                 else:
                     logger.warning(f"Invalid geometry for multi-delivery post {driver_post_id}")
-                    path = None
-                    total_distance = 0
 
             # Save route for each delivery
             route_ids = []
@@ -138,9 +117,31 @@ class MultiDeliveryRouteView(APIView):
         except DriverPost.DoesNotExist:
             logger.error(f"Driver post {driver_post_id} not found")
             return Response({"error": "Driver post not found."}, status=status.HTTP_404_NOT_FOUND)
-        except requests.exceptions.RequestException as e:
+        except RoutingError as e:
             logger.error(f"OSRM request failed for post {driver_post_id}: {str(e)}")
             return Response({"error": "Unable to calculate route: OSRM request failed"}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Multi-delivery route error for post {driver_post_id}: {str(e)}")
             return Response({"error": f"Unable to calculate multi-delivery route: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class RouteStatusView(APIView):
+    """Poll the background route computation for a delivery."""
+    permission_classes = [IsAuthenticated, IsSender | IsVerifiedDriver]
+    authentication_classes = [CachedJWTAuthentication]
+
+    def get(self, request, delivery_id):
+        delivery = Delivery.objects.filter(
+            Q(sender_id=request.user) | Q(driver_id=request.user) | Q(driver_post_id__user=request.user),
+            delivery_id=delivery_id,
+        ).values('delivery_id', 'route_status', 'total_cost', 'route__route_id', 'route__distance').first()
+        if not delivery:
+            return Response({"error": "Delivery not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            "delivery_id": str(delivery['delivery_id']),
+            "route_status": delivery['route_status'],
+            "total_cost": delivery['total_cost'],
+            "route_id": str(delivery['route__route_id']) if delivery['route__route_id'] else None,
+            "distance": delivery['route__distance'],
+        }, status=status.HTTP_200_OK)
@@ -1,7 +1,7 @@
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import JSONParser
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from DropX.authentication import CachedJWTAuthentication
 from .models import Vehicle, VehicleLog
 from .serializers import VehicleSerializer, VehicleLogSerializer
 from DropX.permissions import IsVerifiedDriver
@@ -16,7 +16,7 @@ class VehicleListCreateView(generics.ListCreateAPIView):
     """
     serializer_class = VehicleSerializer
     permission_classes = [IsAuthenticated, IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     parser_classes = [JSONParser]
 
     def get_queryset(self):
@@ -41,7 +41,7 @@ class VehicleDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = VehicleSerializer
     lookup_field = 'vehicle_id'
     permission_classes = [IsAuthenticated, IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     parser_classes = [JSONParser]
 
     def get_queryset(self):
@@ -73,7 +73,7 @@ class VehicleLogListView(generics.ListAPIView):
     """
     serializer_class = VehicleLogSerializer
     permission_classes = [IsAuthenticated, IsVerifiedDriver]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     parser_classes = [JSONParser]
 
     def get_queryset(self):